@@ -0,0 +1,41 @@
+"""composite indexes for keyset-paginated listings
+
+GET /exams/ and GET /attempts/my-attempts page newest-first on
+(created_at, id) / (started_at, id) — see app/core/pagination.py. Each
+listing filters first (creator, status or student), so each gets an index
+that leads with its filter and ends in the sort key; the admin listing has
+no filter and uses (created_at, id) alone. The single-column indexes from
+003 that are prefixes of the new ones are dropped.
+
+Revision ID: 006_add_keyset_indexes
+Revises: 005_add_question_types
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+revision = '006_add_keyset_indexes'
+down_revision = '005_add_question_types'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_exams_created_at_id',         'exams', ['created_at', 'id'])
+    op.create_index('idx_exams_creator_created_at_id', 'exams', ['created_by', 'created_at', 'id'])
+    op.create_index('idx_exams_status_created_at_id',  'exams', ['status', 'created_at', 'id'])
+    op.create_index('idx_attempts_student_started_id', 'exam_attempts', ['student_id', 'started_at', 'id'])
+
+    op.drop_index('idx_exams_created_by',    'exams')
+    op.drop_index('idx_exams_status',        'exams')
+    op.drop_index('idx_attempts_student_id', 'exam_attempts')
+
+
+def downgrade():
+    op.create_index('idx_attempts_student_id', 'exam_attempts', ['student_id'])
+    op.create_index('idx_exams_status',        'exams', ['status'])
+    op.create_index('idx_exams_created_by',    'exams', ['created_by'])
+
+    op.drop_index('idx_attempts_student_started_id', 'exam_attempts')
+    op.drop_index('idx_exams_status_created_at_id',  'exams')
+    op.drop_index('idx_exams_creator_created_at_id', 'exams')
+    op.drop_index('idx_exams_created_at_id',         'exams')
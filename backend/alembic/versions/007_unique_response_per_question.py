@@ -0,0 +1,41 @@
+"""one response row per (attempt, question)
+
+Submit and auto-save upsert answers with INSERT ... ON CONFLICT (attempt_id,
+question_id) DO UPDATE, which needs a unique key on the pair. Network retries
+of the old submit could insert the same answer twice, so duplicates are
+removed first, keeping the newest answer. idx_responses_attempt_id from 003
+is a prefix of the new unique index and is dropped.
+
+Revision ID: 007_unique_response
+Revises: 006_add_keyset_indexes
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+revision = '007_unique_response'
+down_revision = '006_add_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM responses
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY attempt_id, question_id
+                    ORDER BY answered_at DESC NULLS LAST, id DESC
+                ) AS n
+                FROM responses
+            ) ranked
+            WHERE n > 1
+        )
+    """)
+    op.create_unique_constraint('uq_responses_attempt_question', 'responses', ['attempt_id', 'question_id'])
+    op.drop_index('idx_responses_attempt_id', 'responses')
+
+
+def downgrade():
+    op.create_index('idx_responses_attempt_id', 'responses', ['attempt_id'])
+    op.drop_constraint('uq_responses_attempt_question', 'responses', type_='unique')
@@ -0,0 +1,30 @@
+"""partial index for the attempt deadline sweeper
+
+The sweeper (app/services/attempt_sweeper.py) looks for in-progress attempts
+whose started_at + duration has passed, oldest first, a batch at a time. Only
+a handful of rows are in progress at any time against every attempt ever
+taken, so a partial index on started_at over just those rows keeps each
+sweep proportional to the open attempts.
+
+Revision ID: 008_in_progress_attempts
+Revises: 007_unique_response
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '008_in_progress_attempts'
+down_revision = '007_unique_response'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_attempts_in_progress_started', 'exam_attempts', ['started_at'],
+        postgresql_where=sa.text("status = 'IN_PROGRESS'"),
+    )
+
+
+def downgrade():
+    op.drop_index('idx_attempts_in_progress_started', 'exam_attempts')
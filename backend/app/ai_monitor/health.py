@@ -16,7 +16,7 @@ suspicion scoring, and the processor agree on one table.
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
@@ -124,7 +124,7 @@ def record_violations(
             attempt_id=attempt.id,
             flag_type=canonical,
             severity=severity_enum,
-            timestamp=datetime.now(timezone.utc),
+            timestamp=datetime.utcnow(),   # naive UTC, like every DateTime column (asyncpg rejects aware values)
             meta_data=meta,
         ))
 
@@ -140,7 +140,7 @@ def record_violations(
         status_val = attempt.status.value if hasattr(attempt.status, "value") else attempt.status
         if status_val == AttemptStatus.IN_PROGRESS.value:
             attempt.status = AttemptStatus.SUBMITTED
-            attempt.submitted_at = datetime.now(timezone.utc)
+            attempt.submitted_at = datetime.utcnow()
             auto_submitted = True
 
     if commit:
@@ -1,17 +1,22 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.core.database import get_db
+from uuid import UUID
+from app.core import principal_cache, revocation
+from app.core import database
+from app.core.database import SessionLocal, get_db
 from app.core.security import decode_access_token
 from app.models.user import User
 
-def get_current_user(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> User:
-    """
-    Validate JWT token and return current user
-    """
+
+def _load_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+async def decode_bearer(authorization: Optional[str]) -> dict:
+    """Parse the Authorization header, verify the JWT and check revocation."""
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,22 +50,74 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    email: str = payload.get("sub")
-    if email is None:
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
-    
-    user = db.query(User).filter(User.email == email).first()
+
+    if await revocation.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return payload
+
+
+async def get_token_payload(authorization: Optional[str] = Header(None)) -> dict:
+    """The verified, non-revoked JWT claims of the caller."""
+    return await decode_bearer(authorization)
+
+
+async def get_current_user(
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Validate JWT token and return current user.
+
+    The principal is served from ``principal_cache`` when possible; the users
+    table is only queried (off the event loop) on a cache miss. The DB session
+    is created lazily, so a cache hit never checks out a pool connection.
+    """
+    payload = await decode_bearer(authorization)
+    email: str = payload["sub"]
+
+    if payload.get("uid"):
+        user = await principal_cache.get(payload["uid"])
+        if user is not None and user.email == email:
+            return user
+
+    user = await run_in_threadpool(_load_user, db, email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    
+
+    await principal_cache.store(user)
     return user
 
+def get_read_db(current_user: User = Depends(get_current_user)):
+    """
+    Session for read-only routes that tolerate replica lag (analytics,
+    leaderboards, exports). Uses the read replica when one is configured,
+    healthy and caught up, and the caller has not written anything recently
+    (``database.stick_to_primary``); the primary otherwise. Runs in the
+    threadpool like ``get_db``, since the routing check may touch Redis.
+    """
+    if database.read_target(current_user.id) == "replica":
+        db = database.ReadSessionLocal()
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def require_role(allowed_roles: list):
     """
     Dependency to check if user has required role.
@@ -76,4 +133,64 @@ def require_role(allowed_roles: list):
                 detail="Not enough permissions"
             )
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+
+# ── Stateless fast path ────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """The caller as described by a v2 token — no users row involved."""
+    id: UUID
+    email: str
+    role: str
+    is_verified: bool
+
+
+async def get_token_principal(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db),
+) -> TokenPrincipal:
+    """
+    Authorise from the JWT claims alone — no DB session, no users SELECT.
+
+    Used by the high-frequency proctoring ingest endpoints (/monitor/frame,
+    /monitor/audio, /monitor/enhanced/violation, /recover) so each upload does
+    not tie up a pool connection just to learn the caller's id and role.
+    v1 tokens (issued before uid/role claims existed) still work: they are
+    resolved from the users table. The session is lazy, so only that path
+    ever checks out a connection.
+    """
+    uid, role = payload.get("uid"), payload.get("role")
+    if uid and role:
+        return TokenPrincipal(
+            id=UUID(uid),
+            email=payload["sub"],
+            role=role,
+            is_verified=bool(payload.get("ver", False)),
+        )
+
+    user = await run_in_threadpool(_load_user, db, payload["sub"])
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return TokenPrincipal(
+        id=user.id,
+        email=user.email,
+        role=user.role.value if hasattr(user.role, "value") else str(user.role),
+        is_verified=bool(user.is_verified),
+    )
+
+
+def require_token_role(allowed_roles: list):
+    """``require_role`` for the stateless fast path."""
+    def role_checker(principal: TokenPrincipal = Depends(get_token_principal)) -> TokenPrincipal:
+        if principal.role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return principal
+    return role_checker
@@ -0,0 +1,64 @@
+"""
+Admin / operations endpoints.
+
+GET /metrics serves every in-process metric (``app.core.metrics``) in
+Prometheus text format. Scrapers authenticate with the static METRICS_TOKEN
+bearer; people use an admin JWT. Each worker reports only its own series, so
+scrape every worker (or put them behind per-worker targets) and aggregate in
+PromQL.
+
+GET /stats is the same audience's JSON snapshot of this worker (cache tiers,
+principal cache, hashing pool, DB pools, auto-save buffer) — kept off the
+public /health.
+"""
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from app.api.deps import decode_bearer, get_token_principal
+from app.core import db_pool, hashing, http_cache, metrics, principal_cache
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import get_db
+from app.services import autosave
+
+router = APIRouter()
+
+
+async def require_metrics_access(
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> None:
+    """The METRICS_TOKEN bearer (if configured), or an admin user's JWT."""
+    if settings.METRICS_TOKEN and authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token, settings.METRICS_TOKEN):
+            return
+    principal = await get_token_principal(await decode_bearer(authorization), db)
+    if principal.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+
+@router.get("/metrics", dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    """Cache (per key family and tier) and other process metrics, Prometheus text format."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/stats", dependencies=[Depends(require_metrics_access)])
+async def process_stats():
+    """Internal state of this worker, for operators."""
+    return {
+        "cache_tiers": cache.stats(),
+        "http_cache": http_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "hashing": hashing.stats(),
+        "db_pools": db_pool.stats(),
+        "autosave": autosave.stats(),
+    }
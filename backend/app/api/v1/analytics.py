@@ -1,7 +1,12 @@
 """
 Analytics API — N+1 fixed with aggregate SQL queries.
 All heavy reads now do one JOIN instead of nested Python loops.
-Leaderboard results are cached in Redis (gracefully skipped if Redis is down).
+Leaderboard results are cached in Redis (gracefully skipped if Redis is down),
+with concurrent misses coalesced by ``cache.get_or_compute``.
+
+Every route here reads through ``get_read_db``: the read replica when
+READ_DATABASE_URL is set and it is caught up, the primary otherwise (see the
+"Read replica" section of app/core/database.py).
 
 FIX: All ExamAttempt.status comparisons now use AttemptStatus.EVALUATED (the
 Enum member) instead of the raw string "evaluated".  SQLAlchemy stores the
@@ -9,7 +14,8 @@ Enum by its .value in Postgres, but comparisons must go through the Python
 Enum so SQLAlchemy generates the correct SQL.  Using a bare string produced
 zero rows and made every analytics endpoint return empty data.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
@@ -19,14 +25,14 @@ import csv
 import io
 import logging
 
-from app.core.database import get_db
-from app.core.cache import cache, key_leaderboard
+from app.core.cache import cache, key_leaderboard, tag_exam, tag_leaderboard
 from app.core.config import settings
+from app.core.query_stats import query_budget
 from app.models.user import User
 from app.models.exam import Exam
 from app.models.attempt import ExamAttempt, Response, AttemptStatus
 from app.models.question import Question
-from app.api.deps import get_current_user, require_role
+from app.api.deps import get_current_user, get_read_db, require_role
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -36,9 +42,10 @@ _EVALUATED = AttemptStatus.EVALUATED
 
 
 @router.get("/exam/{exam_id}/summary", response_model=dict)
+@query_budget(8)
 def get_exam_summary(
     exam_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
@@ -148,27 +155,7 @@ def get_exam_summary(
     }
 
 
-@router.get("/exam/{exam_id}/leaderboard", response_model=List[dict])
-async def get_leaderboard(
-    exam_id: UUID,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["examiner", "admin"]))
-):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
-    if not exam:
-        raise HTTPException(status_code=404, detail="Exam not found")
-    if str(exam.created_by) != str(current_user.id) and current_user.role.value != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    ckey = key_leaderboard(str(exam_id))
-    try:
-        cached = await cache.get(ckey)
-        if cached:
-            return cached
-    except Exception:
-        pass  # Redis unavailable — proceed to DB query
-
+def _leaderboard(db: Session, exam_id: UUID, limit: int) -> List[dict]:
     rows = db.query(
         ExamAttempt.id,
         ExamAttempt.score,
@@ -179,7 +166,7 @@ async def get_leaderboard(
      .order_by(ExamAttempt.score.desc()) \
      .limit(limit).all()
 
-    leaderboard = [
+    return [
         {
             "rank": i + 1,
             "student_name": row.full_name,
@@ -189,17 +176,36 @@ async def get_leaderboard(
         for i, row in enumerate(rows)
     ]
 
-    try:
-        await cache.set(ckey, leaderboard, ttl=settings.CACHE_TTL_LEADERBOARD)
-    except Exception:
-        pass  # Redis unavailable — skip caching
 
-    return leaderboard
+@router.get("/exam/{exam_id}/leaderboard", response_model=List[dict])
+@query_budget(4)
+async def get_leaderboard(
+    exam_id: UUID,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["examiner", "admin"]))
+):
+    # Sync session (possibly the replica): keep its queries off the event loop.
+    created_by = await run_in_threadpool(
+        lambda: db.query(Exam.created_by).filter(Exam.id == exam_id).scalar()
+    )
+    if created_by is None:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    if str(created_by) != str(current_user.id) and current_user.role.value != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return await cache.get_or_compute(
+        key_leaderboard(str(exam_id), limit),
+        lambda: _leaderboard(db, exam_id, limit),
+        ttl=settings.CACHE_TTL_LEADERBOARD,
+        tags=[tag_exam(str(exam_id)), tag_leaderboard(str(exam_id))],
+    )
 
 
 @router.get("/student/me/stats", response_model=dict)
+@query_budget(4)
 def get_student_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["student"]))
 ):
     stats = db.query(
@@ -220,8 +226,9 @@ def get_student_stats(
 
 
 @router.get("/examiner/stats", response_model=dict)
+@query_budget(4)
 def get_examiner_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
     counts = db.query(
@@ -242,9 +249,10 @@ def get_examiner_stats(
 
 
 @router.get("/exam/{exam_id}/export")
+@query_budget(4)
 def export_results(
     exam_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
     exam = db.query(Exam).filter(Exam.id == exam_id).first()
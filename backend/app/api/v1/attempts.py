@@ -1,32 +1,54 @@
 """
 Attempts API — exam start, submit, results, auto-save.
 
+Auto-save buffers answers in Redis and a background flusher writes them to
+``responses`` (app/services/autosave.py); submit merges whatever is still
+buffered with the final payload and writes only what is not stored yet.
+
 Submit flow
 -----------
 1. Validate + persist responses synchronously (always fast, just SQL inserts).
-2. Try to dispatch Celery evaluation task (async, best-effort).
+2. Try to dispatch Celery evaluation task (async, best-effort). At the
+   deadline, when the whole hall auto-submits at once, the attempt joins one
+   batch evaluation per exam instead (app/services/evaluation_dispatch.py).
 3. If Celery/Redis is unavailable, evaluate synchronously in-process instead.
    This guarantees the HTTP response always returns quickly regardless of
    whether Redis is running — critical for the Windows dev environment where
    Redis may not be installed.
+
+submit_exam is ``async`` and reads/writes through the asyncpg session
+(``get_async_db``); the synchronous evaluation fallback runs in the threadpool
+with its own sync session, so neither blocks the event loop.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response as FastAPIResponse, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel
 import logging
 
-from app.core.database import get_db
-from app.core.cache import cache, key_leaderboard
+from app.core.database import (
+    SessionLocal, get_async_db, get_db, stick_to_primary, stick_to_primary_sync,
+)
+from app.core import pagination
+from app.core.cache import cache, tag_leaderboard
+from app.core.config import settings
+from app.core.query_stats import query_budget
 from app.models.user import User
 from app.models.exam import Exam
 from app.models.attempt import ExamAttempt, Response, AttemptStatus
 from app.models.question import Question
-from app.schemas.response import AttemptCreate, AttemptSubmit, Attempt as AttemptSchema, GradeRequest
-from app.api.deps import get_current_user, require_role
+from app.schemas.response import (
+    AttemptCreate, AttemptSubmit, Attempt as AttemptSchema, GradeRequest, ResponseCreate,
+)
+from app.api.deps import get_current_user, get_read_db, require_role
+from app.services import attempt_sweeper, autosave, evaluation_dispatch, shuffle
 from app.services.evaluation_service import EvaluationService
+from app.services.exam_cache import compiled_answer_key
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +68,7 @@ router = APIRouter()
 
 
 class AutoSaveBody(BaseModel):
-    responses: List[dict]
+    responses: List[ResponseCreate]
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -67,15 +89,8 @@ def _try_celery(attempt_id: str) -> tuple[bool, dict | None]:
     try:
         # apply_async can block if the broker is slow to refuse.
         # We set a short socket timeout in celery_app.py (3 s), but as an
-        # extra safety net we run the dispatch in a thread with a 5 s timeout.
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-            future = pool.submit(
-                task_fn.apply_async,
-                args=[attempt_id],
-                kwargs={"queue": "evaluation"},
-            )
-            task = future.result(timeout=5)   # 5 s hard cap — never hangs the request
+        # extra safety net the dispatch runs in a thread with a 5 s cap.
+        task = evaluation_dispatch.apply_async_capped(task_fn, [attempt_id], queue="evaluation")
         return True, {"task_id": task.id}
     except Exception as e:
         logger.warning(
@@ -84,6 +99,22 @@ def _try_celery(attempt_id: str) -> tuple[bool, dict | None]:
         return False, None
 
 
+def _evaluate_sync(attempt_id: UUID) -> dict:
+    """Synchronous fallback evaluation in its own session (run in the threadpool)."""
+    db = SessionLocal()
+    try:
+        return EvaluationService(db).evaluate_attempt(attempt_id)
+    finally:
+        db.close()
+
+
+def _paper_positions(db: Session, attempt: ExamAttempt) -> dict:
+    """question id → its number on this attempt's (shuffled) paper, from the compiled answer key."""
+    answer_key = compiled_answer_key(db, attempt.exam_id)
+    seed = shuffle.seed_for(attempt.exam_id, attempt.student_id, attempt.id)
+    return shuffle.positions(seed, {qid: q.order for qid, q in answer_key.items()})
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
 @router.post("/start", response_model=AttemptSchema, status_code=status.HTTP_201_CREATED)
@@ -98,22 +129,22 @@ def start_exam(
     if exam.status.value != "live":
         raise HTTPException(status_code=400, detail="Exam is not live")
 
-    cutoff_time = datetime.utcnow() - timedelta(hours=24)
-
-    # Expire stale in-progress attempts (> 24 h old)
-    db.query(ExamAttempt).filter(
-        ExamAttempt.exam_id == attempt_data.exam_id,
-        ExamAttempt.student_id == current_user.id,
-        ExamAttempt.status == AttemptStatus.IN_PROGRESS,
-        ExamAttempt.started_at < cutoff_time,
-    ).update({"status": AttemptStatus.SUBMITTED})
+    # Close this student's attempt if its deadline has passed (the beat
+    # sweeper would within ATTEMPT_SWEEP_INTERVAL) and score it right away.
+    closed = attempt_sweeper.close_expired(
+        db, datetime.utcnow(), settings.ATTEMPT_SWEEP_BATCH,
+        exam_id=attempt_data.exam_id, student_id=current_user.id,
+    )
+    if closed:
+        db.commit()
+        autosave.discard_sync(attempt_id for attempt_id, _ in closed)
+        EvaluationService(db).evaluate_attempts([attempt_id for attempt_id, _ in closed])
 
-    # Resume existing valid attempt
+    # Resume the attempt still within its time
     existing = db.query(ExamAttempt).filter(
         ExamAttempt.exam_id == attempt_data.exam_id,
         ExamAttempt.student_id == current_user.id,
         ExamAttempt.status == AttemptStatus.IN_PROGRESS,
-        ExamAttempt.started_at >= cutoff_time,
     ).first()
     if existing:
         return existing
@@ -126,6 +157,7 @@ def start_exam(
     db.add(new_attempt)
     db.commit()
     db.refresh(new_attempt)
+    stick_to_primary_sync(current_user.id)
     return new_attempt
 
 
@@ -133,10 +165,13 @@ def start_exam(
 async def submit_exam(
     attempt_id: UUID,
     submission: AttemptSubmit,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["student"]))
 ):
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+    # FOR UPDATE: an auto-save flush for this attempt either finishes first or
+    # waits and then sees it submitted. Either way its answers are still in the
+    # buffer until it commits, so ``pending`` below sees them (app/services/autosave.py).
+    attempt = await db.get(ExamAttempt, attempt_id, with_for_update=True)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
     if str(attempt.student_id) != str(current_user.id):
@@ -146,30 +181,41 @@ async def submit_exam(
     if status_val != AttemptStatus.IN_PROGRESS.value:
         raise HTTPException(status_code=400, detail="Attempt already submitted")
 
-    # ── 1. Persist responses (fast SQL inserts) ───────────────────────────────
-    for rd in submission.responses:
-        db.add(Response(
-            attempt_id=attempt_id,
-            question_id=rd.question_id,
-            selected_option_ids=rd.selected_option_ids or [],
-            answer_text=rd.answer_text,
-            marked_for_review=rd.marked_for_review,
-        ))
+    # ── 1. Persist responses — only what auto-save has not already stored ────
+    # Buffered-but-unflushed answers, overridden by the final payload. The
+    # buffer is dropped only after the commit, so a failed submit loses nothing.
+    sheet = {**await autosave.pending(attempt_id), **autosave.sheet_from(submission.responses)}
+    await db.run_sync(autosave.write_tail, attempt_id, sheet)
 
     attempt.submitted_at = datetime.utcnow()
     attempt.time_taken_seconds = int(
         (attempt.submitted_at - attempt.started_at).total_seconds()
     )
     attempt.status = AttemptStatus.SUBMITTED
-    db.commit()
-
-    # ── 2. Try Celery (non-blocking, 5 s max) ────────────────────────────────
-    dispatched, task_info = _try_celery(str(attempt_id))
+    exam = await db.get(Exam, attempt.exam_id)
+    await db.commit()
+    await autosave.discard(attempt_id)
+    # The student's next reads (my-attempts, stats) must see this attempt even
+    # if the read replica hasn't replayed it yet.
+    await stick_to_primary(current_user.id)
+
+    # ── 2a. Deadline burst: leave it to the exam's batch evaluation ──────────
+    if evaluation_dispatch.in_deadline_burst(attempt.submitted_at, attempt.started_at,
+                                             exam.duration_minutes, exam.end_time):
+        if await evaluation_dispatch.join_exam_batch(str(attempt.exam_id)) is not None:
+            return {
+                "message": "Exam submitted successfully. Results will be ready shortly.",
+                "attempt_id": str(attempt_id),
+                "status": "evaluating",
+            }
+
+    # ── 2b. Try Celery (non-blocking, 5 s max) ───────────────────────────────
+    dispatched, task_info = await run_in_threadpool(_try_celery, str(attempt_id))
 
     if dispatched:
         # Cache busting — best-effort, don't let it block
         try:
-            await cache.delete(key_leaderboard(str(attempt.exam_id)))
+            await cache.invalidate_tag(tag_leaderboard(str(attempt.exam_id)))
         except Exception:
             pass
         return {
@@ -181,11 +227,10 @@ async def submit_exam(
 
     # ── 3. Synchronous fallback (always works, no Redis needed) ───────────────
     logger.info("Evaluating attempt %s synchronously (Celery unavailable).", attempt_id)
-    svc = EvaluationService(db)
-    result = svc.evaluate_attempt(attempt_id)
+    result = await run_in_threadpool(_evaluate_sync, attempt_id)
 
     try:
-        await cache.delete(key_leaderboard(str(attempt.exam_id)))
+        await cache.invalidate_tag(tag_leaderboard(str(attempt.exam_id)))
     except Exception:
         pass
 
@@ -270,6 +315,22 @@ def get_results(
     for t in topic_wise.values():
         t["percentage"] = round((t["correct"] / t["total"]) * 100, 1) if t["total"] else 0.0
 
+    # Per-question outcome, numbered as this student saw the paper.
+    positions = _paper_positions(db, attempt)
+    questions = sorted(
+        (
+            {
+                "position": positions.get(str(r.question_id)),
+                "question_id": str(r.question_id),
+                "is_correct": r.is_correct,
+                "marks_awarded": float(r.marks_awarded) if r.marks_awarded is not None else None,
+                "marked_for_review": bool(r.marked_for_review),
+            }
+            for r in responses
+        ),
+        key=lambda item: item["position"] or 0,
+    )
+
     return {
         "score": score,
         "obtained_marks": obtained_marks,
@@ -282,35 +343,75 @@ def get_results(
         "needs_grading": pending_grading > 0,
         "pending_grading": pending_grading,
         "topic_wise": topic_wise,
+        "questions": questions,
     }
 
 
 @router.get("/my-attempts", response_model=List[AttemptSchema])
+@query_budget(3)
 def get_my_attempts(
-    limit: int = 10,
-    db: Session = Depends(get_db),
+    response: FastAPIResponse,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["student"]))
 ):
-    return (
-        db.query(ExamAttempt)
-        .filter(ExamAttempt.student_id == current_user.id)
-        .order_by(ExamAttempt.started_at.desc())
-        .limit(limit)
-        .all()
-    )
+    """Newest attempts first; ``X-Next-Cursor`` → ``cursor`` for the next page."""
+    query = db.query(ExamAttempt).filter(ExamAttempt.student_id == current_user.id)
+    rows = pagination.paginate(query, ExamAttempt.started_at, ExamAttempt.id, cursor, limit).all()
+    pagination.set_next_cursor(response, rows, limit, "started_at")
+    return rows
 
 
 @router.post("/{attempt_id}/auto-save", status_code=200)
-def auto_save_progress(
+async def auto_save_progress(
     attempt_id: UUID,
     body: AutoSaveBody,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["student"]))
 ):
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+    """
+    Save answers mid-exam — send only the ones that changed. They are buffered
+    in Redis and written to the database in batches by the auto-save flusher;
+    without Redis they are written through. See app/services/autosave.py.
+    """
+    attempt = await db.get(ExamAttempt, attempt_id)
     if not attempt or str(attempt.student_id) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized")
-    return {"message": "Progress saved", "saved": len(body.responses)}
+    status_val = attempt.status.value if hasattr(attempt.status, "value") else str(attempt.status)
+    if status_val != AttemptStatus.IN_PROGRESS.value:
+        raise HTTPException(status_code=400, detail="Attempt already submitted")
+
+    sheet = autosave.sheet_from(body.responses)
+    buffered = await autosave.save(attempt_id, sheet)
+    if not buffered and sheet:
+        await db.run_sync(autosave.save_direct, attempt_id, sheet)
+        await db.commit()
+    return {"message": "Progress saved", "saved": len(sheet), "buffered": buffered}
+
+
+@router.get("/{attempt_id}/auto-save")
+async def get_saved_progress(
+    attempt_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role(["student"]))
+):
+    """Everything saved so far (stored rows plus anything still buffered) — for resuming after a reload."""
+    attempt = await db.get(ExamAttempt, attempt_id)
+    if not attempt or str(attempt.student_id) != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    rows = await db.execute(
+        select(Response.question_id, Response.selected_option_ids,
+               Response.answer_text, Response.marked_for_review)
+        .where(Response.attempt_id == attempt_id)
+    )
+    sheet = {
+        str(r.question_id): autosave.answer(r.selected_option_ids, r.answer_text, r.marked_for_review)
+        for r in rows
+    }
+    sheet.update(await autosave.pending(attempt_id))
+    return {"responses": [{"question_id": qid, **a} for qid, a in sheet.items()]}
 
 
 # ── Manual grading (coding / subjective) ────────────────────────────────────────
@@ -352,12 +453,14 @@ def get_grading_queue(
     def _qt(q):
         return q.question_type.value if hasattr(q.question_type, "value") else str(q.question_type)
 
+    positions = _paper_positions(db, attempt)
     items = []
     for r in responses:
         q = q_map.get(r.question_id)
         if not q or _qt(q) not in MANUAL_QUESTION_TYPES:
             continue
         items.append({
+            "position": positions.get(str(q.id)),
             "response_id": str(r.id),
             "question_id": str(q.id),
             "question_text": q.question_text,
@@ -368,6 +471,8 @@ def get_grading_queue(
             "answer_text": r.answer_text or "",
             "marks_awarded": float(r.marks_awarded) if r.marks_awarded is not None else None,
         })
+    # In the order the student answered them (their shuffled paper).
+    items.sort(key=lambda it: it["position"] or 0)
 
     return {
         "attempt_id": str(attempt_id),
@@ -418,6 +523,8 @@ def grade_attempt(
     attempt.status = AttemptStatus.EVALUATED
 
     db.commit()
+    # The examiner's summary/export right after grading should include these marks.
+    stick_to_primary_sync(current_user.id)
 
     def _qt(q):
         return q.question_type.value if hasattr(q.question_type, "value") else str(q.question_type)
@@ -1,35 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Body, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta, datetime
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from uuid import UUID
 import secrets
 
+from app.core import hashing, principal_cache, revocation
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import create_access_token, token_claims
 from app.core.config import settings
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, User as UserSchema
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_token_payload, require_role
 from app.services.email_service import send_verification_email, send_password_reset_email
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, enabled=settings.RATE_LIMIT_ENABLED)
 
 
 def _generate_token() -> str:
     return secrets.token_urlsafe(32)
 
 
+# Handlers that hash or verify passwords are async so bcrypt (in the
+# app.core.hashing process pool) never holds a request thread; their DB work
+# goes through these helpers on the threadpool instead of the event loop.
+
+def _user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _user_by_reset_token(db: Session, token: str):
+    return db.query(User).filter(User.reset_token == token).first()
+
+
+def _save(db: Session, user: User) -> None:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 @limiter.limit("10/minute")
-def register(
+async def register(
     request: Request,
     user_data: UserCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
-    existing = db.query(User).filter(User.email == user_data.email).first()
+    existing = await run_in_threadpool(_user_by_email, db, user_data.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     if user_data.role not in ["student", "examiner"]:
@@ -39,22 +60,20 @@ def register(
     expires = datetime.utcnow() + timedelta(hours=24)
     new_user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await hashing.hash_password(user_data.password),
         full_name=user_data.full_name,
         role=user_data.role,
         is_verified=False,
         verification_token=token,
         verification_token_expires=expires,
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(_save, db, new_user)
     background_tasks.add_task(send_verification_email, new_user.email, new_user.full_name, token)
     return {"message": "Registration successful! Check your email to verify.", "email": new_user.email}
 
 
 @router.get("/verify-email")
-def verify_email(token: str, db: Session = Depends(get_db)):
+def verify_email(token: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.verification_token == token).first()
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or already-used verification link.")
@@ -66,6 +85,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     user.verification_token = None
     user.verification_token_expires = None
     db.commit()
+    background_tasks.add_task(principal_cache.invalidate, str(user.id))
     return {"message": "Email verified successfully! You can now log in."}
 
 
@@ -96,9 +116,9 @@ DEMO_EMAILS = {"examiner@demo.com", "student@demo.com"}
 
 @router.post("/login")
 @limiter.limit("20/minute")
-def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+async def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_user_by_email, db, credentials.email)
+    if not user or not await hashing.verify_password(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -111,7 +131,7 @@ def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db
             detail="Email not verified. Check your inbox.",
         )
     access_token = create_access_token(
-        data={"sub": user.email},
+        data=token_claims(user),
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
     )
     role_str = user.role.value if hasattr(user.role, "value") else str(user.role)
@@ -149,21 +169,43 @@ def forgot_password(
 
 
 @router.post("/reset-password")
-def reset_password(
+async def reset_password(
+    background_tasks: BackgroundTasks,
     token: str = Body(...),
     new_password: str = Body(..., min_length=8),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.reset_token == token).first()
+    user = await run_in_threadpool(_user_by_reset_token, db, token)
     if not user or not user.reset_token_expires or user.reset_token_expires < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired reset link.")
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await hashing.hash_password(new_password)
     user.reset_token = None
     user.reset_token_expires = None
-    db.commit()
+    await run_in_threadpool(db.commit)
+    background_tasks.add_task(principal_cache.invalidate, str(user.id))
+    # Any token issued before the reset may belong to whoever knew the old password.
+    background_tasks.add_task(revocation.revoke_user_tokens, str(user.id))
     return {"message": "Password reset successfully. You can now log in."}
 
 
+@router.post("/logout")
+async def logout(payload: dict = Depends(get_token_payload)):
+    """Revoke the caller's access token for the rest of its lifetime."""
+    if payload.get("jti"):
+        await revocation.revoke_token(payload["jti"], payload.get("exp"))
+    return {"message": "Logged out"}
+
+
+@router.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(
+    user_id: UUID,
+    current_user: User = Depends(require_role(["admin"])),
+):
+    """Admin: invalidate every outstanding token for a (compromised) account."""
+    await revocation.revoke_user_tokens(str(user_id))
+    return {"message": "All existing tokens for this user have been revoked"}
+
+
 @router.get("/me", response_model=UserSchema)
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
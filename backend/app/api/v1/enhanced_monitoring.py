@@ -1,8 +1,14 @@
 """
 Enhanced Proctoring API Endpoints
 Handles real-time monitoring, health tracking, and configuration
+
+Every handler here is ``async`` (WebSockets live on the same worker), so they
+all use the asyncpg session from ``get_async_db``; the shared sync health
+writer in ``app.ai_monitor.health`` is called through ``db.run_sync``.
 """
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
@@ -12,8 +18,10 @@ import asyncio
 import logging
 from collections import defaultdict
 
-from app.core.database import get_db, SessionLocal
-from app.api.deps import get_current_user
+from app.core.database import AsyncSessionLocal, get_async_db, get_db
+from app.core.cache import cache, key_proctoring_settings
+from app.core.query_stats import query_budget
+from app.api.deps import get_current_user, get_token_principal, TokenPrincipal
 from app.core.security import decode_access_token
 from app.models.user import User
 from app.models.attempt import ExamAttempt, AttemptStatus
@@ -22,12 +30,19 @@ from app.models.exam import Exam
 # Import with alias to avoid name conflict with the Pydantic schema below
 from app.models.proctoring_settings import ProctoringSettings as ProctoringSettingsModel
 from app.ai_monitor import scoring, health as health_mod
+from app.services import exam_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def _settings_for(db: AsyncSession, exam_id) -> Optional[ProctoringSettingsModel]:
+    return await db.scalar(
+        select(ProctoringSettingsModel).where(ProctoringSettingsModel.exam_id == exam_id)
+    )
+
+
 # WebSocket connection manager for real-time updates
 class ConnectionManager:
     """Manages WebSocket connections for real-time proctoring"""
@@ -122,7 +137,7 @@ class ProctoringEvent(BaseModel):
 async def update_proctoring_settings(
     exam_id: UUID,
     settings: ExamProctoringConfig,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update proctoring settings for an exam (Examiner only)"""
@@ -132,7 +147,7 @@ async def update_proctoring_settings(
             detail="Only examiners can update proctoring settings"
         )
 
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
 
@@ -143,9 +158,7 @@ async def update_proctoring_settings(
         )
 
     # Upsert proctoring settings row
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == exam_id
-    ).first()
+    ps = await _settings_for(db, exam_id)
 
     if ps is None:
         ps = ProctoringSettingsModel(exam_id=exam_id)
@@ -164,7 +177,8 @@ async def update_proctoring_settings(
     ps.health_warning_threshold = settings.health_warning_threshold
     ps.auto_submit_on_zero_health = settings.auto_submit_on_zero_health
 
-    db.commit()
+    await db.commit()
+    await cache.delete(key_proctoring_settings(str(exam_id)))
 
     return {"message": "Proctoring settings updated successfully", "settings": settings}
 
@@ -172,42 +186,25 @@ async def update_proctoring_settings(
 @router.get("/exam/{exam_id}/proctoring-settings", response_model=ExamProctoringConfig)
 async def get_proctoring_settings(
     exam_id: UUID,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db),      # only used by exam_cache loaders, in the threadpool
     current_user: User = Depends(get_current_user)
 ):
-    """Get proctoring settings for an exam"""
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
-    if not exam:
+    """Get proctoring settings for an exam (cached; warmed when the exam goes live)"""
+    if await exam_cache.get_exam_meta(db, exam_id) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
 
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == exam_id
-    ).first()
-
+    ps = await exam_cache.get_proctoring_settings(db, exam_id)
     if ps is None:
         return ExamProctoringConfig()
-
-    return ExamProctoringConfig(
-        camera_enabled=ps.camera_enabled,
-        microphone_enabled=ps.microphone_enabled,
-        face_detection_enabled=ps.face_detection_enabled,
-        multiple_face_detection=ps.multiple_face_detection,
-        head_pose_detection=ps.head_pose_detection,
-        tab_switch_detection=ps.tab_switch_detection,
-        min_face_confidence=float(ps.min_face_confidence),
-        max_head_rotation=float(ps.max_head_rotation),
-        detection_interval=ps.detection_interval,
-        initial_health=ps.initial_health,
-        health_warning_threshold=ps.health_warning_threshold,
-        auto_submit_on_zero_health=ps.auto_submit_on_zero_health,
-    )
+    return ExamProctoringConfig(**ps)
 
 
 @router.post("/violation")
+@query_budget(5)
 async def report_violation(
     event: ProctoringEvent,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
     Report a client-detected proctoring violation (tab switch, fullscreen
@@ -219,21 +216,19 @@ async def report_violation(
     applied incrementally to the persisted column via the shared writer rather
     than replaying the whole cheat log on every request.
     """
-    attempt = db.query(ExamAttempt).filter(
+    attempt = await db.scalar(select(ExamAttempt).where(
         ExamAttempt.id == event.attempt_id,
         ExamAttempt.student_id == current_user.id
-    ).first()
+    ))
 
     if not attempt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam attempt not found")
 
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == attempt.exam_id
-    ).first()
+    ps = await _settings_for(db, attempt.exam_id)
     warning_threshold = ps.health_warning_threshold if ps else 40
 
-    record = health_mod.record_violations(
-        db, attempt, event.flags, ps=ps, event_type=event.event_type
+    record = await db.run_sync(
+        lambda s: health_mod.record_violations(s, attempt, event.flags, ps=ps, event_type=event.event_type)
     )
     health_status = record["health"]
 
@@ -256,11 +251,11 @@ async def report_violation(
 @router.get("/attempt/{attempt_id}/health")
 async def get_attempt_health(
     attempt_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get current health status for an attempt"""
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+    attempt = await db.get(ExamAttempt, attempt_id)
 
     if not attempt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attempt not found")
@@ -268,28 +263,26 @@ async def get_attempt_health(
     if current_user.role == 'student' and str(attempt.student_id) != str(current_user.id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == attempt.exam_id
-    ).first()
+    ps = await _settings_for(db, attempt.exam_id)
 
     # Reads the persisted health column (lazy-inits older NULL rows) instead of
     # replaying the whole cheat log on every poll.
-    return health_mod.current_health_status(db, attempt, ps=ps)
+    return await db.run_sync(lambda s: health_mod.current_health_status(s, attempt, ps=ps))
 
 
 @router.get("/attempt/{attempt_id}/violations")
 async def get_attempt_violations(
     attempt_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all violations for an attempt"""
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+    attempt = await db.get(ExamAttempt, attempt_id)
 
     if not attempt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attempt not found")
 
-    exam = db.query(Exam).filter(Exam.id == attempt.exam_id).first()
+    exam = await db.get(Exam, attempt.exam_id)
 
     if current_user.role == 'student':
         if str(attempt.student_id) != str(current_user.id):
@@ -298,9 +291,9 @@ async def get_attempt_violations(
         if str(exam.created_by) != str(current_user.id):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    violations = db.query(CheatLog).filter(
-        CheatLog.attempt_id == attempt_id
-    ).order_by(CheatLog.timestamp.desc()).all()
+    violations = (await db.scalars(
+        select(CheatLog).where(CheatLog.attempt_id == attempt_id).order_by(CheatLog.timestamp.desc())
+    )).all()
 
     violations_by_type = defaultdict(list)
     for v in violations:
@@ -329,7 +322,7 @@ async def get_attempt_violations(
 
 # ─── WebSocket ────────────────────────────────────────────────────────────────
 
-def _authorize_ws_attempt(token: Optional[str], attempt_id: str):
+async def _authorize_ws_attempt(token: Optional[str], attempt_id: str):
     """
     Validate the JWT (passed as a query param, since browsers can't set headers
     on a WebSocket) and confirm the caller may watch this attempt.
@@ -346,12 +339,16 @@ def _authorize_ws_attempt(token: Optional[str], attempt_id: str):
     if not email:
         return None
 
-    db = SessionLocal()
     try:
-        user = db.query(User).filter(User.email == email).first()
+        attempt_uuid = UUID(attempt_id)
+    except ValueError:
+        return None
+
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(User).where(User.email == email))
         if not user:
             return None
-        attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+        attempt = await db.get(ExamAttempt, attempt_uuid)
         if not attempt:
             return None
 
@@ -360,7 +357,7 @@ def _authorize_ws_attempt(token: Optional[str], attempt_id: str):
             if str(attempt.student_id) != str(user.id):
                 return None
         elif role == "examiner":
-            exam = db.query(Exam).filter(Exam.id == attempt.exam_id).first()
+            exam = await db.get(Exam, attempt.exam_id)
             if not exam or str(exam.created_by) != str(user.id):
                 return None
         elif role != "admin":
@@ -368,8 +365,6 @@ def _authorize_ws_attempt(token: Optional[str], attempt_id: str):
 
         db.expunge(attempt)
         return attempt
-    finally:
-        db.close()
 
 
 @router.websocket("/ws/proctoring/{attempt_id}")
@@ -385,7 +380,7 @@ async def proctoring_websocket(
     attempt's owner (student), the exam's examiner, or an admin. Previously this
     endpoint accepted ANY connection for ANY attempt id with no auth at all.
     """
-    attempt = _authorize_ws_attempt(token, attempt_id)
+    attempt = await _authorize_ws_attempt(token, attempt_id)
     if attempt is None:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
@@ -400,19 +395,12 @@ async def proctoring_websocket(
         })
 
         # Send the persisted health immediately (no full-log replay).
-        db = SessionLocal()
-        try:
-            attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+        async with AsyncSessionLocal() as db:
+            attempt = await db.get(ExamAttempt, attempt.id)
             if attempt:
-                ps = db.query(ProctoringSettingsModel).filter(
-                    ProctoringSettingsModel.exam_id == attempt.exam_id
-                ).first()
-                await websocket.send_json({
-                    "type": "health_update",
-                    "data": health_mod.current_health_status(db, attempt, ps=ps)
-                })
-        finally:
-            db.close()
+                ps = await _settings_for(db, attempt.exam_id)
+                data = await db.run_sync(lambda s: health_mod.current_health_status(s, attempt, ps=ps))
+                await websocket.send_json({"type": "health_update", "data": data})
 
         while True:
             data = await websocket.receive_json()
@@ -437,8 +425,8 @@ class RecoverRequest(BaseModel):
 @router.post("/recover")
 async def recover_health(
     req: RecoverRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenPrincipal = Depends(get_token_principal)
 ):
     """
     Restore a small amount of health for clean behaviour.
@@ -449,19 +437,17 @@ async def recover_health(
     the log, added the amount, and returned it WITHOUT saving — so the recovered
     HP vanished on the next request, making the whole feature a no-op.
     """
-    attempt = db.query(ExamAttempt).filter(
+    attempt = await db.scalar(select(ExamAttempt).where(
         ExamAttempt.id == req.attempt_id,
         ExamAttempt.student_id == current_user.id
-    ).first()
+    ))
 
     if not attempt:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attempt not found")
 
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == attempt.exam_id
-    ).first()
+    ps = await _settings_for(db, attempt.exam_id)
 
-    record = health_mod.recover(db, attempt, req.amount, ps=ps)
+    record = await db.run_sync(lambda s: health_mod.recover(s, attempt, req.amount, ps=ps))
 
     # Push updated health to WebSocket if connected
     await manager.send_health_update(str(req.attempt_id), record["health"])
@@ -477,24 +463,24 @@ async def recover_health(
 @router.get("/attempt/{attempt_id}/suspicion-score")
 async def get_suspicion_score(
     attempt_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Compute a 0-100 suspicion score for an attempt.
     Factors: violation frequency, severity weighting, timing clustering.
     """
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
+    attempt = await db.get(ExamAttempt, attempt_id)
     if not attempt:
         raise HTTPException(status_code=404, detail="Attempt not found")
 
-    exam = db.query(Exam).filter(Exam.id == attempt.exam_id).first()
+    exam = await db.get(Exam, attempt.exam_id)
     if current_user.role == 'student' and str(attempt.student_id) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
     if current_user.role == 'examiner' and str(exam.created_by) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    violations = db.query(CheatLog).filter(CheatLog.attempt_id == attempt_id).all()
+    violations = (await db.scalars(select(CheatLog).where(CheatLog.attempt_id == attempt_id))).all()
 
     if not violations:
         return {"score": 0, "label": "Clean", "breakdown": {}}
@@ -550,9 +536,10 @@ async def get_suspicion_score(
 # ── Live Proctoring Feed (examiner view) ───────────────────────────────
 
 @router.get("/exam/{exam_id}/live-feed")
+@query_budget(6)
 async def get_live_feed(
     exam_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -562,28 +549,47 @@ async def get_live_feed(
     if current_user.role not in ['examiner', 'admin']:
         raise HTTPException(status_code=403, detail="Examiners only")
 
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     if current_user.role == 'examiner' and str(exam.created_by) != str(current_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    from app.models.user import User as UserModel
-    active_attempts = db.query(ExamAttempt).filter(
-        ExamAttempt.exam_id == exam_id,
-        ExamAttempt.submitted_at == None  # noqa: E711 — still in progress
-    ).all()
+    # One query for the active attempts with their students, one for every
+    # attempt's violation count and latest flag — not two per attempt.
+    rows = (await db.execute(
+        select(ExamAttempt, User.full_name, User.email)
+        .outerjoin(User, User.id == ExamAttempt.student_id)
+        .where(
+            ExamAttempt.exam_id == exam_id,
+            ExamAttempt.submitted_at == None  # noqa: E711 — still in progress
+        )
+    )).all()
+
+    latest_flags = {}
+    if rows:
+        latest = (
+            select(
+                CheatLog.attempt_id,
+                CheatLog.flag_type,
+                CheatLog.severity,
+                CheatLog.timestamp,
+                func.count().over(partition_by=CheatLog.attempt_id).label("violation_count"),
+            )
+            .where(CheatLog.attempt_id.in_([attempt.id for attempt, _, _ in rows]))
+            .distinct(CheatLog.attempt_id)
+            .order_by(CheatLog.attempt_id, CheatLog.timestamp.desc().nulls_last())
+        )
+        latest_flags = {r.attempt_id: r for r in (await db.execute(latest)).all()}
 
-    ps = db.query(ProctoringSettingsModel).filter(
-        ProctoringSettingsModel.exam_id == exam_id
-    ).first()
+    ps = await _settings_for(db, exam_id)
     maximum = health_mod.initial_health(ps)
 
     feed = []
     dirty = False
-    for attempt in active_attempts:
-        student = db.query(UserModel).filter(UserModel.id == attempt.student_id).first()
-        violations = db.query(CheatLog).filter(CheatLog.attempt_id == attempt.id).all()
+    for attempt, full_name, email in rows:
+        flag = latest_flags.get(attempt.id)
+        violation_count = flag.violation_count if flag else 0
 
         # Read the persisted health column (lazy-init older NULL rows) instead
         # of replaying every student's full cheat log on each poll.
@@ -592,28 +598,27 @@ async def get_live_feed(
             dirty = True
 
         last_flag = None
-        if violations:
-            latest = max(violations, key=lambda v: v.timestamp)
+        if flag:
             last_flag = {
-                "type": latest.flag_type,
-                "severity": scoring.normalize_severity(latest.severity),
-                "timestamp": latest.timestamp.isoformat()
+                "type": flag.flag_type,
+                "severity": scoring.normalize_severity(flag.severity),
+                "timestamp": flag.timestamp.isoformat()
             }
 
-        health = health_mod.health_status(current, maximum, len(violations))
+        health = health_mod.health_status(current, maximum, violation_count)
         feed.append({
             "attempt_id": str(attempt.id),
-            "student_name": student.full_name if student else "Unknown",
-            "student_email": student.email if student else "",
+            "student_name": full_name or "Unknown",
+            "student_email": email or "",
             "health_percentage": health["percentage"],
             "health_status": health["status"],
-            "violation_count": len(violations),
+            "violation_count": violation_count,
             "last_flag": last_flag,
             "started_at": attempt.started_at.isoformat() if attempt.started_at else None,
         })
 
     if dirty:
-        db.commit()
+        await db.commit()
 
     feed.sort(key=lambda x: x["violation_count"], reverse=True)
 
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status as http_status, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Request, Response, status as http_status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional, Union
 from uuid import UUID
 
-from app.core.database import get_db
-from app.core.cache import cache, key_exam_questions, key_exam_meta
-from app.core.config import settings
+from app.core.database import get_async_db, get_db
+from app.core import http_cache, pagination
+from app.core.cache import cache, tag_exam
+from app.core.query_stats import query_budget
 from app.models.user import User
 from app.models.exam import Exam, ExamStatus
 from app.models.question import Question
-from app.schemas.exam import ExamCreate, ExamUpdate, Exam as ExamSchema
+from app.schemas.exam import ExamCreate, ExamUpdate, Exam as ExamSchema, ExamSummary
 from app.api.deps import get_current_user, require_role
+from app.services import evaluation_dispatch, exam_cache, paper_sections, shuffle
 
 router = APIRouter()
 
@@ -36,41 +42,73 @@ def create_exam(
     return new_exam
 
 
-@router.get("/", response_model=List[ExamSchema])
+# Columns for ?view=compact — everything but the free-text description.
+_SUMMARY_COLUMNS = (
+    Exam.id, Exam.title, Exam.status, Exam.duration_minutes, Exam.total_marks, Exam.pass_percentage,
+    Exam.start_time, Exam.end_time, Exam.created_by, Exam.created_at, Exam.updated_at,
+)
+_DEFAULT_PAGE = 100
+
+
+@router.get("/", response_model=Union[List[ExamSchema], List[ExamSummary]])
+@query_budget(2)
 def list_exams(
+    response: Response,
     status_filter: Optional[str] = Query(None, alias="status"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    view: Literal["full", "compact"] = "full",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Exam)
+    """
+    Newest exams first. Pass ``limit`` to page: the ``X-Next-Cursor``
+    response header goes back as ``cursor`` for the next page (see
+    app/core/pagination.py); a cursor alone pages by _DEFAULT_PAGE. Without
+    either, every exam comes back in one list, as it always has for the
+    dashboards. ``view=compact`` skips the description: it returns
+    ``ExamSummary`` rows, pre-serialised, hence the union model.
+    """
+    compact = view == "compact"
+    query = db.query(*_SUMMARY_COLUMNS) if compact else db.query(Exam)
     role = current_user.role.value if hasattr(current_user.role, "value") else str(current_user.role)
 
     if role == "examiner":
         query = query.filter(Exam.created_by == current_user.id)
     elif role == "student":
         query = query.filter(Exam.status == ExamStatus.LIVE)
-        return query.order_by(Exam.created_at.desc()).all()
 
-    if status_filter:
+    if status_filter and role != "student":
         query = query.filter(Exam.status == status_filter)
 
-    return query.order_by(Exam.created_at.desc()).all()
+    if limit is None and cursor is None:
+        rows = query.order_by(Exam.created_at.desc(), Exam.id.desc()).all()
+    else:
+        limit = limit or _DEFAULT_PAGE
+        rows = pagination.paginate(query, Exam.created_at, Exam.id, cursor, limit).all()
+        pagination.set_next_cursor(response, rows, limit, "created_at")
+
+    if compact:
+        body = [ExamSummary.model_validate(r).model_dump(mode="json") for r in rows]
+        next_cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        return JSONResponse(body, headers={pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+    return rows
 
 
 @router.get("/{exam_id}", response_model=ExamSchema)
-def get_exam(
+async def get_exam(
     exam_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await exam_cache.get_exam_meta(db, exam_id)
     if not exam:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Exam not found")
 
-    if current_user.role == "examiner" and str(exam.created_by) != str(current_user.id):
+    if current_user.role == "examiner" and exam["created_by"] != str(current_user.id):
         raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Not authorized")
 
-    if current_user.role == "student" and exam.status != ExamStatus.LIVE:
+    if current_user.role == "student" and exam["status"] != ExamStatus.LIVE.value:
         raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Exam not available")
 
     return exam
@@ -80,10 +118,10 @@ def get_exam(
 async def update_exam(
     exam_id: UUID,
     exam_data: ExamUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Exam not found")
     if str(exam.created_by) != str(current_user.id):
@@ -92,41 +130,39 @@ async def update_exam(
     for field, value in exam_data.dict(exclude_unset=True).items():
         setattr(exam, field, value)
 
-    db.commit()
-    db.refresh(exam)
-    # Invalidate caches
-    await cache.delete(key_exam_meta(str(exam_id)))
-    await cache.delete(key_exam_questions(str(exam_id)))
+    await db.commit()
+    await db.refresh(exam)
+    await cache.invalidate_tag(tag_exam(str(exam_id)))
     return exam
 
 
 @router.delete("/{exam_id}", status_code=http_status.HTTP_204_NO_CONTENT)
 async def delete_exam(
     exam_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Exam not found")
     if str(exam.created_by) != str(current_user.id):
         raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Not authorized")
 
-    db.delete(exam)
-    db.commit()
-    await cache.delete(key_exam_meta(str(exam_id)))
-    await cache.delete(key_exam_questions(str(exam_id)))
+    await db.delete(exam)
+    await db.commit()
+    await cache.invalidate_tag(tag_exam(str(exam_id)))
     return None
 
 
 @router.patch("/{exam_id}/status", response_model=ExamSchema)
 async def update_exam_status(
     exam_id: UUID,
+    background_tasks: BackgroundTasks,
     new_status: str = Query(..., alias="status"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Exam not found")
     if str(exam.created_by) != str(current_user.id):
@@ -135,69 +171,149 @@ async def update_exam_status(
         raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail="Invalid status")
 
     if new_status == "live":
-        questions = db.query(Question).filter(Question.exam_id == exam_id).all()
-        if questions:
-            exam.total_marks = sum(q.marks for q in questions)
+        count, marks = (await db.execute(
+            select(func.count(Question.id), func.sum(Question.marks)).where(Question.exam_id == exam_id)
+        )).one()
+        if count:
+            exam.total_marks = marks
 
     exam.status = ExamStatus(new_status)
-    db.commit()
-    db.refresh(exam)
-    await cache.delete(key_exam_meta(str(exam_id)))
+    await db.commit()
+    await db.refresh(exam)
+    await cache.invalidate_tag(tag_exam(str(exam_id)))
+    if new_status == "live":
+        # Students pile in right after this — have their caches ready first.
+        background_tasks.add_task(exam_cache.warm_exam_in_background, exam_id)
+    elif new_status == "ended":
+        # Evaluate whatever the deadline burst left SUBMITTED, one batch for the exam.
+        background_tasks.add_task(evaluation_dispatch.queue_exam_batch, str(exam_id))
     return exam
 
 
 @router.get("/{exam_id}/questions", response_model=List[dict])
+@query_budget(3)
 async def get_exam_questions(
     exam_id: UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    attempt_id: Optional[UUID] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get questions for an exam — the one route for both roles.
+
+    Students get the cached student view (no ``is_correct`` /
+    ``reference_answer``), and only while the exam is live. It is cached in
+    Redis for CACHE_TTL_EXAM_QUESTIONS seconds (default 5 min) — so 500
+    students joining simultaneously only produce one DB query, not 500.
+    ``get_or_compute`` coalesces the misses when the exam goes live or the
+    entry expires, and refreshes it early under load. The exam itself comes
+    from the meta cache, so a warm hit touches no DB. The response is served
+    pre-rendered (JSON bytes, gzip/brotli variants) with an ETag, and a client
+    that already holds the current version gets a bodiless 304 — see
+    app/core/http_cache.py.
+
+    With ``?attempt_id=`` the student gets their own question and option
+    order, applied over the same cached payload (app/services/shuffle.py).
+    Its ETag is derived from the base one, so a 304 still costs no rendering.
+    Long papers can instead be fetched a section at a time via
+    ``/questions/manifest`` and ``/questions/sections/{n}``.
+
+    Examiners (their own exams) and admins get the full questions with
+    answers, read from the DB in one eager-loaded query so edits show up
+    immediately. Adding, importing or deleting a question drops the cached
+    view through ``tag_exam``.
+    """
+    exam = await exam_cache.get_exam_meta(db, exam_id)
+    _require_paper_access(exam, current_user)
+
+    if current_user.role == "student":
+        rendered = await exam_cache.get_questions_rendered(db, exam_id)
+        seed = _paper_seed(exam_id, current_user, attempt_id)
+        if seed is None:
+            return http_cache.respond(request, rendered)
+
+        etag = shuffle.variant_etag(rendered["etag"], seed)
+        unchanged = http_cache.not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
+        paper = await _student_paper(db, exam_id, seed)
+        return http_cache.respond(request, http_cache.render(paper, etag=etag), memoise=False)
+
+    return await run_in_threadpool(exam_cache.load_questions_full, db, exam_id)
+
+
+@router.get("/{exam_id}/questions/manifest", response_model=dict)
+@query_budget(3)
+async def get_questions_manifest(
+    exam_id: UUID,
+    request: Request,
     db: Session = Depends(get_db),
+    attempt_id: Optional[UUID] = Query(None),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get questions for an exam.
-    Response is cached in Redis for CACHE_TTL_EXAM_QUESTIONS seconds
-    (default 5 min) — so 500 students joining simultaneously only produce
-    one DB query, not 500.
+    The paper's outline without question bodies: ids, types, marks, topics
+    and section boundaries, each section with its ETag. Fetch bodies with
+    ``/questions/sections/{n}`` — see app/services/paper_sections.py.
     """
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await exam_cache.get_exam_meta(db, exam_id)
+    _require_paper_access(exam, current_user)
+
+    seed = _paper_seed(exam_id, current_user, attempt_id)
+    base_etag = (await exam_cache.get_questions_rendered(db, exam_id))["etag"]
+    etag = paper_sections.part_etag(base_etag, seed, "manifest")
+    unchanged = http_cache.not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    paper = await _student_paper(db, exam_id, seed)
+    return http_cache.respond(request, http_cache.render(paper_sections.manifest(paper, base_etag, seed), etag=etag),
+                              memoise=seed is None)
+
+
+@router.get("/{exam_id}/questions/sections/{section}", response_model=List[dict])
+@query_budget(3)
+async def get_questions_section(
+    exam_id: UUID,
+    request: Request,
+    section: int = Path(..., ge=0),
+    db: Session = Depends(get_db),
+    attempt_id: Optional[UUID] = Query(None),
+    current_user: User = Depends(get_current_user)
+):
+    """One section of the student view, in the same order as the manifest, with its own ETag."""
+    exam = await exam_cache.get_exam_meta(db, exam_id)
+    _require_paper_access(exam, current_user)
+
+    seed = _paper_seed(exam_id, current_user, attempt_id)
+    base_etag = (await exam_cache.get_questions_rendered(db, exam_id))["etag"]
+    etag = paper_sections.part_etag(base_etag, seed, str(section))
+    unchanged = http_cache.not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    paper = await _student_paper(db, exam_id, seed)
+    if section >= paper_sections.section_count(len(paper)):
+        raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Section not found")
+    return http_cache.respond(request, http_cache.render(paper_sections.section(paper, section), etag=etag),
+                              memoise=seed is None)
+
+
+def _require_paper_access(exam: Optional[dict], current_user: User) -> None:
     if not exam:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail="Exam not found")
-    if current_user.role == "student" and exam.status != ExamStatus.LIVE:
+    if current_user.role == "student" and exam["status"] != ExamStatus.LIVE.value:
         raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Exam not available")
+    if current_user.role == "examiner" and exam["created_by"] != str(current_user.id):
+        raise HTTPException(status_code=http_status.HTTP_403_FORBIDDEN, detail="Not authorized")
+
+
+def _paper_seed(exam_id: UUID, current_user: User, attempt_id: Optional[UUID]) -> Optional[bytes]:
+    """Shuffle seed for a student's own attempt; None means the base order."""
+    if attempt_id is None or current_user.role != "student" or not shuffle.enabled():
+        return None
+    return shuffle.seed_for(exam_id, current_user.id, attempt_id)
 
-    cache_key = key_exam_questions(str(exam_id))
-    cached = await cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # FIX: use joinedload to eliminate N+1 — one query for questions + options
-    questions = (
-        db.query(Question)
-        .options(joinedload(Question.options))
-        .filter(Question.exam_id == exam_id)
-        .order_by(Question.display_order)
-        .all()
-    )
 
-    result = []
-    for q in questions:
-        result.append({
-            "id": str(q.id),
-            "exam_id": str(q.exam_id),
-            "question_text": q.question_text,
-            "question_type": str(q.question_type).replace("QuestionType.", ""),
-            "marks": q.marks,
-            "topic": q.topic,
-            "display_order": q.display_order,
-            "options": [
-                {
-                    "id": str(opt.id),
-                    "option_text": opt.option_text,
-                    "is_correct": opt.is_correct,
-                    "display_order": opt.display_order,
-                }
-                for opt in sorted(q.options, key=lambda x: x.display_order)
-            ],
-        })
-
-    await cache.set(cache_key, result, ttl=settings.CACHE_TTL_EXAM_QUESTIONS)
-    return result
+async def _student_paper(db: Session, exam_id: UUID, seed: Optional[bytes]) -> List[dict]:
+    payload = await exam_cache.get_questions_payload(db, exam_id)
+    return shuffle.apply(payload, seed) if seed is not None else payload
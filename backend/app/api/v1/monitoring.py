@@ -5,6 +5,11 @@ Frame and audio uploads return 202 immediately when Celery/Redis is available.
 When Redis is down (local dev), we skip straight to synchronous analysis using
 module-level detector singletons — so MediaPipe only loads once per process,
 not once per request.
+
+The upload handlers are ``async`` and use the asyncpg session
+(``get_async_db``). In the sync fallback the detector runs in the threadpool
+and the shared health writer runs through ``AsyncSession.run_sync``, so a
+slow frame never stalls the other requests on the worker.
 """
 import base64
 import logging
@@ -12,16 +17,20 @@ import threading
 import time
 from collections import deque
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 from uuid import UUID
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.cache import cache
+from app.core.local_cache import LocalCache
 from app.models.user import User
 from app.models.attempt import ExamAttempt
 from app.models.cheat_log import CheatLog
-from app.api.deps import get_current_user, require_role
+from app.api.deps import get_current_user, require_token_role, TokenPrincipal
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -55,6 +64,33 @@ def _check_rate_limit(attempt_id: str) -> bool:
                 _rate_state.pop(k, None)
         return True
 
+# ── Attempt ownership cache ────────────────────────────────────────────────────
+# An attempt's student never changes, so the ownership check on every upload is
+# served from memory after the first frame. Together with the claims-only
+# principal this means the Celery fast path never checks out a DB connection
+# (the request Session is lazy and stays unused).
+_attempt_owners = LocalCache(max_entries=20000, ttl=3600)
+
+
+async def _attempt_owner(db: AsyncSession, attempt_id: UUID) -> Optional[str]:
+    key = str(attempt_id)
+    owner = _attempt_owners.get(key)
+    if owner is None:
+        student_id = await db.scalar(select(ExamAttempt.student_id).where(ExamAttempt.id == attempt_id))
+        if student_id is None:
+            return None
+        owner = str(student_id)
+        _attempt_owners.set(key, owner)
+    return owner
+
+
+async def _check_attempt_owner(db: AsyncSession, attempt_id: UUID, principal: TokenPrincipal) -> None:
+    owner = await _attempt_owner(db, attempt_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    if owner != str(principal.id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
 # ── Sync-fallback singletons ───────────────────────────────────────────────────
 # Loaded lazily on first use, then reused for the lifetime of the process.
 # This mirrors what the Celery worker does — load once, analyze many.
@@ -94,9 +130,10 @@ def _get_celery_tasks():
     return analyze_frame_task, analyze_audio_task
 
 
-def _persist_flags_sync(attempt_id: str, flags: list, db: Session, event_type: str = "frame_analysis"):
+def _persist_flags_sync(db: Session, attempt_id: str, flags: list, event_type: str = "frame_analysis"):
     """
-    Persist flags AND apply the health penalty using the request DB session.
+    Persist flags AND apply the health penalty using the request DB session
+    (the sync view of it — call via ``await db.run_sync(_persist_flags_sync, ...)``).
 
     Delegates to the shared ``app.ai_monitor.health.record_violations`` writer
     so the sync path stays identical to the Celery worker path. Returns the
@@ -127,14 +164,10 @@ def _persist_flags_sync(attempt_id: str, flags: list, db: Session, event_type: s
 async def analyze_frame(
     attempt_id: UUID = Form(...),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["student"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenPrincipal = Depends(require_token_role(["student"]))
 ):
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
-    if not attempt:
-        raise HTTPException(status_code=404, detail="Attempt not found")
-    if str(attempt.student_id) != str(current_user.id):
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await _check_attempt_owner(db, attempt_id, current_user)
 
     attempt_id_str = str(attempt_id)
     if not _check_rate_limit(attempt_id_str):
@@ -159,11 +192,11 @@ async def analyze_frame(
     try:
         from app.ai_monitor import snapshot
 
-        result = _get_face_detector_sync().analyze_frame(image_bytes)
+        result = await run_in_threadpool(lambda: _get_face_detector_sync().analyze_frame(image_bytes))
         record = None
         if result.get("flags"):
-            snapshot.attach_snapshots(image_bytes, result["flags"])
-            record = _persist_flags_sync(attempt_id_str, result["flags"], db)
+            await run_in_threadpool(snapshot.attach_snapshots, image_bytes, result["flags"])
+            record = await db.run_sync(_persist_flags_sync, attempt_id_str, result["flags"])
         response = {"queued": False, "sync": True, "result": result}
         if record:
             response["health"] = record["health"]
@@ -178,14 +211,10 @@ async def analyze_frame(
 async def analyze_audio(
     attempt_id: UUID = Form(...),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["student"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenPrincipal = Depends(require_token_role(["student"]))
 ):
-    attempt = db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
-    if not attempt:
-        raise HTTPException(status_code=404, detail="Attempt not found")
-    if str(attempt.student_id) != str(current_user.id):
-        raise HTTPException(status_code=403, detail="Not authorized")
+    await _check_attempt_owner(db, attempt_id, current_user)
 
     attempt_id_str = str(attempt_id)
     if not _check_rate_limit("audio:" + attempt_id_str):
@@ -206,14 +235,14 @@ async def analyze_audio(
             logger.warning("apply_async failed despite Redis ping (%s) — falling through to sync", e)
 
     try:
-        result = _get_audio_analyzer_sync().analyze_audio(audio_bytes)
+        result = await run_in_threadpool(lambda: _get_audio_analyzer_sync().analyze_audio(audio_bytes))
         record = None
         if result.get("flags"):
             flags_as_dicts = [
                 {"type": f, "severity": result.get("severity", "medium"), "message": f}
                 for f in result["flags"]
             ]
-            record = _persist_flags_sync(attempt_id_str, flags_as_dicts, db, event_type="audio_detection")
+            record = await db.run_sync(_persist_flags_sync, attempt_id_str, flags_as_dicts, "audio_detection")
         response = {"queued": False, "sync": True, "result": result}
         if record:
             response["health"] = record["health"]
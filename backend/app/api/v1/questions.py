@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Literal, Optional
 from uuid import UUID
 from app.core.database import get_db
+from app.core.cache import cache, tag_exam
 from app.models.user import User
 from app.models.exam import Exam
 from app.models.question import Question, Option
 from app.schemas.question import QuestionCreate, Question as QuestionSchema
-from app.api.deps import get_current_user, require_role
+from app.api.deps import require_role
+from app.services import question_import
 
 router = APIRouter()
 
@@ -15,6 +18,7 @@ router = APIRouter()
 def add_question(
     exam_id: UUID,
     question_data: QuestionCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
@@ -35,31 +39,11 @@ def add_question(
             detail="Not authorized to modify this exam"
         )
     
-    # Validate question type
-    if question_data.question_type not in ["single", "multiple", "coding", "subjective"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid question type"
-        )
-
+    problem = question_import.validate_question(question_data)
+    if problem:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=problem)
     is_manual = question_data.question_type in ("coding", "subjective")
 
-    # MCQ questions need at least 2 options and a correct answer. Coding /
-    # subjective questions are graded manually and carry no options.
-    if not is_manual:
-        if len(question_data.options) < 2:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="At least 2 options required"
-            )
-
-        correct_options = [opt for opt in question_data.options if opt.is_correct]
-        if len(correct_options) == 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="At least one correct option required"
-            )
-
     # Create question
     new_question = Question(
         exam_id=exam_id,
@@ -88,43 +72,80 @@ def add_question(
 
     db.commit()
     db.refresh(new_question)
+    # Cached payload and answer key for this exam are now stale.
+    background_tasks.add_task(cache.invalidate_tag, tag_exam(str(exam_id)))
 
     return new_question
 
-@router.get("/{exam_id}/questions", response_model=List[QuestionSchema])
-def list_questions(
+_FORMATS = {"application/x-ndjson": "jsonl", "application/jsonl": "jsonl", "text/csv": "csv"}
+
+
+async def _read_capped(request: Request, limit: int) -> bytes:
+    """The request body, or 413 as soon as it is known to exceed ``limit`` bytes."""
+    too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                              detail=f"Import files are limited to {limit // (1024 * 1024)} MB")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:       # no or wrong Content-Length
+            raise too_large
+    return bytes(body)
+
+
+@router.post("/{exam_id}/questions/import", status_code=status.HTTP_201_CREATED)
+async def import_questions(
     exam_id: UUID,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[Literal["jsonl", "csv"]] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
     """
-    List all questions for an exam
+    Bulk-add questions from a JSON-lines or CSV body (Examiner only).
+
+    The format comes from ``?format=`` or the Content-Type
+    (application/x-ndjson, text/csv). Every row is validated first; if any is
+    invalid nothing is imported and the response is 422 with
+    ``{"errors": [{"row", "error"}, ...]}``. Bodies over MAX_IMPORT_BYTES are
+    refused with 413 before they are read in full. See
+    app/services/question_import.py for the CSV columns.
     """
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
-    
+    exam = await run_in_threadpool(lambda: db.query(Exam).filter(Exam.id == exam_id).first())
     if not exam:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
+    if exam.created_by != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to modify this exam")
+
+    fmt = format or _FORMATS.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Exam not found"
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send JSON lines or CSV (set Content-Type or ?format=jsonl|csv)",
         )
-    
-    # Check permissions
-    if current_user.role == "student" and exam.status != "live":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Exam is not available"
-        )
-    
-    questions = db.query(Question).filter(
-        Question.exam_id == exam_id
-    ).order_by(Question.display_order).all()
-    
-    return questions
+    body = await _read_capped(request, question_import.MAX_IMPORT_BYTES)
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be UTF-8")
+
+    try:
+        imported = await run_in_threadpool(question_import.import_questions, db, exam_id, text, fmt)
+    except question_import.InvalidImport as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail={"errors": e.errors})
+
+    background_tasks.add_task(cache.invalidate_tag, tag_exam(str(exam_id)))
+    return {"imported": imported}
+
 
 @router.delete("/{exam_id}/questions/{question_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_question(
     exam_id: UUID,
     question_id: UUID,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(["examiner", "admin"]))
 ):
@@ -158,5 +179,6 @@ def delete_question(
     
     db.delete(question)
     db.commit()
+    background_tasks.add_task(cache.invalidate_tag, tag_exam(str(exam_id)))
     
     return None
\ No newline at end of file
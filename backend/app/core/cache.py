@@ -6,20 +6,189 @@ Usage:
     await cache.get("key")
     await cache.set("key", value, ttl=60)
     await cache.delete("key")
-    await cache.delete_pattern("exam:*")
+    await cache.set("key", value, ttl=60, tags=[tag_exam(exam_id)])
+    await cache.invalidate_tag(tag_exam(exam_id))
+    await cache.get_or_compute("key", loader, ttl=60, tags=[...])
+    await cache.get_many(keys, loader=load_missing, ttl=60)   # one MGET
+    await cache.set_many({key: value, ...}, ttl=60)           # one pipeline
+    await cache.delete_many(keys)
+    cache.get_sync("key")      # Celery workers / sync code (no L1)
+
+── Two tiers ────────────────────────────────────────────────────────────────────
+During a live exam every student polls the same handful of keys (the question
+payload, the leaderboard, their own principal), so even a Redis GET + JSON
+decode per request adds up. Key families listed in CACHE_L1_FAMILIES therefore
+get an in-process L1 (TTL + LRU, bounded in bytes per family) in front of
+Redis (L2):
+
+  get     L1 → Redis → fill L1
+  set     Redis + L1, then tell the other workers to drop their copy
+  delete  Redis + L1, then tell the other workers to drop their copy
+
+Coherence across workers is via Redis pub/sub on INVALIDATION_CHANNEL. Each
+process tags its messages with an origin id and ignores its own. If the
+subscription drops, the whole L1 is cleared and re-subscribed; CACHE_L1_TTL
+bounds staleness if a message is ever lost. Without Redis the L1 still works
+per-process and only the TTL bounds staleness.
+
+L1 values are shared between requests — treat anything ``get`` returns as
+read-only. Families are derived from keys by replacing id-like segments with
+``*`` (``exam:<uuid>:questions`` → ``exam:*:questions``), see ``key_family``.
+Values are stored in the binary format of ``app.core.codec``.
+
+── Metrics ──────────────────────────────────────────────────────────────────────
+Every operation is counted and timed per key family and tier (l1 / l2) in
+``app.core.metrics`` — hit ratio, latency histograms, value sizes, errors,
+single-flight and invalidation activity, L1 occupancy — and exposed in
+Prometheus format on GET /api/v1/admin/metrics. Errors are still swallowed
+(the cache must never take a request down), but they are counted now rather
+than only logged at debug level.
+
+── Tags ─────────────────────────────────────────────────────────────────────────
+This Redis is also the Celery broker, so nothing here may run ``KEYS``: it is
+O(keyspace) and blocks every other client, including frame-analysis dispatch.
+Instead ``set(..., tags=[...])`` records the key in a Redis set per tag
+(``tag:exam:<id>``), and ``invalidate_tag`` walks that set with SSCAN and
+UNLINKs its members in batches of TAG_BATCH. ``delete_pattern`` is kept for
+ad-hoc glob deletes but uses SCAN.
+
+Each invalidation also bumps ``taggen:<tag>`` first. A sync writer that read
+the database before an edit could otherwise store the pre-edit value right
+after the edit's invalidation ran; passing ``tag_generations_sync`` (taken
+before the read) to ``set_sync`` makes that write a no-op instead.
+
+── Stampede protection ──────────────────────────────────────────────────────────
+When an exam goes live, or its question payload expires, every student misses
+at the same instant. ``get_or_compute`` makes sure only one of them runs the
+loader:
+
+  * in-process  concurrent misses for a key await one shared future;
+  * cross-process  the computing worker holds ``lock:<key>`` (SET NX, short
+    TTL); other workers poll the cache until the value lands, and compute
+    themselves only if the lock holder has not finished within the lock TTL;
+  * early refresh  values are stored with how long they took to compute, and
+    a reader recomputes *before* expiry with a probability that rises as
+    expiry nears (XFetch). Only the reader that wins the lock refreshes; the
+    rest keep serving the current value, so a hot key never expires under load.
+
+Values written by ``get_or_compute`` are wrapped in a small envelope; ``get``
+unwraps it, so plain readers of the same key are unaffected.
+
+── Batches ──────────────────────────────────────────────────────────────────────
+Pages about N attempts / N exams / N users (live feed, dashboards, token
+checks) would otherwise make N round trips. ``get_many`` serves what it can
+from L1, fetches the rest with one MGET, and — if given a loader — calls it
+once with only the keys still missing and stores its results with
+``set_many``. The result has an entry only for keys that were found or loaded
+(partial hits are normal). Batch loads are not single-flighted.
 """
+import asyncio
+import inspect
 import json
 import logging
-from typing import Any, Optional
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+import redis
 import redis.asyncio as aioredis
+from fastapi.concurrency import run_in_threadpool
+from app.core import codec, metrics
 from app.core.config import settings
+from app.core.local_cache import LocalCache
 
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = "cache:invalidate"
+TAG_BATCH = 500
+LOCK_POLL_SECONDS = 0.05
+SYNC_RETRY_SECONDS = 30
+_ENVELOPE = "__gc__"
+_RETRY = object()      # single-flight result when the leader was cancelled
+
+# Compare-and-delete so a worker whose lock expired can't release someone else's.
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+# SET plus tag registration, only if none of the tags was invalidated since the
+# caller read their generations. KEYS: key, n generation keys, n tag sets.
+# ARGV: value, ttl, n, tag-set ttl, then the n generations read earlier.
+_SET_IF_GENERATIONS = """
+local n = tonumber(ARGV[3])
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + i]) or '') ~= ARGV[4 + i] then return 0 end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, n do
+    redis.call('SADD', KEYS[1 + n + i], KEYS[1])
+    redis.call('EXPIRE', KEYS[1 + n + i], ARGV[4])
+end
+return 1
+"""
+
+# Anything containing a digit (ids, IPs, counters) or a long hex run is an id.
+_ID_SEGMENT = re.compile(r"\d|^[0-9a-fA-F-]{16,}$")
+_MISSING = object()
+
+_REQUESTS = metrics.counter(
+    "quizzie_cache_requests_total",
+    "Cache operations by key family, op, tier (l1/l2/none) and result (hit/miss/ok/stale/error).",
+    ["family", "op", "tier", "result"],
+)
+_LATENCY = metrics.histogram(
+    "quizzie_cache_op_seconds", "Cache operation latency.", ["family", "op", "tier"],
+)
+_SIZES = metrics.histogram(
+    "quizzie_cache_value_bytes", "Encoded size of values read from / written to Redis.",
+    ["family", "op"], buckets=metrics.SIZE_BUCKETS,
+)
+_COMPUTE = metrics.counter(
+    "quizzie_cache_compute_total",
+    "get_or_compute activity: load, coalesced, early_refresh, lock_wait.",
+    ["family", "event"],
+)
+_INVALIDATIONS = metrics.counter(
+    "quizzie_cache_invalidations_total", "Pub/sub L1 invalidation messages.", ["direction"],
+)
+
+
+def key_family(key: str) -> str:
+    """``exam:3f2a…:questions`` → ``exam:*:questions`` (used for L1 budgets and stats)."""
+    return ":".join("*" if _ID_SEGMENT.search(part) else part for part in key.split(":"))
+
+
+def _unwrap(value: Any) -> Any:
+    """The value inside a ``get_or_compute`` envelope (or ``value`` itself)."""
+    if isinstance(value, dict) and value.get(_ENVELOPE):
+        return value["v"]
+    return value
+
+
+def _observe(family: str, op: str, tier: str, result: str, started: float, size: Optional[int] = None) -> None:
+    _REQUESTS.inc(family=family, op=op, tier=tier, result=result)
+    _LATENCY.observe(time.perf_counter() - started, family=family, op=op, tier=tier)
+    if size is not None:
+        _SIZES.observe(size, family=family, op=op)
+
 
 class RedisCache:
     def __init__(self):
         self._client: Optional[aioredis.Redis] = None
+        self._origin = uuid.uuid4().hex
+        self._l1: Dict[str, LocalCache] = {}
+        # tag -> keys this process has set, so tags still work on L1 without Redis
+        self._local_tags: Dict[str, Set[str]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Bumped on every invalidation so a GET that raced one doesn't refill L1
+        # with the value it read just before the delete.
+        self._generation = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sync_client: Optional[redis.Redis] = None
+        self._sync_retry_at = 0.0
 
     async def connect(self):
         """Initialise async Redis connection pool."""
@@ -27,7 +196,7 @@ class RedisCache:
             self._client = aioredis.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
-                decode_responses=True,
+                decode_responses=False,     # values are codec bytes
                 max_connections=50,
             )
             await self._client.ping()
@@ -35,87 +204,726 @@ class RedisCache:
         except Exception as e:
             logger.warning("⚠️  Redis unavailable (%s) — cache disabled, app continues.", e)
             self._client = None
+            return
+        if settings.CACHE_L1_ENABLED:
+            self._listener = asyncio.create_task(self._listen())
 
     async def disconnect(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
         if self._client:
             await self._client.aclose()
 
     # ── Core ops ──────────────────────────────────────────────────────────────
 
     async def get(self, key: str) -> Optional[Any]:
+        return _unwrap(await self._get_raw(key))
+
+    async def _get_raw(self, key: str) -> Optional[Any]:
+        family, started = key_family(key), time.perf_counter()
+        l1 = self._l1_for(key, family)
+        if l1 is not None:
+            value = l1.get(key, _MISSING)
+            if value is not _MISSING:
+                _observe(family, "get", "l1", "hit", started)
+                return value
         if not self._client:
+            _observe(family, "get", "none", "miss", started)
             return None
+        generation = self._generation
         try:
             raw = await self._client.get(key)
-            return json.loads(raw) if raw is not None else None
+            if raw is None:
+                _observe(family, "get", "l2", "miss", started)
+                return None
+            value = codec.decode(raw)
         except Exception as e:
+            _observe(family, "get", "l2", "error", started)
             logger.debug("Cache GET error for %s: %s", key, e)
             return None
+        _observe(family, "get", "l2", "hit", started, size=len(raw))
+        if l1 is not None and generation == self._generation:
+            l1.set(key, value, size=len(raw))
+        return value
 
-    async def set(self, key: str, value: Any, ttl: int = 60) -> bool:
+    async def set(self, key: str, value: Any, ttl: int = 60, tags: Iterable[str] = ()) -> bool:
+        family, started = key_family(key), time.perf_counter()
+        raw = codec.encode(value)
+        tags = list(tags)
+        l1 = self._l1_for(key, family)
+        if l1 is not None:
+            self._invalidate_local(keys=[key])
+            # Store the decoded copy so both tiers hand back identical values and
+            # later mutations of ``value`` by the caller can't leak into L1.
+            l1.set(key, codec.decode(raw), ttl=min(ttl, settings.CACHE_L1_TTL), size=len(raw))
+            for tag in tags:
+                self._local_tags.setdefault(tag, set()).add(key)
         if not self._client:
+            _observe(family, "set", "l1" if l1 is not None else "none", "ok", started, size=len(raw))
             return False
         try:
-            await self._client.set(key, json.dumps(value, default=str), ex=ttl)
+            pipe = self._client.pipeline(transaction=False)
+            pipe.set(key, raw, ex=ttl)
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), key)
+                # A tag set only has to outlive its longest-lived member; stale
+                # members are harmless (UNLINK of a missing key is a no-op).
+                pipe.expire(_tag_key(tag), max(ttl, settings.CACHE_TAG_TTL))
+            if l1 is not None:
+                pipe.publish(INVALIDATION_CHANNEL, self._message(keys=[key]))
+            await pipe.execute()
+            _observe(family, "set", "l2", "ok", started, size=len(raw))
             return True
         except Exception as e:
+            _observe(family, "set", "l2", "error", started)
             logger.debug("Cache SET error for %s: %s", key, e)
             return False
 
     async def delete(self, key: str) -> bool:
+        family, started = key_family(key), time.perf_counter()
+        l1 = self._l1_for(key, family)
+        if l1 is not None:
+            self._invalidate_local(keys=[key])
         if not self._client:
+            _observe(family, "delete", "none", "ok", started)
             return False
         try:
-            await self._client.delete(key)
+            pipe = self._client.pipeline(transaction=False)
+            pipe.delete(key)
+            if l1 is not None:
+                pipe.publish(INVALIDATION_CHANNEL, self._message(keys=[key]))
+            await pipe.execute()
+            _observe(family, "delete", "l2", "ok", started)
             return True
         except Exception as e:
+            _observe(family, "delete", "l2", "error", started)
             logger.debug("Cache DEL error for %s: %s", key, e)
             return False
 
+    async def invalidate_tag(self, tag: str) -> int:
+        """Delete every key registered under ``tag``; returns how many were removed."""
+        family, started = "tag:" + key_family(tag), time.perf_counter()
+        local = self._local_tags.pop(tag, set())
+        self._invalidate_local(keys=local)
+        if not self._client:
+            _observe(family, "invalidate_tag", "none", "ok", started)
+            return len(local)
+        removed = 0
+        try:
+            # Bump the generation before walking the set: a guarded set_sync
+            # that read the old generation can no longer land afterwards.
+            pipe = self._client.pipeline(transaction=False)
+            pipe.incr(_generation_key(tag))
+            pipe.expire(_generation_key(tag), settings.CACHE_TAG_TTL)
+            await pipe.execute()
+        except Exception as e:
+            # Still delete and broadcast: only the guarded writes lose their fence.
+            logger.debug("Cache tag generation bump error for %s: %s", tag, e)
+        try:
+            tag_key = _tag_key(tag)
+            cursor = 0
+            while True:
+                cursor, members = await self._client.sscan(tag_key, cursor, count=TAG_BATCH)
+                if members:
+                    removed += await self._unlink_batch(members)
+                if cursor == 0:
+                    break
+            await self._client.unlink(tag_key)
+        except Exception as e:
+            _observe(family, "invalidate_tag", "l2", "error", started)
+            logger.debug("Cache tag invalidation error for %s: %s", tag, e)
+            return removed
+        _observe(family, "invalidate_tag", "l2", "ok", started)
+        return removed
+
     async def delete_pattern(self, pattern: str):
-        """Delete all keys matching a glob pattern (use sparingly)."""
+        """Delete all keys matching a glob pattern via SCAN (prefer tags)."""
+        family, started = key_family(pattern), time.perf_counter()
+        self._invalidate_local(pattern=pattern)
         if not self._client:
+            _observe(family, "delete_pattern", "none", "ok", started)
             return
         try:
-            keys = await self._client.keys(pattern)
-            if keys:
-                await self._client.delete(*keys)
+            batch: List[str] = []
+            async for key in self._client.scan_iter(match=pattern, count=TAG_BATCH):
+                batch.append(key)
+                if len(batch) >= TAG_BATCH:
+                    await self._unlink_batch(batch)
+                    batch = []
+            if batch:
+                await self._unlink_batch(batch)
         except Exception as e:
+            _observe(family, "delete_pattern", "l2", "error", started)
             logger.debug("Cache DEL pattern error for %s: %s", pattern, e)
+            return
+        _observe(family, "delete_pattern", "l2", "ok", started)
+
+    # ── Batch access ──────────────────────────────────────────────────────────
+
+    async def get_many(
+        self,
+        keys: Iterable[str],
+        loader: Optional[Callable[[List[str]], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]]] = None,
+        ttl: int = 60,
+        tags: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        {key: value} for every key found in L1/Redis (one MGET for the rest).
+        ``loader(missing_keys) -> {key: value}`` (sync or async) fills the gaps;
+        what it returns (None values excepted) is stored with ``set_many``.
+        """
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        pending: List[str] = []
+        started = time.perf_counter()
+        for key in keys:
+            family = key_family(key)
+            l1 = self._l1_for(key, family)
+            value = l1.get(key, _MISSING) if l1 is not None else _MISSING
+            if value is _MISSING:
+                pending.append(key)
+                continue
+            _observe(family, "get_many", "l1", "hit", started)
+            found[key] = _unwrap(value)
+
+        if pending and self._client:
+            generation = self._generation
+            try:
+                raws = await self._client.mget(pending)
+            except Exception as e:
+                logger.debug("Cache MGET error for %d keys: %s", len(pending), e)
+                raws = [_MISSING] * len(pending)
+            for key, raw in zip(pending, raws):
+                family = key_family(key)
+                if raw is _MISSING or raw is None:
+                    _observe(family, "get_many", "l2", "error" if raw is _MISSING else "miss", started)
+                    continue
+                try:
+                    value = codec.decode(raw)
+                except Exception as e:
+                    _observe(family, "get_many", "l2", "error", started)
+                    logger.debug("Cache decode error for %s: %s", key, e)
+                    continue
+                _observe(family, "get_many", "l2", "hit", started, size=len(raw))
+                l1 = self._l1_for(key, family)
+                if l1 is not None and generation == self._generation:
+                    l1.set(key, value, size=len(raw))
+                found[key] = _unwrap(value)
+        elif pending:
+            for key in pending:
+                _observe(key_family(key), "get_many", "none", "miss", started)
+
+        missing = [key for key in keys if key not in found]
+        if loader is None or not missing:
+            return found
+        if inspect.iscoroutinefunction(loader):
+            loaded = await loader(missing)
+        else:
+            loaded = await run_in_threadpool(loader, missing)
+        loaded = {k: v for k, v in (loaded or {}).items() if v is not None}
+        if loaded:
+            await self.set_many(loaded, ttl=ttl, tags=tags)
+            found.update(loaded)
+        return found
+
+    async def set_many(self, items: Dict[str, Any], ttl: int = 60, tags: Iterable[str] = ()) -> bool:
+        """``set`` for many keys in one pipeline (and one invalidation message)."""
+        if not items:
+            return True
+        started = time.perf_counter()
+        tags = list(tags)
+        encoded = {key: codec.encode(value) for key, value in items.items()}
+        local = [key for key in encoded if self._l1_for(key) is not None]
+        if local:
+            self._invalidate_local(keys=local)
+        for key in local:
+            raw = encoded[key]
+            self._l1_for(key).set(key, codec.decode(raw), ttl=min(ttl, settings.CACHE_L1_TTL), size=len(raw))
+            for tag in tags:
+                self._local_tags.setdefault(tag, set()).add(key)
+        if not self._client:
+            for key, raw in encoded.items():
+                _observe(key_family(key), "set_many", "l1" if key in local else "none", "ok", started, size=len(raw))
+            return False
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, raw in encoded.items():
+                pipe.set(key, raw, ex=ttl)
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), *encoded)
+                pipe.expire(_tag_key(tag), max(ttl, settings.CACHE_TAG_TTL))
+            if local:
+                pipe.publish(INVALIDATION_CHANNEL, self._message(keys=local))
+            await pipe.execute()
+        except Exception as e:
+            for key in encoded:
+                _observe(key_family(key), "set_many", "l2", "error", started)
+            logger.debug("Cache SET (batch) error for %d keys: %s", len(encoded), e)
+            return False
+        for key, raw in encoded.items():
+            _observe(key_family(key), "set_many", "l2", "ok", started, size=len(raw))
+        return True
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Drop many keys (Redis and every worker's L1) in one round trip."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        started = time.perf_counter()
+        self._invalidate_local(keys=keys)
+        if not self._client:
+            for key in keys:
+                _observe(key_family(key), "delete_many", "none", "ok", started)
+            return 0
+        try:
+            removed = await self._unlink_batch(keys)
+        except Exception as e:
+            for key in keys:
+                _observe(key_family(key), "delete_many", "l2", "error", started)
+            logger.debug("Cache DEL (batch) error for %d keys: %s", len(keys), e)
+            return 0
+        for key in keys:
+            _observe(key_family(key), "delete_many", "l2", "ok", started)
+        return removed
+
+    async def _unlink_batch(self, keys: List[str]) -> int:
+        """UNLINK keys and tell peers to drop any L1 copies, in one round trip."""
+        keys = [k.decode() if isinstance(k, bytes) else k for k in keys]
+        self._invalidate_local(keys=keys)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        # Decide from configuration, not from self._l1: a process that only
+        # writes (Celery, a fresh worker) has no L1 of its own but its peers do.
+        local = [key for key in keys if self._is_local(key)]
+        if local:
+            pipe.publish(INVALIDATION_CHANNEL, self._message(keys=local))
+        results = await pipe.execute()
+        return results[0]
+
+    # ── Sync access (Celery workers, sync services) ───────────────────────────
+
+    def _sync(self) -> Optional[redis.Redis]:
+        """Lazily connected blocking client; retried at most every SYNC_RETRY_SECONDS."""
+        if self._sync_client is not None or time.monotonic() < self._sync_retry_at:
+            return self._sync_client
+        try:
+            client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            self._sync_client = client
+        except Exception as e:
+            logger.debug("Sync Redis unavailable (%s)", e)
+            self._sync_retry_at = time.monotonic() + SYNC_RETRY_SECONDS
+        return self._sync_client
+
+    def get_sync(self, key: str) -> Optional[Any]:
+        family, started = key_family(key), time.perf_counter()
+        client = self._sync()
+        if client is None:
+            _observe(family, "get_sync", "none", "miss", started)
+            return None
+        try:
+            raw = client.get(key)
+            value = codec.decode(raw) if raw is not None else None
+        except Exception as e:
+            _observe(family, "get_sync", "l2", "error", started)
+            logger.debug("Cache GET (sync) error for %s: %s", key, e)
+            return None
+        _observe(family, "get_sync", "l2", "hit" if raw is not None else "miss", started,
+                 size=len(raw) if raw is not None else None)
+        if isinstance(value, dict) and value.get(_ENVELOPE):
+            return value["v"]
+        return value
+
+    def tag_generations_sync(self, tags: Iterable[str]) -> Optional[Dict[str, str]]:
+        """
+        Snapshot of how often each tag has been invalidated, for a guarded
+        ``set_sync``. Take it before reading the source of the value. None if
+        Redis is unavailable.
+        """
+        tags = list(tags)
+        client = self._sync()
+        if client is None:
+            return None
+        try:
+            values = client.mget([_generation_key(t) for t in tags]) if tags else []
+        except Exception as e:
+            logger.debug("Cache tag generation read error for %s: %s", tags, e)
+            return None
+        return {t: (v.decode() if isinstance(v, bytes) else v or "") for t, v in zip(tags, values)}
+
+    def set_sync(self, key: str, value: Any, ttl: int = 60, tags: Iterable[str] = (),
+                 generations: Optional[Dict[str, str]] = None) -> bool:
+        """
+        With ``generations`` (from ``tag_generations_sync``) the write is
+        skipped if any of those tags was invalidated in the meantime, so a value
+        built from data read before an edit can't outlive the edit's
+        invalidation. The tags registered are then those of the snapshot.
+        """
+        family, started = key_family(key), time.perf_counter()
+        client = self._sync()
+        if client is None:
+            _observe(family, "set_sync", "none", "ok", started)
+            return False
+        if generations is not None:
+            return self._set_if_generations_sync(client, key, value, ttl, generations, family, started)
+        try:
+            raw = codec.encode(value)
+            pipe = client.pipeline(transaction=False)
+            pipe.set(key, raw, ex=ttl)
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), key)
+                pipe.expire(_tag_key(tag), max(ttl, settings.CACHE_TAG_TTL))
+            pipe.execute()
+        except Exception as e:
+            _observe(family, "set_sync", "l2", "error", started)
+            logger.debug("Cache SET (sync) error for %s: %s", key, e)
+            return False
+        _observe(family, "set_sync", "l2", "ok", started, size=len(raw))
+        return True
+
+    def _set_if_generations_sync(self, client, key, value, ttl, generations, family, started) -> bool:
+        tags = list(generations)
+        try:
+            raw = codec.encode(value)
+            stored = client.eval(
+                _SET_IF_GENERATIONS, 1 + 2 * len(tags),
+                key, *(_generation_key(t) for t in tags), *(_tag_key(t) for t in tags),
+                raw, ttl, len(tags), max(ttl, settings.CACHE_TAG_TTL), *(generations[t] for t in tags),
+            )
+        except Exception as e:
+            _observe(family, "set_sync", "l2", "error", started)
+            logger.debug("Cache SET (sync, guarded) error for %s: %s", key, e)
+            return False
+        if not stored:
+            _observe(family, "set_sync", "l2", "stale", started)
+            return False
+        _observe(family, "set_sync", "l2", "ok", started, size=len(raw))
+        return True
+
+    # ── Single-flight ─────────────────────────────────────────────────────────
+
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl: int = 60,
+        tags: Iterable[str] = (),
+        beta: float = 1.0,
+    ) -> Any:
+        """
+        Return the cached value for ``key``, computing it with ``loader`` on a
+        miss. ``loader`` may be sync (run in the threadpool) or async; whatever
+        it raises propagates to every caller waiting on it. ``beta`` > 1 makes
+        early refresh more eager, 0 disables it.
+        """
+        entry = await self._get_raw(key)
+        if isinstance(entry, dict) and entry.get(_ENVELOPE):
+            if beta <= 0 or not self._should_refresh_early(entry, beta):
+                return entry["v"]
+            if key in self._inflight:
+                return entry["v"]
+            # Refresh only if no other worker is already doing it.
+            lock = await self._acquire_lock(key, ttl)
+            if lock is False:
+                return entry["v"]
+            _COMPUTE.inc(family=key_family(key), event="early_refresh")
+            return await self._single_flight(key, loader, ttl, tags, lock)
+        if entry is not None:
+            return entry        # written by a plain set(); no timing to go on
+
+        return await self._single_flight(key, loader, ttl, tags)
+
+    async def _single_flight(self, key, loader, ttl, tags, lock=None) -> Any:
+        while (future := self._inflight.get(key)) is not None:
+            _COMPUTE.inc(family=key_family(key), event="coalesced")
+            if lock:
+                await self._release_lock(key, lock)
+                lock = None
+            value = await asyncio.shield(future)
+            if value is not _RETRY:
+                return value
+            # The leader was cancelled (e.g. its client went away): not our
+            # failure, so look again — compute ourselves or join the next leader.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute_locked(key, loader, ttl, tags, lock)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()      # mark retrieved when nobody else was waiting
+            raise
+        except BaseException:
+            future.set_result(_RETRY)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_locked(self, key, loader, ttl, tags, lock=None) -> Any:
+        lock_ttl = settings.CACHE_LOCK_TTL
+        if lock is None:
+            lock = await self._acquire_lock(key, ttl)
+            if lock is False:
+                # Another worker is computing — wait for its result rather than
+                # hitting the database too.
+                _COMPUTE.inc(family=key_family(key), event="lock_wait")
+                deadline = time.monotonic() + lock_ttl
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(LOCK_POLL_SECONDS)
+                    entry = await self._get_raw(key)
+                    if entry is not None:
+                        return entry["v"] if isinstance(entry, dict) and entry.get(_ENVELOPE) else entry
+                lock = None     # lock holder is slow or gone; compute ourselves
+        try:
+            _COMPUTE.inc(family=key_family(key), event="load")
+            started = time.monotonic()
+            if inspect.iscoroutinefunction(loader):
+                value = await loader()
+            else:
+                value = await run_in_threadpool(loader)
+                if inspect.isawaitable(value):
+                    value = await value
+            delta = time.monotonic() - started
+            await self.set(key, {_ENVELOPE: 1, "v": value, "delta": delta, "exp": time.time() + ttl},
+                           ttl=ttl, tags=tags)
+            return value
+        finally:
+            if lock:
+                await self._release_lock(key, lock)
+
+    @staticmethod
+    def _should_refresh_early(entry: Dict, beta: float) -> bool:
+        # XFetch: refresh when now - delta * beta * ln(rand) >= expiry.
+        delta = entry.get("delta") or 0.0
+        return time.time() - delta * beta * math.log(random.random() or 1e-12) >= entry.get("exp", 0)
+
+    async def _acquire_lock(self, key: str, ttl: int) -> Union[str, bool, None]:
+        """Token if acquired, False if another worker holds it, None without Redis."""
+        if not self._client:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            ok = await self._client.set(_lock_key(key), token, nx=True,
+                                        ex=min(settings.CACHE_LOCK_TTL, ttl))
+            return token if ok else False
+        except Exception as e:
+            logger.debug("Cache lock error for %s: %s", key, e)
+            return None
+
+    async def _release_lock(self, key: str, token: str) -> None:
+        try:
+            await self._client.eval(_RELEASE_LOCK, 1, _lock_key(key), token)
+        except Exception as e:
+            logger.debug("Cache unlock error for %s: %s", key, e)
 
     async def increment(self, key: str, ttl: int = 60) -> int:
         """Atomic increment — used for rate limiting counters."""
+        family, started = key_family(key), time.perf_counter()
         if not self._client:
+            _observe(family, "increment", "none", "ok", started)
             return 0
         try:
             pipe = self._client.pipeline()
             await pipe.incr(key)
             await pipe.expire(key, ttl)
             results = await pipe.execute()
-            return results[0]
         except Exception as e:
+            _observe(family, "increment", "l2", "error", started)
             logger.debug("Cache INCR error for %s: %s", key, e)
             return 0
+        _observe(family, "increment", "l2", "ok", started)
+        return results[0]
 
     @property
     def is_available(self) -> bool:
         return self._client is not None
 
+    @property
+    def client(self) -> Optional[aioredis.Redis]:
+        """The raw async client, for Redis structures that are not cache entries
+        (the auto-save buffer). None without Redis; no L1, metrics or codec."""
+        return self._client
+
+    @property
+    def sync_client(self) -> Optional[redis.Redis]:
+        """The raw blocking client (connects lazily), for the same structures as
+        ``client`` from sync code. None without Redis."""
+        return self._sync()
+
+    @property
+    def is_sync_available(self) -> bool:
+        """Whether ``get_sync``/``set_sync`` can reach Redis (connects lazily)."""
+        return self._sync() is not None
+
+    # ── L1 tier ───────────────────────────────────────────────────────────────
+
+    def _l1_for(self, key: str, family: Optional[str] = None) -> Optional[LocalCache]:
+        if not settings.CACHE_L1_ENABLED:
+            return None
+        family = family or key_family(key)
+        l1 = self._l1.get(family)
+        if l1 is None:
+            budget = settings.CACHE_L1_FAMILIES.get(family)
+            if not budget:
+                return None
+            l1 = self._l1[family] = LocalCache(
+                max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                ttl=settings.CACHE_L1_TTL,
+                max_bytes=budget,
+            )
+        return l1
+
+    @staticmethod
+    def _is_local(key: str) -> bool:
+        """Whether ``key`` belongs to a family that any worker may hold in L1."""
+        return settings.CACHE_L1_ENABLED and bool(settings.CACHE_L1_FAMILIES.get(key_family(key)))
+
+    def _invalidate_local(self, keys=(), pattern: Optional[str] = None, everything: bool = False):
+        self._generation += 1
+        if everything:
+            for l1 in self._l1.values():
+                l1.clear()
+            self._local_tags.clear()
+            return
+        for key in keys:
+            l1 = self._l1.get(key_family(key))
+            if l1 is not None:
+                l1.pop(key)
+        if pattern:
+            for l1 in self._l1.values():
+                l1.pop_matching(pattern)
+
+    def clear_local(self) -> None:
+        """Drop every L1 entry in this process (tests, or after losing pub/sub)."""
+        self._invalidate_local(everything=True)
+
+    def _message(self, keys=(), pattern: Optional[str] = None) -> str:
+        _INVALIDATIONS.inc(direction="sent")
+        return json.dumps({"o": self._origin, "k": list(keys), "p": pattern})
+
+    def _apply_invalidation(self, data: str) -> None:
+        try:
+            msg = json.loads(data)
+        except (TypeError, ValueError):
+            logger.debug("Ignoring malformed cache invalidation: %r", data)
+            return
+        if msg.get("o") == self._origin:
+            return
+        _INVALIDATIONS.inc(direction="received")
+        self._invalidate_local(keys=msg.get("k") or (), pattern=msg.get("p"))
+
+    async def _listen(self):
+        """Apply other workers' invalidations to our L1 until cancelled."""
+        while self._client:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything cached before we were listening may already be stale.
+                self.clear_local()
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener lost (%s) — clearing L1, resubscribing.", e)
+                self.clear_local()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def l1_gauges(self, field: str) -> Dict[tuple, float]:
+        """{(family,): LocalCache.stats()[field]} — scrape-time source for the L1 gauges."""
+        return {(family,): l1.stats()[field] for family, l1 in list(self._l1.items())}
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary for /admin/stats; the full breakdown is on the Prometheus endpoint."""
+        l2: Dict[str, Dict[str, Any]] = {}
+        for (family, op, tier, result), n in _REQUESTS.values().items():
+            if op == "get" and tier == "l2" and result in ("hit", "miss"):
+                l2.setdefault(family, {"hits": 0, "misses": 0})[{"hit": "hits", "miss": "misses"}[result]] += int(n)
+        for c in l2.values():
+            lookups = c["hits"] + c["misses"]
+            c["hit_ratio"] = round(c["hits"] / lookups, 4) if lookups else 0.0
+        compute = {"loads": 0, "coalesced": 0, "early_refreshes": 0, "lock_waits": 0}
+        names = {"load": "loads", "coalesced": "coalesced", "early_refresh": "early_refreshes", "lock_wait": "lock_waits"}
+        for (_, event), n in _COMPUTE.values().items():
+            compute[names[event]] += int(n)
+        return {
+            "connected": self.is_available,
+            "l1": {family: l1.stats() for family, l1 in self._l1.items()},
+            "l2": l2,
+            "invalidations": {d: int(_INVALIDATIONS.value(direction=d)) for d in ("sent", "received")},
+            "compute": compute,
+        }
+
 
 # Singleton — imported everywhere
 cache = RedisCache()
 
+for _field, _help in (("entries", "Entries held in the in-process L1 tier."),
+                      ("bytes", "Encoded bytes held in the in-process L1 tier."),
+                      ("evictions", "L1 entries evicted to stay within budget (cumulative).")):
+    metrics.gauge(f"quizzie_cache_l1_{_field}", _help, ["family"],
+                  collect=lambda f=_field: cache.l1_gauges(f))
+
 
 # ── Key builders (centralised so we never typo a key) ──────────────────────────
 
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+def _generation_key(tag: str) -> str:
+    return f"taggen:{tag}"
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+def tag_exam(exam_id: str) -> str:
+    """Everything cached about one exam (questions, meta, leaderboard, ...)."""
+    return f"exam:{exam_id}"
+
+def tag_leaderboard(exam_id: str) -> str:
+    """Every cached leaderboard of one exam, whatever its ``limit``."""
+    return f"exam:{exam_id}:leaderboard"
+
+def tag_user(user_id: str) -> str:
+    """Everything cached about one user (principal, ...)."""
+    return f"user:{user_id}"
+
 def key_exam_questions(exam_id: str) -> str:
     return f"exam:{exam_id}:questions"
 
 def key_exam_meta(exam_id: str) -> str:
     return f"exam:{exam_id}:meta"
 
-def key_leaderboard(exam_id: str) -> str:
-    return f"exam:{exam_id}:leaderboard"
+def key_leaderboard(exam_id: str, limit: int) -> str:
+    return f"exam:{exam_id}:leaderboard:{limit}"
+
+def key_exam_questions_rendered(exam_id: str) -> str:
+    return f"exam:{exam_id}:questions:rendered"
+
+def key_proctoring_settings(exam_id: str) -> str:
+    return f"exam:{exam_id}:proctoring"
+
+def key_answer_key(exam_id: str) -> str:
+    return f"exam:{exam_id}:answer_key"
+
+def key_answer_key_version(exam_id: str) -> str:
+    return f"exam:{exam_id}:answer_key:version"
 
 def key_user(user_id: str) -> str:
     return f"user:{user_id}"
@@ -125,3 +933,19 @@ def key_rate_limit(ip: str, endpoint: str) -> str:
 
 def key_attempt_health(attempt_id: str) -> str:
     return f"attempt:{attempt_id}:health"
+
+def key_autosave(attempt_id: str) -> str:
+    return f"attempt:{attempt_id}:autosave"
+
+def key_evaluation_batch(exam_id: str) -> str:
+    return f"exam:{exam_id}:evaluation_batch"
+
+
+def key_read_primary(user_id: str) -> str:
+    return f"user:{user_id}:read_primary"
+
+def key_revoked_token(jti: str) -> str:
+    return f"revoked:jti:{jti}"
+
+def key_user_token_cutoff(user_id: str) -> str:
+    return f"revoked:user:{user_id}"
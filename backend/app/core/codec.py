@@ -0,0 +1,122 @@
+"""
+Binary value codec for RedisCache.
+
+Values used to go through ``json.dumps(value, default=str)`` on every write
+and ``json.loads`` on every read — for a 90-question JEE paper that is a
+sizeable string parsed on every student fetch that misses L1. Entries are now
+written as:
+
+  byte 0   FORMAT_VERSION
+  byte 1   serializer  (1 = orjson, 2 = msgpack)
+  byte 2   compression (0 = none, 1 = zlib, 2 = zstd, 3 = lz4)
+  rest     payload
+
+Serializer and compression are picked by CACHE_CODEC / CACHE_COMPRESSION, and
+only values of at least CACHE_COMPRESS_MIN_BYTES are compressed (small ones get
+bigger and slower). msgpack, zstandard and lz4 are optional: if the configured
+one is not installed we fall back to orjson / zlib and log it once.
+
+``decode`` reads whatever the header says, so a worker configured differently
+(or a new deploy) still reads every entry. Entries without a header are the
+old JSON text and are decoded as such, so nothing needs flushing on upgrade.
+Old workers mid-rolling-deploy can't read the new format; their GET fails
+soft as a miss and the value is recomputed.
+"""
+import json
+import logging
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+import orjson
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:     # optional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:     # optional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:     # optional
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+SERIALIZERS = {"orjson": 1, "msgpack": 2}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=str, option=_ORJSON_OPTS)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=str, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_DUMPS: Dict[int, Callable[[Any], bytes]] = {1: _orjson_dumps, 2: _msgpack_dumps}
+_LOADS: Dict[int, Callable[[bytes], Any]] = {1: orjson.loads, 2: _msgpack_loads}
+
+_zstd_c = zstandard.ZstdCompressor(level=3) if zstandard else None
+_zstd_d = zstandard.ZstdDecompressor() if zstandard else None
+
+_COMPRESS: Dict[int, Callable[[bytes], bytes]] = {1: lambda b: zlib.compress(b, 1)}
+_DECOMPRESS: Dict[int, Callable[[bytes], bytes]] = {1: zlib.decompress}
+if zstandard:
+    _COMPRESS[2], _DECOMPRESS[2] = _zstd_c.compress, _zstd_d.decompress
+if lz4_frame:
+    _COMPRESS[3], _DECOMPRESS[3] = lz4_frame.compress, lz4_frame.decompress
+
+
+def _available(serializer: str, compression: str) -> Tuple[int, int]:
+    ser = SERIALIZERS.get(serializer, 1)
+    if ser not in _DUMPS or (ser == 2 and msgpack is None):
+        logger.warning("Cache codec %r unavailable — using orjson.", serializer)
+        ser = 1
+    comp = COMPRESSIONS.get(compression, 1)
+    if comp and comp not in _COMPRESS:
+        logger.warning("Cache compression %r unavailable — using zlib.", compression)
+        comp = 1
+    return ser, comp
+
+
+_serializer, _compression = _available(settings.CACHE_CODEC, settings.CACHE_COMPRESSION)
+
+
+def configure(serializer: str, compression: str) -> None:
+    """Switch the write format (benchmarks / tests); reads are unaffected."""
+    global _serializer, _compression
+    _serializer, _compression = _available(serializer, compression)
+
+
+def encode(value: Any) -> bytes:
+    body = _DUMPS[_serializer](value)
+    comp = 0
+    if _compression and len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        body, comp = _COMPRESS[_compression](body), _compression
+    return bytes((FORMAT_VERSION, _serializer, comp)) + body
+
+
+def decode(raw: bytes) -> Any:
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw or raw[0] != FORMAT_VERSION:
+        return json.loads(raw)      # pre-codec JSON text
+    body = raw[3:]
+    if raw[2]:
+        body = _DECOMPRESS[raw[2]](body)
+    return _LOADS[raw[1]](body)
@@ -1,22 +1,31 @@
-from sqlalchemy import create_engine
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.core import db_pool, metrics
 from app.core.config import settings
 
-# ─── Connection pool sized for production concurrent load ───────────────────
-# pool_size: permanent connections kept alive
-# max_overflow: extra connections allowed under burst load
-# pool_timeout: seconds to wait for a free connection before raising
+logger = logging.getLogger(__name__)
+
+# ─── Connection pool sized per process role ─────────────────────────────────
+# pool_size / max_overflow / pool_timeout: from PROCESS_ROLE (see db_pool.py)
 # pool_pre_ping: tests connection health before use (prevents stale conn errors)
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=db_pool.TimedQueuePool,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
     pool_recycle=1800,   # recycle connections every 30 min to avoid DB-side timeouts
-    echo=False
+    echo=False,
+    **db_pool.pool_options(),
 )
+db_pool.instrument(engine, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -28,3 +37,148 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ─── Read replica (optional) ────────────────────────────────────────────────
+# Analytics, leaderboards and exports are pure reads and spike exactly when an
+# exam ends, i.e. while the submit burst is writing. With READ_DATABASE_URL set
+# they go to a replica instead (routes opt in via ``deps.get_read_db``), unless:
+#
+#   * the replica is unreachable or more than READ_REPLICA_MAX_LAG_SECONDS
+#     behind (measured at most every READ_REPLICA_LAG_CHECK_SECONDS per
+#     process), or
+#   * the caller wrote something in the last READ_AFTER_WRITE_SECONDS
+#     (``stick_to_primary`` — e.g. a student who just submitted must see that
+#     attempt), or Redis is down so we can't tell.
+#
+# In all of those cases the read simply uses the primary.
+
+read_engine = create_engine(
+    settings.READ_DATABASE_URL,
+    poolclass=db_pool.TimedQueuePool,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    echo=False,
+    **db_pool.pool_options(),
+) if settings.READ_DATABASE_URL else None
+if read_engine is not None:
+    db_pool.instrument(read_engine, "replica")
+
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine is not None else None
+)
+
+# 0 when the standby has replayed everything it received (an idle replica's
+# last-replay timestamp is old but it is not behind); NULL on a non-standby
+# (READ_DATABASE_URL pointing at a primary) or one that has replayed nothing.
+_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+_READ_ROUTE = metrics.counter(
+    "quizzie_db_read_route_total", "Replica-eligible reads by target and reason", ["target"],
+)
+_lag_lock = threading.Lock()
+_lag_state = {"lag": None, "checked_at": -math.inf}
+
+
+def _measure_replica_lag() -> Optional[float]:
+    try:
+        with read_engine.connect() as conn:
+            lag = conn.execute(_LAG_SQL).scalar()
+    except Exception as e:
+        logger.warning("Read replica unavailable (%s) — reading from the primary.", e)
+        return None
+    if lag is None:
+        # Not a standby: nothing guarantees it is the primary we write to.
+        logger.warning("READ_DATABASE_URL is not a streaming replica — reading from the primary.")
+        return None
+    return float(lag)
+
+
+def replica_lag() -> Optional[float]:
+    """Replica lag in seconds (cached), or None if there is no usable replica."""
+    if read_engine is None:
+        return None
+    now = time.monotonic()
+    with _lag_lock:
+        if now - _lag_state["checked_at"] < settings.READ_REPLICA_LAG_CHECK_SECONDS:
+            return _lag_state["lag"]
+        _lag_state["checked_at"] = now      # one measuring thread; others reuse the last value
+    lag = _measure_replica_lag()
+    _lag_state["lag"] = lag
+    return lag
+
+
+def read_target(user_id: Optional[str] = None) -> str:
+    """'replica' or why not: 'no_replica', 'lagging', 'read_after_write'."""
+    from app.core.cache import cache, key_read_primary
+
+    lag = replica_lag()
+    if lag is None:
+        target = "no_replica"
+    elif lag > settings.READ_REPLICA_MAX_LAG_SECONDS:
+        target = "lagging"
+    elif user_id and (not cache.is_sync_available or cache.get_sync(key_read_primary(str(user_id)))):
+        target = "read_after_write"
+    else:
+        target = "replica"
+    _READ_ROUTE.inc(target=target)
+    return target
+
+
+async def stick_to_primary(user_id: str) -> None:
+    """Route ``user_id``'s replica-eligible reads to the primary for READ_AFTER_WRITE_SECONDS."""
+    from app.core.cache import cache, key_read_primary
+
+    if read_engine is not None:
+        await cache.set(key_read_primary(str(user_id)), 1, ttl=settings.READ_AFTER_WRITE_SECONDS)
+
+
+def stick_to_primary_sync(user_id: str) -> None:
+    from app.core.cache import cache, key_read_primary
+
+    if read_engine is not None:
+        cache.set_sync(key_read_primary(str(user_id)), 1, ttl=settings.READ_AFTER_WRITE_SECONDS)
+
+
+# ─── Async engine (asyncpg) ─────────────────────────────────────────────────
+# For ``async def`` handlers: a sync Session there runs its queries on the event
+# loop thread, so one slow query stalls every request and WebSocket on the
+# worker. Those handlers use ``get_async_db`` instead. Sync handlers (plain
+# ``def``, run in the threadpool by FastAPI), Celery and the services keep the
+# sync engine above. Both engines point at the same database.
+#
+# Shared sync code (health writer, evaluation) is called from async handlers
+# via ``await db.run_sync(fn, ...)``, which runs it against this session without
+# blocking the loop.
+
+def _async_url(url: str):
+    """DATABASE_URL with the asyncpg driver (and ``sslmode`` spelled the asyncpg way)."""
+    parsed = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        query["ssl"] = sslmode
+    return parsed.set(query=query)
+
+
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    poolclass=db_pool.TimedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    echo=False,
+    **db_pool.pool_options(is_async=True),   # its own share of the role's budget
+)
+db_pool.instrument(async_engine.sync_engine, "primary_async")
+
+# expire_on_commit=False: attributes stay loaded after commit, so handlers can
+# build their response without an implicit (and, async, impossible) lazy load.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
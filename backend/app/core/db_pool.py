@@ -0,0 +1,170 @@
+"""
+Connection-pool sizing per process role, and pool instrumentation.
+
+Web workers, the Celery evaluation workers and the proctoring workers used to
+share one hard-coded pool shape (10 + 20 overflow, 30 s timeout). That is far
+too many connections for a prefork Celery child that runs one task at a time,
+and when the web pool was exhausted a request just hung for 30 s with nothing
+in the logs to say why. Each deployment now sets PROCESS_ROLE and gets that
+role's entry from DB_POOLS (``size`` / ``overflow`` / ``timeout``), with
+DB_POOL_SIZE / DB_POOL_MAX_OVERFLOW / DB_POOL_TIMEOUT as per-deployment
+overrides.
+
+The asyncpg engine has a pool of its own, sized separately (``async_size`` /
+``async_overflow``, overrides DB_ASYNC_POOL_SIZE / DB_ASYNC_POOL_MAX_OVERFLOW),
+so the web role's budget is split between the two engines rather than
+doubled. Workers never touch the async engine (it connects lazily), so their
+async share is a token 1. Budget against the primary:
+
+  Σ over roles  processes × (size + overflow + async_size + async_overflow)
+                                                      < max_connections
+
+e.g. 4 web workers × 30 + 4 evaluation children × 4 + 4 proctoring × 2 = 144.
+
+Every engine's pool is built from ``TimedQueuePool`` /
+``TimedAsyncQueuePool`` and registered with ``instrument``, which exports
+(label ``pool`` = primary | primary_async | replica):
+
+  quizzie_db_pool_checkout_seconds           histogram  wait for a connection
+  quizzie_db_pool_checkout_timeouts_total    counter    waits that hit pool_timeout
+  quizzie_db_pool_checked_out                gauge      connections in use
+  quizzie_db_pool_overflow                   gauge      connections beyond pool_size
+  quizzie_db_pool_size                       gauge      configured pool_size
+  quizzie_db_connection_lifetime_seconds     histogram  connect → close
+
+A checkout that waits longer than DB_POOL_SLOW_CHECKOUT_MS is logged with the
+pool's status, so exhaustion shows up in the logs as it starts rather than as
+a wall of 30 s timeouts.
+"""
+import logging
+import time
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_LIFETIME_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 7200)
+
+_CHECKOUT = metrics.histogram(
+    "quizzie_db_pool_checkout_seconds", "Time spent waiting for a pooled DB connection",
+    ["pool"], buckets=_CHECKOUT_BUCKETS,
+)
+_TIMEOUTS = metrics.counter(
+    "quizzie_db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout", ["pool"],
+)
+_LIFETIME = metrics.histogram(
+    "quizzie_db_connection_lifetime_seconds", "Lifetime of DB connections from connect to close",
+    ["pool"], buckets=_LIFETIME_BUCKETS,
+)
+
+_pools: Dict[str, Pool] = {}
+
+
+def _pick(override, default):
+    return override if override is not None else default
+
+
+def pool_options(role: str = None, is_async: bool = False) -> Dict[str, int]:
+    """create_engine kwargs (pool_size / max_overflow / pool_timeout) for ``role``'s sync or async engine."""
+    role = role or settings.PROCESS_ROLE
+    shape = settings.DB_POOLS.get(role)
+    if shape is None:
+        logger.warning("Unknown PROCESS_ROLE %r — using the 'web' pool.", role)
+        shape = settings.DB_POOLS["web"]
+    if is_async:
+        size = _pick(settings.DB_ASYNC_POOL_SIZE, shape["async_size"])
+        overflow = _pick(settings.DB_ASYNC_POOL_MAX_OVERFLOW, shape["async_overflow"])
+    else:
+        size = _pick(settings.DB_POOL_SIZE, shape["size"])
+        overflow = _pick(settings.DB_POOL_MAX_OVERFLOW, shape["overflow"])
+    return {
+        "pool_size": size,
+        "max_overflow": overflow,
+        "pool_timeout": _pick(settings.DB_POOL_TIMEOUT, shape["timeout"]),
+    }
+
+
+class _TimedCheckout:
+    """Times ``_do_get`` — the part of a checkout that waits for a free slot."""
+    metrics_name = "unnamed"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            waited = time.perf_counter() - started
+            _TIMEOUTS.inc(pool=self.metrics_name)
+            logger.error("DB pool %s: no connection after %.1fs (%s)", self.metrics_name, waited, self.status())
+            raise
+        waited = time.perf_counter() - started
+        _CHECKOUT.observe(waited, pool=self.metrics_name)
+        if waited * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning("DB pool %s: checkout waited %.0f ms (%s)", self.metrics_name, waited * 1000,
+                           self.status())
+        return conn
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep its label and registration.
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        if _pools.get(self.metrics_name) is self:
+            _pools[self.metrics_name] = pool
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine, name: str) -> None:
+    """Label ``engine``'s pool as ``name`` and track its connections' lifetimes."""
+    pool = engine.pool
+    pool.metrics_name = name
+    _pools[name] = pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        record.info["connected_at"] = time.monotonic()
+
+    @event.listens_for(pool, "close")
+    def _on_close(dbapi_conn, record):
+        connected_at = record.info.pop("connected_at", None)
+        if connected_at is not None:
+            _LIFETIME.observe(time.monotonic() - connected_at, pool=name)
+
+
+def _collect(read) -> Dict[tuple, float]:
+    return {(name,): read(pool) for name, pool in list(_pools.items())}
+
+
+def stats() -> Dict[str, Dict]:
+    """Current state of every instrumented pool (for /admin/stats)."""
+    return {
+        name: {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checkout_waits": _CHECKOUT.snapshot(pool=name)["count"],
+            "timeouts": int(_TIMEOUTS.value(pool=name)),
+        }
+        for name, pool in list(_pools.items())
+    }
+
+
+metrics.gauge("quizzie_db_pool_checked_out", "DB connections currently checked out", ["pool"],
+              collect=lambda: _collect(lambda p: p.checkedout()))
+metrics.gauge("quizzie_db_pool_overflow", "DB connections open beyond pool_size", ["pool"],
+              collect=lambda: _collect(lambda p: max(p.overflow(), 0)))
+metrics.gauge("quizzie_db_pool_size", "Configured pool_size", ["pool"],
+              collect=lambda: _collect(lambda p: p.size()))
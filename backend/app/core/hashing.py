@@ -0,0 +1,102 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately slow (~250 ms of pure CPU per call at cost 12). Running
+it inline in the sync auth handlers meant a pre-exam login storm — 1,500
+students in 3 minutes — pinned every anyio worker thread, so unrelated sync
+endpoints (including submits from an earlier exam) queued behind it.
+
+Hashing now runs in a dedicated process pool sized to this worker's share of
+the CPUs (cores ÷ WORKERS uvicorn workers, unless HASH_POOL_WORKERS), awaited
+from async handlers so no request thread is held while bcrypt runs. Admission
+is bounded: once HASH_QUEUE_MAX jobs are in flight, new ones are shed with
+``HashingOverloaded`` (mapped to 503 + Retry-After in main.py) instead of
+queueing without limit — a client retrying in a couple of seconds is better
+than a login that times out after 30.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.core import security
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; the caller should retry later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing queue full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_in_flight = 0   # queued + running jobs; only touched from the event loop thread
+
+
+def pool_size() -> int:
+    # Every uvicorn worker has its own pool: split the cores between them.
+    return settings.HASH_POOL_WORKERS or max(1, (os.cpu_count() or 1) // max(1, settings.WORKERS))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=pool_size())
+            logger.info("Password hashing pool started with %d workers", pool_size())
+        return _executor
+
+
+def _discard(broken: ProcessPoolExecutor) -> None:
+    """Shut down ``broken`` unless another failure already replaced it."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+            broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run(fn, *args):
+    global _in_flight
+    if _in_flight >= settings.HASH_QUEUE_MAX:
+        raise HashingOverloaded(settings.HASH_RETRY_AFTER_SECONDS)
+
+    _in_flight += 1
+    try:
+        executor = _get_executor()
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM kill etc.) — rebuild on the next call and shed this one.
+        logger.exception("Password hashing pool broke; restarting it")
+        _discard(executor)
+        raise HashingOverloaded(settings.HASH_RETRY_AFTER_SECONDS)
+    finally:
+        _in_flight -= 1
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(security.verify_password, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(security.get_password_hash, password)
+
+
+def stats() -> dict:
+    return {"workers": pool_size(), "in_flight": _in_flight, "queue_max": settings.HASH_QUEUE_MAX}
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
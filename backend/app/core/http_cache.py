@@ -0,0 +1,121 @@
+"""
+Pre-rendered JSON responses with ETag / 304 support.
+
+Even on a cache hit, returning a Python list from an endpoint makes FastAPI
+validate it against the response model and serialise it again, and the full
+body then goes over the wire to every student, including one who refreshes
+the page a dozen times. For hot, shared payloads we cache the response itself
+instead:
+
+  render(payload)   → {"etag": ..., "body": "<json text>"} — small enough to
+                      live in RedisCache next to the payload it came from.
+  respond(request, rendered)
+                    → 304 if If-None-Match matches, else the body in the best
+                      encoding the client accepts (br > gzip > identity).
+
+The encoded variants are derived per process and memoised by ETag. ETags are
+content hashes, so that memo never needs invalidating — a changed payload
+simply has a new ETag. Only shared payloads are memoised: a per-student
+variant (a shuffled paper) is fetched by one client and would only evict the
+hot shared entries, so callers pass ``memoise=False`` and it is encoded per
+response. Brotli is used only if the optional ``brotli`` package
+is installed.
+"""
+import hashlib
+import gzip
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.local_cache import LocalCache
+
+try:
+    import brotli
+except ImportError:     # optional
+    brotli = None
+
+# Encoded bodies by ETag. Bounded by bytes; entries are immutable.
+_encoded = LocalCache(max_entries=4096, ttl=3600, max_bytes=128 * 1024 * 1024)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def render(payload: Any, etag: Optional[str] = None) -> Dict[str, str]:
+    """``etag`` defaults to a hash of the body; pass one if it is already known."""
+    body = orjson.dumps(payload, default=str)
+    return {"etag": etag or hashlib.blake2b(body, digest_size=16).hexdigest(), "body": body.decode()}
+
+
+def _accepted(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
+
+
+def _variant(rendered: Dict[str, str], coding: str, memoise: bool = True) -> bytes:
+    memo_key = (rendered["etag"], coding)
+    body = _encoded.get(memo_key) if memoise else None
+    if body is None:
+        raw = rendered["body"].encode()
+        if coding == "br":
+            body = brotli.compress(raw, quality=BROTLI_QUALITY)
+        elif coding == "gzip":
+            body = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+        else:
+            body = raw
+        if memoise:
+            _encoded.set(memo_key, body, size=len(body))
+    return body
+
+
+def _headers(etag: str, cache_control: str) -> Dict[str, str]:
+    return {"ETag": f'"{etag}"', "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+
+def not_modified(request: Request, etag: str, cache_control: str = "private, no-cache") -> Optional[Response]:
+    """A 304 if the client already holds ``etag``, else None — for callers
+    that can name the ETag before rendering the body."""
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_headers(etag, cache_control))
+    return None
+
+
+def respond(request: Request, rendered: Dict[str, str], cache_control: str = "private, no-cache",
+            memoise: bool = True) -> Response:
+    """``memoise=False`` for per-client bodies, so they stay out of the shared memo."""
+    etag = rendered["etag"]
+    unchanged = not_modified(request, etag, cache_control)
+    if unchanged is not None:
+        return unchanged
+    headers = _headers(etag, cache_control)
+
+    accepted = _accepted(request.headers.get("accept-encoding", ""))
+    coding = "identity"
+    if brotli is not None and "br" in accepted:
+        coding = "br"
+    elif "gzip" in accepted:
+        coding = "gzip"
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=_variant(rendered, coding, memoise), media_type="application/json", headers=headers)
+
+
+def stats() -> Dict:
+    return _encoded.stats()
@@ -0,0 +1,109 @@
+"""
+In-process TTL + LRU map.
+
+A small, thread-safe building block for caches that must answer without a
+network round trip (e.g. the L1 tier of ``RedisCache``). Entries expire after
+``ttl`` seconds and the least-recently-used entry is evicted once
+``max_entries`` — or, when ``max_bytes`` is set, the summed entry sizes the
+caller reports — is exceeded. Hit/miss/eviction counters are kept so callers
+can report how well the cache is doing.
+
+Values are stored as-is — treat anything returned from ``get`` as read-only.
+"""
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LocalCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value, size = item
+            if expires_at <= now:
+                del self._data[key]
+                self.bytes -= size
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, size: int = 0) -> None:
+        if not self.enabled:
+            return
+        if self.max_bytes and size > self.max_bytes:
+            self.pop(key)       # never let one oversized value flush the whole map
+            return
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (expires_at, value, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+            if item is _MISSING:
+                return False
+            self.bytes -= item[2]
+            return True
+
+    def pop_many(self, keys: Iterable[Hashable]) -> int:
+        return sum(1 for key in keys if self.pop(key))
+
+    def pop_matching(self, pattern: str) -> int:
+        """Drop every key matching a glob pattern (keys must be strings)."""
+        with self._lock:
+            matched = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+        return self.pop_many(matched)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
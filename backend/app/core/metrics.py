@@ -0,0 +1,204 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+We only need counters, gauges and histograms with labels, rendered in the
+Prometheus text format for GET /api/v1/admin/metrics. That is small enough
+that pulling in prometheus_client (and its multiprocess-mode caveats) isn't
+worth it. Each worker process reports its own series; scrape every worker or
+sum in PromQL.
+
+Usage:
+    from app.core import metrics
+    REQS = metrics.counter("quizzie_cache_requests_total", "Cache operations", ["family", "op"])
+    REQS.inc(family="exam:*:questions", op="get")
+
+    LAT = metrics.histogram("quizzie_cache_op_seconds", "Cache op latency", ["op"])
+    LAT.observe(0.0012, op="get")
+
+    metrics.gauge("quizzie_l1_bytes", "L1 bytes", ["family"], collect=lambda: {("exam:*",): 123})
+
+Metric objects are module-level singletons; ``counter()``/``histogram()``/
+``gauge()`` return the existing one if the name is already registered.
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets (seconds) suited to cache / DB calls: 50 µs … 5 s.
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Payload-size buckets (bytes): 64 B … 4 MiB.
+SIZE_BUCKETS = tuple(64 * 4 ** i for i in range(9))
+
+_lock = threading.Lock()
+_registry: "Dict[str, _Metric]" = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every series, without the HELP/TYPE header."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def values(self) -> Dict[LabelValues, float]:
+        with _lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}"
+                for k, v in sorted(self.values().items())]
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time by ``collect`` → {labelvalues: value}."""
+    type = "gauge"
+
+    def __init__(self, *args, collect: Optional[Callable[[], Dict[LabelValues, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with _lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            values.update(self._collect())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}"
+                for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labelvalues -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """count/sum for one series (mostly for tests and /admin/stats)."""
+        row = self._values.get(self._key(labels))
+        return {"count": row[-1], "sum": row[-2]} if row else {"count": 0, "sum": 0.0}
+
+    def _samples(self) -> List[str]:
+        with _lock:
+            values = {k: list(v) for k, v in self._values.items()}
+        lines = []
+        for key, row in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-2])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {int(row[-1])}")
+        return lines
+
+
+def _register(cls, name: str, help: str, labelnames: Iterable[str], **kwargs):
+    with _lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            return existing
+        metric = _registry[name] = cls(name, help, labelnames, **kwargs)
+        return metric
+
+
+def counter(name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _register(Counter, name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames: Iterable[str] = (),
+          collect: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+    return _register(Gauge, name, help, labelnames, collect=collect)
+
+
+def histogram(name: str, help: str, labelnames: Iterable[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format 0.0.4."""
+    with _lock:
+        metrics = list(_registry.values())
+    return "\n".join(m.render() for m in sorted(metrics, key=lambda m: m.name)) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
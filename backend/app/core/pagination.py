@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination for newest-first listings.
+
+OFFSET pagination gets slower the deeper you page, and returning everything
+gets slower as history grows. Listings here instead order by
+``(timestamp DESC, id DESC)`` and page with a row-value comparison against
+the last row seen:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+
+which is a single index range scan at any depth, given a composite index
+ending in ``(timestamp, id)`` (alembic 006). ``id`` breaks ties between rows
+created in the same microsecond.
+
+The cursor is opaque to clients: the last row's key, base64url-encoded. The
+list body is unchanged (a plain JSON array, so existing clients keep
+working); the cursor for the next page comes back in the ``X-Next-Cursor``
+header and is absent on the last page.
+
+    query = paginate(query, Exam.created_at, Exam.id, cursor, limit)
+    rows = query.all()
+    set_next_cursor(response, rows, limit, "created_at")
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(ts: datetime, row_id) -> str:
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def paginate(query, ts_column, id_column, cursor: Optional[str], limit: int):
+    """Newest-first page of ``query`` after ``cursor`` (works for ORM and column queries)."""
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(ts_column, id_column) < tuple_(ts, row_id))
+    return query.order_by(ts_column.desc(), id_column.desc()).limit(limit)
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, ts_attr: str) -> None:
+    """Point the client at the next page if this one was full."""
+    if len(rows) == limit and rows:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, ts_attr), last.id)
@@ -0,0 +1,93 @@
+"""
+Principal cache for ``get_current_user``.
+
+Every authenticated request used to run ``SELECT ... FROM users WHERE email = ?``
+— including each /monitor/frame and /monitor/audio upload, which at 2,000
+students x one frame every 2 s made it the single largest source of Postgres
+QPS. The principal (id, email, name, role, verification state) almost never
+changes, so it is cached under ``key_user(<uid claim>)`` for CACHE_TTL_USER
+(default 5 min). The ``user:*`` family has an L1 budget in RedisCache, so a
+hot principal is answered in-process with no I/O, and a cold worker still
+avoids Postgres via Redis.
+
+Keying by id rather than email means a deleted-and-re-registered account can
+never be served a stale principal. v1 tokens (no ``uid`` claim) always go to
+the database.
+
+Only the fields needed to authorise a request are cached — never the password
+hash or verification/reset tokens. Callers get a transient ``User`` instance
+that is not attached to any session.
+
+Anything that changes a user (verification, password reset, role change) must
+call ``invalidate(user_id)``. This reaches every worker's L1 via the cache's
+pub/sub channel. Out-of-band edits (e.g. ``fix_demo_accounts.py``) are picked
+up once the TTL lapses.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import UUID
+
+from app.core.cache import cache, key_user, tag_user
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+_counters = {"hits": 0, "misses": 0, "db_loads": 0, "invalidations": 0}
+
+
+def _serialize(user: User) -> Dict:
+    role = user.role.value if hasattr(user.role, "value") else str(user.role)
+    return {
+        "id": str(user.id),
+        "email": user.email,
+        "full_name": user.full_name,
+        "role": role,
+        "is_verified": bool(user.is_verified),
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+    }
+
+
+def _to_user(data: Dict) -> User:
+    """Build a fresh transient User per request so callers never share state."""
+    return User(
+        id=UUID(data["id"]),
+        email=data["email"],
+        full_name=data["full_name"],
+        role=UserRole(data["role"]),
+        is_verified=data["is_verified"],
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+    )
+
+
+async def get(user_id: str) -> Optional[User]:
+    """Return the cached principal for ``user_id``, or None on a miss."""
+    if settings.CACHE_TTL_USER <= 0:
+        return None
+    data = await cache.get(key_user(user_id))
+    if data is None:
+        _counters["misses"] += 1
+        return None
+    _counters["hits"] += 1
+    return _to_user(data)
+
+
+async def store(user: User) -> None:
+    """Cache a principal after a DB load."""
+    _counters["db_loads"] += 1
+    if settings.CACHE_TTL_USER > 0:
+        await cache.set(key_user(str(user.id)), _serialize(user),
+                        ttl=settings.CACHE_TTL_USER, tags=[tag_user(str(user.id))])
+
+
+async def invalidate(user_id: str) -> None:
+    """Drop a principal everywhere — call after any change to the user."""
+    _counters["invalidations"] += 1
+    # The explicit delete also covers principals cached before they were tagged.
+    await cache.delete(key_user(user_id))
+    await cache.invalidate_tag(tag_user(user_id))
+
+
+def stats() -> Dict:
+    return dict(_counters)
@@ -0,0 +1,188 @@
+"""
+Per-request SQL accounting: statement count, SQL time, N+1 detection and
+query budgets.
+
+We have fixed N+1 patterns more than once (see evaluation_service.py and
+analytics.py) and nothing stopped them creeping back. Every statement run
+through any engine — sync, asyncpg, replica — is now attributed to the HTTP
+request that caused it, via a ContextVar that follows the request into
+threadpool dependencies and ``run_sync`` greenlets:
+
+  X-DB-Queries / X-DB-Time-ms      response headers (plus ``Server-Timing: db``),
+                                   only with QUERY_STATS_HEADERS=true — never
+                                   in production, they describe the backend
+  quizzie_http_db_queries          histogram {route}
+  quizzie_http_db_seconds          histogram {route}
+  quizzie_db_n_plus_one_total      counter   {route}  the same SQL text ran
+                                   N_PLUS_ONE_THRESHOLD+ times in one request
+  quizzie_db_query_budget_exceeded_total
+                                   counter   {route}
+
+Routes declare how many statements they are allowed with ``@query_budget``:
+
+    @router.get("/exam/{exam_id}/live-feed")
+    @query_budget(6)
+    async def get_live_feed(...):
+
+Going over budget is logged (and counted) in production. Under pytest
+``conftest.py`` turns on ``record_violations`` and fails the test instead.
+Counting outside a request (scripts, tests) uses ``counting()``:
+
+    with query_stats.counting() as stats:
+        ...
+    assert stats.count <= 3
+"""
+import contextlib
+import logging
+import time
+from collections import Counter as _Tally
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = 5
+
+_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+_QUERIES = metrics.histogram("quizzie_http_db_queries", "SQL statements per HTTP request", ["route"],
+                             buckets=_COUNT_BUCKETS)
+_SQL_TIME = metrics.histogram("quizzie_http_db_seconds", "SQL time per HTTP request", ["route"])
+_N_PLUS_ONE = metrics.counter("quizzie_db_n_plus_one_total",
+                              "Requests that repeated one statement N_PLUS_ONE_THRESHOLD+ times", ["route"])
+_OVER_BUDGET = metrics.counter("quizzie_db_query_budget_exceeded_total",
+                               "Requests that ran more statements than their route's @query_budget", ["route"])
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: _Tally = field(default_factory=_Tally)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[str]:
+        return [sql for sql, n in self.statements.items() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Set by conftest: over-budget requests are appended here so the test fails.
+record_violations = False
+violations: List[str] = []
+
+
+# ── Engine hooks (every Engine, including async engines' sync_engine) ─────────
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.seconds += time.perf_counter() - started.pop()
+    stats.count += 1
+    # One executemany is split into several pages of the same INSERT
+    # (insertmanyvalues); those are a single batch, not an N+1.
+    if not executemany and getattr(context, "execute_style", None) is not ExecuteStyle.INSERTMANYVALUES:
+        stats.statements[statement] += 1
+
+
+@contextlib.contextmanager
+def counting():
+    """Count the statements run inside the block (outside any request)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# ── Budgets ──────────────────────────────────────────────────────────────────
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the most SQL statements one call of this route may run."""
+    def decorate(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorate
+
+
+def _route_of(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _check(scope, stats: QueryStats) -> None:
+    route = _route_of(scope)
+    _QUERIES.observe(stats.count, route=route)
+    _SQL_TIME.observe(stats.seconds, route=route)
+
+    repeated = stats.repeated()
+    if repeated:
+        _N_PLUS_ONE.inc(route=route)
+        logger.warning("Possible N+1 on %s: %d statements, repeated: %s",
+                       route, stats.count, repeated[0][:200])
+
+    budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+    if budget is not None and stats.count > budget:
+        _OVER_BUDGET.inc(route=route)
+        message = f"{scope.get('method', 'WS')} {route} ran {stats.count} SQL statements (budget {budget})"
+        logger.warning(message)
+        if record_violations:
+            violations.append(message)
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop): installs a fresh
+    ``QueryStats`` per HTTP request and adds the headers on the way out. The
+    headers can only cover statements run before the response starts, which
+    is all of them except those in a streaming body; metrics and budget
+    checks see the full count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.QUERY_STATS_HEADERS:
+                ms = f"{stats.seconds * 1000:.1f}"
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", ms.encode()),
+                    (b"server-timing", f"db;dur={ms}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            _check(scope, stats)
@@ -0,0 +1,76 @@
+"""
+Short-lived JWT revocation list, kept in Redis.
+
+Access tokens are stateless, so a leaked token stays valid until it expires.
+Two kinds of entries cover that window:
+
+  revoked:jti:<jti>     one specific token (e.g. logout, a token seen in logs)
+  revoked:user:<uid>    every token for a user issued before a moment, in
+                        milliseconds (password reset, compromised account)
+
+Entries only need to live as long as the tokens they cancel, so each key's TTL
+is the remaining token lifetime — the list never grows beyond the set of
+still-valid revoked tokens. When Redis is unavailable revocation cannot be
+checked and tokens are accepted (same fail-open policy as the rest of the
+cache layer).
+"""
+import time
+from typing import Optional
+
+from app.core.cache import cache, key_revoked_token, key_user_token_cutoff
+from app.core.config import settings
+
+
+# Cutoffs written before they were in milliseconds are seconds: anything this
+# small (year 5138 in seconds, 1973 in ms) is one of those.
+_LEGACY_CUTOFF_MAX = 10 ** 11
+
+
+def _max_token_lifetime() -> int:
+    return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+async def revoke_token(jti: str, exp: Optional[int] = None) -> None:
+    """Revoke one token until its own expiry."""
+    ttl = int(exp - time.time()) if exp else _max_token_lifetime()
+    if ttl > 0:
+        await cache.set(key_revoked_token(jti), 1, ttl=ttl)
+
+
+async def revoke_user_tokens(user_id: str) -> None:
+    """Revoke every token issued to ``user_id`` before now."""
+    await cache.set(key_user_token_cutoff(user_id), int(time.time() * 1000), ttl=_max_token_lifetime())
+
+
+def _issued_ms(payload: dict) -> Optional[int]:
+    """When the token was issued, in ms. Tokens from before the ``iatm`` claim
+    only have whole seconds; they count from the start of that second."""
+    if payload.get("iatm") is not None:
+        return int(payload["iatm"])
+    iat = payload.get("iat")
+    return int(iat) * 1000 if iat is not None else None
+
+
+async def is_revoked(payload: dict) -> bool:
+    """True if the decoded token has been revoked individually or per-user."""
+    if not cache.is_available:
+        return False
+    jti = payload.get("jti")
+    uid = payload.get("uid")
+    if not jti and not uid:
+        return False
+
+    # Both entries in one MGET — this runs on every authenticated request.
+    jti_key = key_revoked_token(jti) if jti else None
+    cutoff_key = key_user_token_cutoff(uid) if uid else None
+    found = await cache.get_many([k for k in (jti_key, cutoff_key) if k])
+    if jti_key and found.get(jti_key):
+        return True
+    cutoff = found.get(cutoff_key) if cutoff_key else None
+    issued = _issued_ms(payload)
+    if cutoff is None or issued is None:
+        return False
+    cutoff = int(cutoff)
+    if cutoff < _LEGACY_CUTOFF_MAX:
+        cutoff = (cutoff + 1) * 1000    # written in seconds, meaning "at or before"
+    return issued < cutoff
@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -12,14 +13,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Token format version. v2 tokens carry the principal (uid / role / ver) so hot
+# endpoints can authorise from the claims alone; v1 tokens only carry `sub`.
+TOKEN_VERSION = 2
+
+
+def token_claims(user) -> dict:
+    """Claims for a v2 access token — everything needed to authorise a request."""
+    role = user.role.value if hasattr(user.role, "value") else str(user.role)
+    return {
+        "sub": user.email,
+        "uid": str(user.id),
+        "role": role,
+        "ver": bool(user.is_verified),
+        "tv": TOKEN_VERSION,
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    # iat/jti let individual tokens (or every token issued before a moment)
+    # be revoked — see app.core.revocation. iat is whole seconds; iatm is the
+    # same moment in milliseconds, so a login right after a password reset
+    # is not caught by that reset's cutoff.
+    iat_ms = int(now.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    to_encode.update({"exp": expire, "iat": now, "iatm": iat_ms, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
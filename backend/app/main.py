@@ -8,10 +8,13 @@ from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
 from app.core.cache import cache
+from app.core.database import async_engine
+from app.core import hashing, query_stats
 
 import app.models  # noqa: F401 — registers all models before Alembic
 
-from app.api.v1 import auth, exams, questions, attempts, analytics, monitoring
+from app.api.v1 import auth, exams, questions, attempts, analytics, monitoring, admin
+from app.services import autosave
 
 try:
     from app.api.v1 import enhanced_monitoring
@@ -21,7 +24,11 @@ except Exception as e:
     _enhanced_ok = False
 
 # ── Rate limiter ───────────────────────────────────────────────────────────────
-limiter = Limiter(key_func=get_remote_address, default_limits=["200/minute"])
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200/minute"],
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -42,6 +49,16 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(hashing.HashingOverloaded)
+async def hashing_overloaded_handler(request: Request, exc: hashing.HashingOverloaded):
+    # Login storm: shed instead of queueing unboundedly behind bcrypt.
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # ── CORS ───────────────────────────────────────────────────────────────────────
 app.add_middleware(
     CORSMiddleware,
@@ -49,8 +66,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-DB-Queries", "X-DB-Time-ms", "Server-Timing"],
 )
 
+# ── SQL accounting per request (X-DB-* headers, N+1 / budget checks) ──────────
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
 # ── Routers ────────────────────────────────────────────────────────────────────
 app.include_router(auth.router,       prefix="/api/v1/auth",       tags=["Authentication"])
 app.include_router(exams.router,      prefix="/api/v1/exams",      tags=["Exams"])
@@ -58,6 +79,7 @@ app.include_router(questions.router,  prefix="/api/v1/exams",      tags=["Questi
 app.include_router(attempts.router,   prefix="/api/v1/attempts",   tags=["Attempts"])
 app.include_router(analytics.router,  prefix="/api/v1/analytics",  tags=["Analytics"])
 app.include_router(monitoring.router, prefix="/api/v1/monitor",    tags=["Monitoring"])
+app.include_router(admin.router,      prefix="/api/v1/admin",      tags=["Admin"])
 
 if _enhanced_ok:
     app.include_router(
@@ -93,10 +115,16 @@ async def startup():
         from app.core.database import Base, engine
         Base.metadata.create_all(bind=engine)
 
+    # 3. Auto-save write-behind flusher (only with Redis)
+    autosave.start()
+
 
 @app.on_event("shutdown")
 async def shutdown():
+    await autosave.stop()
     await cache.disconnect()
+    await async_engine.dispose()
+    hashing.shutdown()
 
 
 # ── Health ─────────────────────────────────────────────────────────────────────
@@ -108,6 +136,7 @@ def root():
 
 @app.get("/health")
 async def health_check():
+    """Public liveness check. Internal stats are on /api/v1/admin/stats."""
     return {
         "status": "healthy",
         "cache": "connected" if cache.is_available else "unavailable",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum, Boolean, ARRAY
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum, Boolean, ARRAY, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -36,6 +36,11 @@ class ExamAttempt(Base):
 
 class Response(Base):
     __tablename__ = "responses"
+    # One answer per question per attempt: submit / auto-save upsert on this
+    # key (ON CONFLICT), so retries can't duplicate rows.
+    __table_args__ = (
+        UniqueConstraint("attempt_id", "question_id", name="uq_responses_attempt_question"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     attempt_id = Column(UUID(as_uuid=True), ForeignKey("exam_attempts.id", ondelete="CASCADE"))
@@ -39,4 +39,26 @@ class Exam(ExamBase):
         return v.value if hasattr(v, 'value') else str(v)
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ExamSummary(BaseModel):
+    """``GET /exams/?view=compact`` rows: an Exam without its description."""
+    id: UUID
+    title: str
+    status: str
+    duration_minutes: int
+    total_marks: int
+    pass_percentage: Optional[float] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    created_by: UUID
+    created_at: datetime
+    updated_at: datetime
+
+    @field_validator('status', mode='before')
+    @classmethod
+    def normalise_status(cls, v):
+        return v.value if hasattr(v, 'value') else str(v)
+
+    class Config:
+        from_attributes = True
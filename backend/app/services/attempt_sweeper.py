@@ -0,0 +1,105 @@
+"""
+Deadline sweeper: closes in-progress attempts whose time is up.
+
+An attempt's deadline is ``started_at + exam.duration_minutes``, or the
+exam's ``end_time`` if that comes first. The exam page submits by itself when
+the timer runs out, but a closed tab, a dead laptop or a lost network never
+does, and such attempts used to stay in progress until the student came back
+(``start_exam`` closed attempts older than 24 h) or someone ran
+fix_stuck_attempts.py, which loaded every in-progress row into Python.
+
+``sweep`` runs from Celery beat every ATTEMPT_SWEEP_INTERVAL seconds
+(app/worker/tasks/attempt_tasks.py) and closes attempts
+ATTEMPT_DEADLINE_GRACE_SECONDS past their deadline, ATTEMPT_SWEEP_BATCH at a
+time. Each batch is one transaction:
+
+  1. SELECT ... FOR UPDATE SKIP LOCKED    the oldest expired attempts, via the
+                                          partial index on in-progress
+                                          started_at (alembic 008)
+  2. autosave.write_pending_sync          answers still buffered in Redis
+  3. UPDATE ... FROM exams RETURNING      status SUBMITTED, submitted_at = the
+                                          deadline, time_taken_seconds
+
+and the buffers are dropped once it commits. Memory is one batch of ids
+however many attempts are open. A submit racing the sweeper holds the row
+lock first or finds the attempt already submitted — never both. The exams
+that had attempts closed are returned so the caller can queue one batch
+evaluation per exam rather than one task per attempt.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Integer, Interval, cast, extract, func, literal_column, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.attempt import AttemptStatus, ExamAttempt
+from app.models.exam import Exam
+from app.services import autosave
+
+logger = logging.getLogger(__name__)
+
+_MINUTE = literal_column("INTERVAL '1 minute'", type_=Interval)
+_by_duration = ExamAttempt.started_at + Exam.duration_minutes * _MINUTE
+# Deadline of an attempt (evaluated with exam_attempts joined to exams).
+deadline = func.least(_by_duration, func.coalesce(Exam.end_time, _by_duration))
+
+
+def close_expired(db: Session, now: datetime, limit: int, exam_id: Optional[UUID] = None,
+                  student_id: Optional[UUID] = None) -> List[Tuple[UUID, UUID]]:
+    """
+    Close up to ``limit`` attempts more than the grace period past their
+    deadline, optionally only one exam's / student's. Returns (attempt id,
+    exam id) for each; the caller commits.
+    """
+    cutoff = now - timedelta(seconds=settings.ATTEMPT_DEADLINE_GRACE_SECONDS)
+    query = (
+        select(ExamAttempt.id)
+        .join(Exam, Exam.id == ExamAttempt.exam_id)
+        .where(ExamAttempt.status == AttemptStatus.IN_PROGRESS, deadline < cutoff)
+        .order_by(ExamAttempt.started_at)
+        .limit(limit)
+        .with_for_update(of=ExamAttempt, skip_locked=True)
+    )
+    if exam_id is not None:
+        query = query.where(ExamAttempt.exam_id == exam_id)
+    if student_id is not None:
+        query = query.where(ExamAttempt.student_id == student_id)
+    ids = db.execute(query).scalars().all()
+    if not ids:
+        return []
+
+    autosave.write_pending_sync(db, ids)
+    closed_at = func.least(deadline, now)
+    return [tuple(row) for row in db.execute(
+        update(ExamAttempt)
+        .where(ExamAttempt.id.in_(ids), Exam.id == ExamAttempt.exam_id)
+        .values(
+            status=AttemptStatus.SUBMITTED,
+            submitted_at=closed_at,
+            time_taken_seconds=cast(extract("epoch", closed_at - ExamAttempt.started_at), Integer),
+        )
+        .returning(ExamAttempt.id, ExamAttempt.exam_id)
+        .execution_options(synchronize_session=False)
+    )]
+
+
+def sweep(db: Session, now: Optional[datetime] = None) -> Dict:
+    """Close every expired attempt, a batch per transaction. Returns counts and the exams touched."""
+    now = now or datetime.utcnow()
+    closed, exams = 0, set()
+    while True:
+        batch = close_expired(db, now, settings.ATTEMPT_SWEEP_BATCH)
+        db.commit()
+        if not batch:
+            break
+        autosave.discard_sync(attempt_id for attempt_id, _ in batch)
+        closed += len(batch)
+        exams.update(exam_id for _, exam_id in batch)
+        if len(batch) < settings.ATTEMPT_SWEEP_BATCH:
+            break
+    if closed:
+        logger.info("Deadline sweep closed %d attempt(s) across %d exam(s)", closed, len(exams))
+    return {"closed": closed, "exam_ids": sorted(str(e) for e in exams)}
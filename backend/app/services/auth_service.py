@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password, get_password_hash, create_access_token, token_claims
 from datetime import timedelta
 from app.core.config import settings
 from typing import Optional
@@ -48,7 +48,7 @@ class AuthService:
         """
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email},
+            data=token_claims(user),
             expires_delta=access_token_expires
         )
         return access_token
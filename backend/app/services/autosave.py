@@ -0,0 +1,419 @@
+"""
+Auto-save: answers buffered in Redis per attempt and written to ``responses``
+behind the request (write-behind).
+
+The exam page saves every few seconds. Writing each save straight to
+Postgres would turn 500 students × one save per 10 s into a steady stream of
+small transactions during the exam, most of them rewriting answers that had
+not changed. Instead a save only touches Redis, and a flusher drains the
+buffer into the database in batches:
+
+  attempt:{id}:autosave   hash  question id → latest unflushed answer
+  autosave:dirty          zset  attempt id → when its oldest unflushed answer
+                                arrived (ZADD NX, so the score is the age)
+
+  save()        HSET the changed answers + ZADD NX — one round trip, no SQL.
+  flush_once()  take the AUTOSAVE_FLUSH_BATCH oldest dirty attempts, read
+                their hashes and write everything in one transaction, then
+                drop each answer that is still the one written (one Lua
+                compare-and-delete per attempt). Several answers to the same
+                question between flushes become one row write.
+  pending() / discard()
+                submit merges one attempt's buffer with the final payload,
+                writes only what the database does not already hold, and
+                drops the buffer after the commit — a failed submit keeps it.
+  write_pending_sync() / discard_sync()
+                the deadline sweeper (sync, Celery): write what is buffered
+                for the attempts it closes, drop the buffers once committed.
+
+Writes lock the attempt rows (FOR UPDATE) and skip attempts that are no
+longer in progress, so a flush racing a submit can never overwrite the final
+answers: submit takes the same lock first, and once it commits the attempt is
+no longer in progress. Nothing leaves the buffer before the database holds
+it, so a submit that lands between a flush's read and its write still finds
+every buffered answer in ``pending()``.
+
+Every API worker runs a flusher, but a tick only flushes under a short Redis
+lease (FLUSH_LEASE_KEY, SET NX PX AUTOSAVE_FLUSH_LEASE, released with a
+compare-and-delete): the other workers skip that tick instead of upserting
+the same sheets again and queueing on the same attempt locks.
+
+Without Redis, ``save`` reports False and the endpoint writes through to the
+database directly. If a flush fails, the buffer is untouched and the attempts
+are retried on the next tick.
+
+Every write is one multi-row INSERT ... ON CONFLICT (attempt_id, question_id)
+DO UPDATE (unique since alembic 007), however many answers it carries —
+psycopg2 / asyncpg send the rows as batched VALUES lists.
+
+Metrics (app/core/metrics):
+  quizzie_autosave_answers_total{path}       answers received (buffered/direct)
+  quizzie_autosave_rows_written_total{by}    response rows written (flusher/submit/direct/sweeper)
+  quizzie_autosave_write_amplification       rows written / answers received
+  quizzie_autosave_flush_lag_seconds         age of the oldest answer at flush
+  quizzie_autosave_flush_seconds             duration of one flush
+  quizzie_autosave_backlog                   attempts waiting to be flushed
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional
+from uuid import UUID, uuid4
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import cache, key_autosave
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.attempt import AttemptStatus, ExamAttempt, Response
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = "autosave:dirty"
+FLUSH_LEASE_KEY = "autosave:flush:lock"
+
+Answer = Dict          # {"selected_option_ids": [str], "answer_text": str | None, "marked_for_review": bool}
+Sheet = Dict[str, Answer]
+
+_ANSWERS = metrics.counter("quizzie_autosave_answers_total", "Auto-saved answers received.", ["path"])
+_ROWS = metrics.counter("quizzie_autosave_rows_written_total", "Response rows written from auto-save.", ["by"])
+_LAG = metrics.histogram("quizzie_autosave_flush_lag_seconds", "Age of the oldest buffered answer when flushed.")
+_FLUSH = metrics.histogram("quizzie_autosave_flush_seconds", "Duration of one auto-save flush.")
+
+
+def _amplification() -> float:
+    received = sum(_ANSWERS.values().values())
+    return sum(_ROWS.values().values()) / received if received else 0.0
+
+
+metrics.gauge("quizzie_autosave_write_amplification", "Response rows written per answer received.",
+              collect=lambda: {(): _amplification()})
+_BACKLOG = metrics.gauge("quizzie_autosave_backlog", "Attempts with buffered answers not yet flushed.")
+
+# KEYS: buffer hash, dirty zset. ARGV: attempt id, then question id / flushed
+# value pairs. Drops each answer still equal to what was written; a newer save
+# stays buffered, and the attempt stays dirty until its hash is empty.
+_DROP_FLUSHED = """
+for i = 2, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+if redis.call('HLEN', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+# Compare-and-delete, so a flusher whose lease expired can't release another's.
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+def answer(selected_option_ids: Iterable = (), answer_text: Optional[str] = None,
+           marked_for_review: bool = False) -> Answer:
+    """Canonical form, so equal answers compare equal however they arrived."""
+    return {
+        "selected_option_ids": sorted(str(o) for o in selected_option_ids or ()),
+        "answer_text": answer_text,
+        "marked_for_review": bool(marked_for_review),
+    }
+
+
+def sheet_from(responses) -> Sheet:
+    """``ResponseCreate`` items → {question id: answer}."""
+    return {
+        str(r.question_id): answer(r.selected_option_ids, r.answer_text, r.marked_for_review)
+        for r in responses
+    }
+
+
+# ── Redis buffer ─────────────────────────────────────────────────────────────
+
+async def save(attempt_id, sheet: Sheet) -> bool:
+    """Buffer ``sheet``; False if Redis is unavailable (the caller writes through)."""
+    client = cache.client
+    if client is None or not sheet:
+        return False
+    key = key_autosave(str(attempt_id))
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.hset(key, mapping={qid: orjson.dumps(a) for qid, a in sheet.items()})
+        pipe.expire(key, settings.AUTOSAVE_BUFFER_TTL)
+        pipe.zadd(DIRTY_KEY, {str(attempt_id): time.time()}, nx=True)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("Auto-save buffer unavailable (%s) — writing through.", e)
+        return False
+    _ANSWERS.inc(len(sheet), path="buffered")
+    return True
+
+
+def _decode(raw: Dict) -> Sheet:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): orjson.loads(v)
+        for k, v in (raw or {}).items()
+    }
+
+
+async def pending(attempt_id) -> Sheet:
+    """Buffered, not yet flushed answers for one attempt (left in place)."""
+    client = cache.client
+    if client is None:
+        return {}
+    try:
+        return _decode(await client.hgetall(key_autosave(str(attempt_id))))
+    except Exception as e:
+        logger.warning("Auto-save buffer read failed for %s: %s", attempt_id, e)
+        return {}
+
+
+async def discard(attempt_id) -> None:
+    """Drop one attempt's buffer once its answers are committed (submit)."""
+    client = cache.client
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(key_autosave(str(attempt_id)))
+        pipe.zrem(DIRTY_KEY, str(attempt_id))
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("Could not drop written auto-save buffer for %s: %s", attempt_id, e)
+
+
+def pending_many_sync(attempt_ids: Iterable) -> Dict[str, Sheet]:
+    """Buffered answers for several attempts, left in place (the deadline sweeper)."""
+    client = cache.sync_client
+    ids = [str(a) for a in attempt_ids]
+    if client is None or not ids:
+        return {}
+    try:
+        pipe = client.pipeline(transaction=False)
+        for attempt_id in ids:
+            pipe.hgetall(key_autosave(attempt_id))
+        raws = pipe.execute()
+    except Exception as e:
+        logger.warning("Auto-save buffer read failed for %d attempt(s): %s", len(ids), e)
+        return {}
+    return {attempt_id: sheet for attempt_id, raw in zip(ids, raws) if (sheet := _decode(raw))}
+
+
+def discard_sync(attempt_ids: Iterable) -> None:
+    """Drop buffers whose answers are already in the database."""
+    client = cache.sync_client
+    ids = [str(a) for a in attempt_ids]
+    if client is None or not ids:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(*(key_autosave(a) for a in ids))
+        pipe.zrem(DIRTY_KEY, *ids)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Could not drop %d written auto-save buffer(s): %s", len(ids), e)
+
+
+# ── Database writes (sync; async callers use ``AsyncSession.run_sync``) ─────
+
+def write_answers(db: Session, sheets: Dict[str, Sheet]) -> int:
+    """
+    Upsert {attempt id: {question id: answer}} for attempts still in progress
+    (locked FOR UPDATE until the caller commits). Returns rows written.
+    """
+    if not sheets:
+        return 0
+    live = {
+        str(a) for a in db.execute(
+            select(ExamAttempt.id)
+            .where(ExamAttempt.id.in_([UUID(a) for a in sheets]),
+                   ExamAttempt.status == AttemptStatus.IN_PROGRESS)
+            .with_for_update()
+        ).scalars()
+    }
+    rows = [
+        {
+            "attempt_id": UUID(attempt_id),
+            "question_id": UUID(qid),
+            "selected_option_ids": [UUID(o) for o in a["selected_option_ids"]],
+            "answer_text": a["answer_text"],
+            "marked_for_review": a["marked_for_review"],
+        }
+        for attempt_id, sheet in sheets.items() if attempt_id in live
+        for qid, a in sheet.items()
+    ]
+    if not rows:
+        return 0
+    stmt = pg_insert(Response)
+    db.execute(
+        stmt.on_conflict_do_update(
+            constraint="uq_responses_attempt_question",
+            set_={
+                "selected_option_ids": stmt.excluded.selected_option_ids,
+                "answer_text": stmt.excluded.answer_text,
+                "marked_for_review": stmt.excluded.marked_for_review,
+                "answered_at": stmt.excluded.answered_at,
+            },
+        ),
+        rows,
+    )
+    return len(rows)
+
+
+def write_tail(db: Session, attempt_id, sheet: Sheet) -> int:
+    """Write only the answers in ``sheet`` that differ from what is stored."""
+    stored = {
+        str(r.question_id): answer(r.selected_option_ids, r.answer_text, r.marked_for_review)
+        for r in db.execute(
+            select(Response.question_id, Response.selected_option_ids,
+                   Response.answer_text, Response.marked_for_review)
+            .where(Response.attempt_id == attempt_id)
+        )
+    }
+    tail = {qid: a for qid, a in sheet.items() if stored.get(qid) != a}
+    written = write_answers(db, {str(attempt_id): tail}) if tail else 0
+    _ROWS.inc(written, by="submit")
+    return written
+
+
+def write_pending_sync(db: Session, attempt_ids: Iterable) -> list:
+    """
+    Write what is still buffered for these attempts (the deadline sweeper,
+    before it closes them). The caller commits, then ``discard_sync`` on the
+    returned ids — the buffers that had anything.
+    """
+    sheets = pending_many_sync(attempt_ids)
+    _ROWS.inc(write_answers(db, sheets), by="sweeper")
+    return list(sheets)
+
+
+def save_direct(db: Session, attempt_id, sheet: Sheet) -> int:
+    """Write-through used when Redis is unavailable (the caller commits)."""
+    _ANSWERS.inc(len(sheet), path="direct")
+    written = write_answers(db, {str(attempt_id): sheet})
+    _ROWS.inc(written, by="direct")
+    return written
+
+
+# ── Flusher ──────────────────────────────────────────────────────────────────
+
+async def flush_once() -> int:
+    """
+    Move the oldest buffered sheets into ``responses``. Returns rows written
+    (0 as well when another worker holds the flush lease).
+    """
+    client = cache.client
+    if client is None:
+        return 0
+    token = uuid4().hex
+    try:
+        if not await client.set(FLUSH_LEASE_KEY, token, nx=True,
+                                px=int(settings.AUTOSAVE_FLUSH_LEASE * 1000)):
+            return 0
+    except Exception as e:
+        logger.warning("Auto-save flush could not take the lease: %s", e)
+        return 0
+    try:
+        return await _flush(client)
+    finally:
+        try:
+            await client.eval(_RELEASE_LEASE, 1, FLUSH_LEASE_KEY, token)
+        except Exception as e:
+            # The lease expires on its own.
+            logger.debug("Auto-save flush lease release failed: %s", e)
+
+
+async def _flush(client) -> int:
+    started = time.perf_counter()
+    try:
+        entries = await client.zrange(DIRTY_KEY, 0, settings.AUTOSAVE_FLUSH_BATCH - 1, withscores=True)
+        if not entries:
+            _BACKLOG.set(0)
+            return 0
+        pipe = client.pipeline(transaction=False)
+        for member, _ in entries:
+            pipe.hgetall(key_autosave(member.decode() if isinstance(member, bytes) else member))
+        results = await pipe.execute()
+    except Exception as e:
+        logger.warning("Auto-save flush could not read the buffer: %s", e)
+        return 0
+
+    since = {(m.decode() if isinstance(m, bytes) else m): score for m, score in entries}
+    raws = dict(zip(since, results))
+    sheets = {attempt_id: sheet for attempt_id, raw in raws.items() if (sheet := _decode(raw))}
+    _LAG.observe(time.time() - min(since.values()))
+
+    try:
+        async with AsyncSessionLocal() as db:
+            written = await db.run_sync(write_answers, sheets)
+            await db.commit()
+    except Exception as e:
+        logger.warning("Auto-save flush of %d attempt(s) failed, will retry: %s", len(sheets), e)
+        return 0
+
+    # Only now that the answers are committed may they leave the buffer.
+    try:
+        pipe = client.pipeline(transaction=False)
+        for attempt_id, raw in raws.items():
+            flushed = [part for field_value in (raw or {}).items() for part in field_value]
+            pipe.eval(_DROP_FLUSHED, 2, key_autosave(attempt_id), DIRTY_KEY, attempt_id, *flushed)
+        await pipe.execute()
+    except Exception as e:
+        # Harmless: the same answers are upserted again on the next tick.
+        logger.warning("Could not drop %d flushed auto-save buffer(s): %s", len(raws), e)
+
+    _ROWS.inc(written, by="flusher")
+    _FLUSH.observe(time.perf_counter() - started)
+    try:
+        _BACKLOG.set(await client.zcard(DIRTY_KEY))
+    except Exception:
+        pass
+    return written
+
+
+_task: Optional[asyncio.Task] = None
+
+
+async def _run() -> None:
+    while True:
+        await asyncio.sleep(settings.AUTOSAVE_FLUSH_INTERVAL)
+        try:
+            await flush_once()
+        except Exception as e:        # never let the loop die
+            logger.exception("Auto-save flusher error: %s", e)
+
+
+def start() -> None:
+    """Start this process's flusher (API startup; needs Redis)."""
+    global _task
+    if _task is None and cache.is_available and settings.AUTOSAVE_FLUSH_INTERVAL > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Stop the flusher and flush what is left (API shutdown)."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    if cache.is_available:
+        await flush_once()
+
+
+def stats() -> Dict:
+    return {
+        "answers": {labels[0]: v for labels, v in _ANSWERS.values().items()},
+        "rows_written": {labels[0]: v for labels, v in _ROWS.values().items()},
+        "write_amplification": round(_amplification(), 3),
+        "flush_lag": _LAG.snapshot(),
+    }
@@ -0,0 +1,106 @@
+"""
+Queueing evaluation: one task per attempt, or one batch per exam.
+
+A submit in the middle of an exam queues ``evaluate_attempt_task`` so the
+student's score is ready in seconds. At the deadline every open exam page
+auto-submits within the same few seconds. A task per attempt there means
+thousands of broker round trips, and each task opens its own session and
+reads the answer key. So the burst is evaluated per exam instead:
+
+  in_deadline_burst()   the submit is within EVALUATION_BURST_SLACK_SECONDS
+                        of the attempt's deadline (started_at + duration, or
+                        the exam's end_time if earlier), or past it
+  join_exam_batch()     the first such submit of an exam sets a Redis marker
+                        for EVALUATION_BURST_WINDOW_SECONDS and queues
+                        ``evaluate_exam_batch_task`` with that countdown; the
+                        rest see the marker and leave their attempt SUBMITTED
+                        for it. Submits commit before they look at the marker
+                        and the task starts no earlier than the marker
+                        expires, so every skipped attempt is there to claim.
+  queue_exam_batch()    the exam was set to ``ended`` — drain it now.
+
+Without Redis or Celery ``join_exam_batch`` returns None and the caller uses
+the per-attempt path (which itself falls back to evaluating inline).
+"""
+import concurrent.futures
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.cache import cache, key_evaluation_batch
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Module-level so tests can patch it; Celery is lazy, the import itself is safe.
+try:
+    from app.worker.tasks.evaluation_tasks import evaluate_exam_batch_task
+except Exception:
+    evaluate_exam_batch_task = None
+
+DISPATCH_TIMEOUT = 5    # seconds; apply_async can block while the broker refuses
+
+
+def apply_async_capped(task_fn, args, **options):
+    """``task_fn.apply_async`` in a thread, giving up after DISPATCH_TIMEOUT."""
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        return pool.submit(task_fn.apply_async, args=args, **options).result(timeout=DISPATCH_TIMEOUT)
+    finally:
+        pool.shutdown(wait=False)   # don't wait out a hung connect
+
+
+def deadline(started_at: datetime, duration_minutes: int, end_time: Optional[datetime]) -> datetime:
+    by_duration = started_at + timedelta(minutes=duration_minutes)
+    return min(by_duration, end_time) if end_time else by_duration
+
+
+def in_deadline_burst(submitted_at: datetime, started_at: datetime, duration_minutes: int,
+                      end_time: Optional[datetime]) -> bool:
+    slack = timedelta(seconds=settings.EVALUATION_BURST_SLACK_SECONDS)
+    return submitted_at >= deadline(started_at, duration_minutes, end_time) - slack
+
+
+async def join_exam_batch(exam_id: str) -> Optional[str]:
+    """
+    Leave this exam's evaluation to a batch: 'queued' (this call queued it),
+    'joined' (one is already queued) or None (no Redis/Celery — evaluate per
+    attempt instead).
+    """
+    client = cache.client
+    if evaluate_exam_batch_task is None or client is None:
+        return None
+    window = settings.EVALUATION_BURST_WINDOW_SECONDS
+    key = key_evaluation_batch(exam_id)
+    try:
+        if not await client.set(key, 1, nx=True, ex=window):
+            return "joined"
+    except Exception as e:
+        logger.warning("Evaluation batch marker unavailable for exam %s: %s", exam_id, e)
+        return None
+
+    try:
+        await run_in_threadpool(apply_async_capped, evaluate_exam_batch_task, [exam_id], countdown=window)
+    except Exception as e:
+        logger.warning("Could not queue batch evaluation for exam %s (%s) — per attempt instead.", exam_id, e)
+        try:
+            await client.delete(key)
+        except Exception:
+            pass
+        return None
+    logger.info("Deadline burst on exam %s: batch evaluation queued in %d s", exam_id, window)
+    return "queued"
+
+
+def queue_exam_batch(exam_id: str) -> bool:
+    """Queue a batch evaluation of the exam now (it was ended). Best-effort."""
+    if evaluate_exam_batch_task is None:
+        return False
+    try:
+        apply_async_capped(evaluate_exam_batch_task, [exam_id])
+    except Exception as e:
+        logger.warning("Could not queue batch evaluation for ended exam %s: %s", exam_id, e)
+        return False
+    return True
@@ -2,21 +2,105 @@
 EvaluationService — fixed N+1.
 
 Old code: for each response → query Question → query Options (N×M queries).
-New code: one JOIN query loads all questions + options in a single round-trip.
+Then: one JOIN query for all questions + options, cached in Redis.
+Now: the exam's answer key is compiled once per process and exam version
+(``exam_cache.compiled_answer_key`` — correct options as frozensets, checked
+against a small version key in Redis), so at exam end, when thousands of
+attempts of the same exam are evaluated, each one is
+
+  1 SELECT   the attempt's exam id and its responses (one outer join)
+  1 UPDATE   the attempt's score and status, with the responses' marks
+             written by a data-modifying CTE (UPDATE ... FROM unnest(arrays))
+
+``evaluate_attempts`` does the same for many attempts at once — still one
+SELECT and one UPDATE, however many attempts — and ``evaluate_pending``
+drains an exam's SUBMITTED attempts a chunk at a time for the batch Celery
+task (app/worker/tasks/evaluation_tasks.py). Chunks are claimed with
+FOR UPDATE SKIP LOCKED, so several workers can drain the same exam.
+
+Shuffled papers (app/services/shuffle.py) need no inverse mapping here:
+responses carry real question and option ids, whatever order they were shown in.
 """
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
+from sqlalchemy import Boolean, Numeric, bindparam, column, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import Session
 from uuid import UUID
-from typing import Dict
+from typing import Dict, Iterable, List, Sequence, Tuple
 
 from app.models.attempt import ExamAttempt, Response, AttemptStatus
-from app.models.question import Question, Option, MANUAL_QUESTION_TYPES
-from app.models.exam import Exam
-
+from app.models.question import MANUAL_QUESTION_TYPES
+from app.services.exam_cache import KeyEntry, compiled_answer_key
+
+
+_UUID = PG_UUID(as_uuid=True)
+
+
+def _unnest(name: str, columns: Sequence[Tuple[str, object]], rows: List[Tuple]):
+    """
+    ``rows`` as a table: unnest() over one array parameter per column. Unlike
+    VALUES the statement text does not grow with the row count, so it is
+    compiled once and cached rather than rebuilt for every chunk.
+    """
+    arrays = list(zip(*rows))
+    return func.unnest(*(
+        bindparam(f"{name}_{col}", list(arrays[i]), type_=ARRAY(type_))
+        for i, (col, type_) in enumerate(columns)
+    )).table_valued(*(column(col, type_) for col, type_ in columns)).render_derived(name=name)
+
+
+def _score(rows, answer_key: Dict[str, KeyEntry]) -> Tuple[Dict, List[Tuple]]:
+    """One attempt's result, and (response id, is_correct, marks) for each auto-graded response."""
+    total_marks = 0
+    obtained_marks = 0.0
+    correct_count = 0
+    pending_grading = 0
+    topic_stats: Dict[str, Dict] = {}
+    graded = []
+
+    for response in rows:
+        question = answer_key.get(str(response.question_id))
+        if not question:
+            continue
+
+        total_marks += question.marks
+
+        # Coding/subjective: graded manually by an examiner. Never auto-score
+        # or overwrite an examiner's marks — just tally what's already graded
+        # and flag the rest as pending.
+        if question.type in MANUAL_QUESTION_TYPES:
+            if response.marks_awarded is not None:
+                obtained_marks += float(response.marks_awarded)
+            else:
+                pending_grading += 1
+            continue
+
+        selected = frozenset(response.selected_option_ids or ())
+        is_correct = bool(question.correct) and question.correct == selected
+        marks = question.marks if is_correct else 0
+        graded.append((response.id, is_correct, marks))
+
+        if is_correct:
+            obtained_marks += marks
+            correct_count += 1
+
+        topic = question.topic
+        if topic:
+            if topic not in topic_stats:
+                topic_stats[topic] = {"correct": 0, "total": 0}
+            topic_stats[topic]["total"] += 1
+            if is_correct:
+                topic_stats[topic]["correct"] += 1
 
-def _qtype(question) -> str:
-    qt = question.question_type
-    return qt.value if hasattr(qt, "value") else str(qt)
+    score = (obtained_marks / total_marks * 100) if total_marks > 0 else 0
+    return {
+        "score": float(score),
+        "obtained_marks": float(obtained_marks),
+        "total_marks": total_marks,
+        "correct_count": correct_count,
+        "needs_grading": pending_grading > 0,
+        "pending_grading": pending_grading,
+        "topic_wise": topic_stats,
+    }, graded
 
 
 class EvaluationService:
@@ -24,90 +108,67 @@ class EvaluationService:
         self.db = db
 
     def evaluate_attempt(self, attempt_id: UUID) -> Dict:
-        attempt = self.db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).first()
-        if not attempt:
+        results = self.evaluate_attempts([attempt_id])
+        if attempt_id not in results:
             raise ValueError("Attempt not found")
-
-        exam = self.db.query(Exam).filter(Exam.id == attempt.exam_id).first()
-
-        # ── Single query: all responses + their questions + options ───────────
-        responses = (
-            self.db.query(Response)
-            .filter(Response.attempt_id == attempt_id)
-            .all()
-        )
-
-        question_ids = [r.question_id for r in responses]
-
-        # Load all questions and their options in ONE query
-        questions = (
-            self.db.query(Question)
-            .options(joinedload(Question.options))
-            .filter(Question.id.in_(question_ids))
-            .all()
+        return results[attempt_id]
+
+    def evaluate_attempts(self, attempt_ids: Iterable[UUID]) -> Dict[UUID, Dict]:
+        """Score and mark attempts EVALUATED; attempt id → result. Commits."""
+        # ── The attempts' responses (and exams) + compiled answer keys ───────
+        rows = self.db.execute(
+            select(ExamAttempt.id.label("attempt_id"), ExamAttempt.exam_id, Response.id,
+                   Response.question_id, Response.selected_option_ids, Response.marks_awarded)
+            .outerjoin(Response, Response.attempt_id == ExamAttempt.id)
+            .where(ExamAttempt.id.in_(list(attempt_ids)))
+        ).all()
+        by_attempt: Dict[UUID, List] = {}
+        for row in rows:
+            by_attempt.setdefault(row.attempt_id, []).append(row)
+
+        results: Dict[UUID, Dict] = {}
+        graded: List[Tuple] = []
+        answer_keys: Dict[UUID, Dict[str, KeyEntry]] = {}
+        for attempt_id, attempt_rows in by_attempt.items():
+            exam_id = attempt_rows[0].exam_id
+            if exam_id not in answer_keys:
+                answer_keys[exam_id] = compiled_answer_key(self.db, exam_id)
+            results[attempt_id], attempt_graded = _score(attempt_rows, answer_keys[exam_id])
+            graded.extend(attempt_graded)
+        if not results:
+            return results
+
+        # ── One UPDATE: attempts from arrays, responses in a CTE ─────────────
+        scores = _unnest("scores", [("id", _UUID), ("score", Numeric(5, 2))],
+                         [(attempt_id, r["score"]) for attempt_id, r in results.items()])
+        stmt = (
+            update(ExamAttempt)
+            .where(ExamAttempt.id == scores.c.id)
+            .values(score=scores.c.score, status=AttemptStatus.EVALUATED)
         )
-        question_map: Dict[UUID, Question] = {q.id: q for q in questions}
-
-        # Pre-build correct-option sets per question (no per-response DB hit)
-        correct_opts: Dict[UUID, set] = {
-            q.id: {opt.id for opt in q.options if opt.is_correct}
-            for q in questions
-        }
-
-        total_marks = 0
-        obtained_marks = 0.0
-        correct_count = 0
-        pending_grading = 0
-        topic_stats: Dict[str, Dict] = {}
-
-        for response in responses:
-            question = question_map.get(response.question_id)
-            if not question:
-                continue
-
-            total_marks += question.marks
-
-            # Coding/subjective: graded manually by an examiner. Never auto-score
-            # or overwrite an examiner's marks — just tally what's already graded
-            # and flag the rest as pending.
-            if _qtype(question) in MANUAL_QUESTION_TYPES:
-                if response.marks_awarded is not None:
-                    obtained_marks += float(response.marks_awarded)
-                else:
-                    pending_grading += 1
-                continue
-
-            selected = set(response.selected_option_ids or [])
-            correct = correct_opts.get(question.id, set())
-
-            is_correct = bool(correct) and correct == selected
-            marks = question.marks if is_correct else 0
-
-            response.is_correct = is_correct
-            response.marks_awarded = marks
-
-            if is_correct:
-                obtained_marks += marks
-                correct_count += 1
-
-            if question.topic:
-                if question.topic not in topic_stats:
-                    topic_stats[question.topic] = {"correct": 0, "total": 0}
-                topic_stats[question.topic]["total"] += 1
-                if is_correct:
-                    topic_stats[question.topic]["correct"] += 1
-
-        attempt.score = (obtained_marks / total_marks * 100) if total_marks > 0 else 0
-        attempt.status = AttemptStatus.EVALUATED
-
+        if graded:
+            marks = _unnest("graded", [("id", _UUID), ("is_correct", Boolean), ("marks_awarded", Numeric(5, 2))],
+                            graded)
+            stmt = stmt.add_cte(
+                update(Response)
+                .where(Response.id == marks.c.id)
+                .values(is_correct=marks.c.is_correct, marks_awarded=marks.c.marks_awarded)
+                .cte("graded_responses")
+            )
+        self.db.execute(stmt.execution_options(synchronize_session=False))
         self.db.commit()
-
-        return {
-            "score": float(attempt.score),
-            "obtained_marks": float(obtained_marks),
-            "total_marks": total_marks,
-            "correct_count": correct_count,
-            "needs_grading": pending_grading > 0,
-            "pending_grading": pending_grading,
-            "topic_wise": topic_stats,
-        }
+        return results
+
+    def evaluate_pending(self, exam_id: UUID, limit: int) -> int:
+        """Claim up to ``limit`` of the exam's SUBMITTED attempts and evaluate them. Returns how many."""
+        attempt_ids = self.db.execute(
+            select(ExamAttempt.id)
+            .where(ExamAttempt.exam_id == exam_id, ExamAttempt.status == AttemptStatus.SUBMITTED)
+            .order_by(ExamAttempt.submitted_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not attempt_ids:
+            self.db.rollback()
+            return 0
+        return len(self.evaluate_attempts(attempt_ids))
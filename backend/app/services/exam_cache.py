@@ -0,0 +1,335 @@
+"""
+Student-facing exam caches, and the warm-up that fills them when an exam goes
+live.
+
+At T+0 of a live exam every student opens the exam page within seconds:
+GET /exams/{id}, GET /exams/{id}/questions and the proctoring settings. When
+they submit, the answer key is needed too. Going live used to only drop
+``key_exam_meta``, so the first wave of students paid for every one of those
+cold paths at once. ``warm_exam`` builds and stores all of them right after
+the transition commits:
+
+  exam meta            key_exam_meta                 CACHE_TTL_EXAM_META
+  question payload     key_exam_questions            CACHE_TTL_EXAM_QUESTIONS
+  rendered response    key_exam_questions_rendered   CACHE_TTL_EXAM_QUESTIONS
+  proctoring settings  key_proctoring_settings       CACHE_TTL_PROCTORING_SETTINGS
+  answer key           key_answer_key                CACHE_TTL_ANSWER_KEY
+
+The question payload is the student view: no ``is_correct`` and no
+``reference_answer``, so it is safe to hand to anyone who may sit the exam.
+Examiners read questions straight from the DB instead (``load_questions_full``)
+since they are the ones editing them. The rendered response is the payload as
+final JSON text plus ETag (see app/core/http_cache.py).
+
+Every entry is tagged ``tag_exam(id)``, so the usual exam/question
+invalidation drops them all. The ``get_*`` accessors below are what endpoints
+use: they go through ``cache.get_or_compute``, so a miss after expiry is
+coalesced too. The evaluator reads the answer key synchronously, compiled and
+held in process memory (``compiled_answer_key``).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from sqlalchemy.orm import Session, joinedload
+
+from app.core import http_cache, metrics
+from app.core.cache import (
+    cache, key_answer_key, key_answer_key_version, key_exam_meta, key_exam_questions,
+    key_exam_questions_rendered, key_proctoring_settings, tag_exam,
+)
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.exam import Exam
+from app.models.proctoring_settings import ProctoringSettings
+from app.models.question import Question
+from app.schemas.question import Question as QuestionSchema
+
+logger = logging.getLogger(__name__)
+
+
+def _value(v) -> str:
+    return v.value if hasattr(v, "value") else str(v)
+
+
+# ── Loaders (sync, run in the threadpool by get_or_compute) ──────────────────
+
+def load_exam_meta(db: Session, exam_id: UUID) -> Optional[Dict]:
+    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    if exam is None:
+        return None
+    return {
+        "id": str(exam.id),
+        "title": exam.title,
+        "description": exam.description,
+        "duration_minutes": exam.duration_minutes,
+        "total_marks": exam.total_marks,
+        "pass_percentage": float(exam.pass_percentage) if exam.pass_percentage is not None else None,
+        "start_time": exam.start_time.isoformat() if exam.start_time else None,
+        "end_time": exam.end_time.isoformat() if exam.end_time else None,
+        "status": _value(exam.status),
+        "created_by": str(exam.created_by),
+        "created_at": exam.created_at.isoformat() if exam.created_at else None,
+        "updated_at": exam.updated_at.isoformat() if exam.updated_at else None,
+    }
+
+
+def _questions_with_options(db: Session, exam_id: UUID) -> List[Question]:
+    # joinedload: one query for questions + options, no per-question lazy load
+    return (
+        db.query(Question)
+        .options(joinedload(Question.options))
+        .filter(Question.exam_id == exam_id)
+        .order_by(Question.display_order, Question.id)
+        .all()
+    )
+
+
+def load_questions_payload(db: Session, exam_id: UUID) -> List[Dict]:
+    """Student view: everything needed to render and answer, nothing that gives it away."""
+    questions = _questions_with_options(db, exam_id)
+    result = []
+    for q in questions:
+        result.append({
+            "id": str(q.id),
+            "exam_id": str(q.exam_id),
+            "question_text": q.question_text,
+            "question_type": str(q.question_type).replace("QuestionType.", ""),
+            "marks": q.marks,
+            "topic": q.topic,
+            "display_order": q.display_order,
+            "language": q.language,
+            "options": [
+                {
+                    "id": str(opt.id),
+                    "option_text": opt.option_text,
+                    "display_order": opt.display_order,
+                }
+                for opt in sorted(q.options, key=lambda x: x.display_order)
+            ],
+        })
+    return result
+
+
+def load_questions_full(db: Session, exam_id: UUID) -> List[Dict]:
+    """Examiner view: the ``schemas.question.Question`` shape, answers included."""
+    return [
+        QuestionSchema.model_validate(q).model_dump(mode="json")
+        for q in _questions_with_options(db, exam_id)
+    ]
+
+
+def load_proctoring_settings(db: Session, exam_id: UUID) -> Optional[Dict]:
+    """The exam's proctoring_settings row as a dict, or None if it has none."""
+    ps = db.query(ProctoringSettings).filter(ProctoringSettings.exam_id == exam_id).first()
+    if ps is None:
+        return None
+    return {
+        "camera_enabled": ps.camera_enabled,
+        "microphone_enabled": ps.microphone_enabled,
+        "face_detection_enabled": ps.face_detection_enabled,
+        "multiple_face_detection": ps.multiple_face_detection,
+        "head_pose_detection": ps.head_pose_detection,
+        "tab_switch_detection": ps.tab_switch_detection,
+        "min_face_confidence": float(ps.min_face_confidence),
+        "max_head_rotation": float(ps.max_head_rotation),
+        "detection_interval": ps.detection_interval,
+        "initial_health": ps.initial_health,
+        "health_warning_threshold": ps.health_warning_threshold,
+        "auto_submit_on_zero_health": ps.auto_submit_on_zero_health,
+    }
+
+
+def load_answer_key(db: Session, exam_id: UUID) -> Dict[str, Dict]:
+    """
+    question id → correct option ids, marks, topic and type — all evaluation
+    needs — plus display order, for numbering questions per student
+    (``shuffle.positions``).
+    """
+    questions = (
+        db.query(Question)
+        .options(joinedload(Question.options))
+        .filter(Question.exam_id == exam_id)
+        .all()
+    )
+    return {
+        str(q.id): {
+            "correct": sorted(str(o.id) for o in q.options if o.is_correct),
+            "marks": q.marks,
+            "topic": q.topic,
+            "type": _value(q.question_type),
+            "order": q.display_order,
+        }
+        for q in questions
+    }
+
+
+# ── Cached accessors ─────────────────────────────────────────────────────────
+
+async def get_exam_meta(db: Session, exam_id: UUID) -> Optional[Dict]:
+    return await cache.get_or_compute(
+        key_exam_meta(str(exam_id)), lambda: load_exam_meta(db, exam_id),
+        ttl=settings.CACHE_TTL_EXAM_META, tags=[tag_exam(str(exam_id))],
+    )
+
+
+async def get_questions_payload(db: Session, exam_id: UUID) -> List[Dict]:
+    return await cache.get_or_compute(
+        key_exam_questions(str(exam_id)), lambda: load_questions_payload(db, exam_id),
+        ttl=settings.CACHE_TTL_EXAM_QUESTIONS, tags=[tag_exam(str(exam_id))],
+    )
+
+
+async def get_questions_rendered(db: Session, exam_id: UUID) -> Dict[str, str]:
+    """The question payload as final JSON text plus its ETag (``http_cache.render``)."""
+    async def render():
+        return http_cache.render(await get_questions_payload(db, exam_id))
+
+    return await cache.get_or_compute(
+        key_exam_questions_rendered(str(exam_id)), render,
+        ttl=settings.CACHE_TTL_EXAM_QUESTIONS, tags=[tag_exam(str(exam_id))],
+    )
+
+
+async def get_proctoring_settings(db: Session, exam_id: UUID) -> Optional[Dict]:
+    return await cache.get_or_compute(
+        key_proctoring_settings(str(exam_id)), lambda: load_proctoring_settings(db, exam_id),
+        ttl=settings.CACHE_TTL_PROCTORING_SETTINGS, tags=[tag_exam(str(exam_id))],
+    )
+
+
+def answer_key_sync(db: Session, exam_id: UUID) -> Dict[str, Dict]:
+    """Answer key for the (sync) evaluator: Redis if warm, else built and stored."""
+    eid = str(exam_id)
+    return _answer_key_sync(db, eid, cache.tag_generations_sync([tag_exam(eid)]))
+
+
+def _answer_key_sync(db: Session, eid: str, generations: Optional[Dict[str, str]]) -> Dict[str, Dict]:
+    # ``generations`` is read before the DB: if a question edit invalidates the
+    # exam while we build, the stale key is not stored (``set_sync``).
+    key = key_answer_key(eid)
+    answer_key = cache.get_sync(key)
+    if answer_key is None:
+        answer_key = load_answer_key(db, UUID(eid))
+        if generations is not None:
+            cache.set_sync(key, answer_key, ttl=settings.CACHE_TTL_ANSWER_KEY, generations=generations)
+    return answer_key
+
+
+# ── Compiled answer key (evaluator, in process memory) ───────────────────────
+# At exam end every evaluation used to fetch and decode the whole answer key
+# from Redis and rebuild the correct-option sets from it. Each process now
+# keeps the key compiled — correct options as a frozenset of UUIDs, ready to
+# compare with ``Response.selected_option_ids`` — and before using it checks
+# only ``key_answer_key_version``: a short digest of the key's content, tagged
+# like the key itself, so any exam/question invalidation drops it and the
+# next evaluation in every process recompiles. Both are stored only if the
+# exam tag was not invalidated while they were being built, so an evaluation
+# racing a question edit can't put the pre-edit key back for the whole TTL. Without Redis there is nothing
+# to check a held key against, so it is built per evaluation as before.
+
+class KeyEntry(NamedTuple):
+    marks: int
+    type: str
+    topic: Optional[str]
+    correct: FrozenSet[UUID]
+    order: int
+
+
+_compiled: "OrderedDict[str, Tuple[str, Dict[str, KeyEntry]]]" = OrderedDict()
+_compiled_lock = threading.Lock()
+_COMPILED = metrics.counter(
+    "quizzie_answer_key_compiled_total", "Compiled answer-key lookups in process memory.", ["result"],
+)
+
+
+def _key_version(answer_key: Dict[str, Dict]) -> str:
+    return hashlib.blake2b(orjson.dumps(answer_key, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
+
+
+def compile_answer_key(answer_key: Dict[str, Dict]) -> Dict[str, KeyEntry]:
+    return {
+        qid: KeyEntry(q["marks"], q["type"], q["topic"], frozenset(UUID(o) for o in q["correct"]),
+                      q.get("order", 0))
+        for qid, q in answer_key.items()
+    }
+
+
+def compiled_answer_key(db: Session, exam_id: UUID) -> Dict[str, KeyEntry]:
+    """question id → ``KeyEntry``; one small Redis GET when this process already holds it."""
+    if not cache.is_sync_available:
+        return compile_answer_key(load_answer_key(db, exam_id))
+    eid = str(exam_id)
+    version = cache.get_sync(key_answer_key_version(eid))
+    with _compiled_lock:
+        held = _compiled.get(eid)
+        if held is not None and held[0] == version:
+            _compiled.move_to_end(eid)
+            _COMPILED.inc(result="hit")
+            return held[1]
+
+    _COMPILED.inc(result="miss")
+    generations = cache.tag_generations_sync([tag_exam(eid)])
+    answer_key = _answer_key_sync(db, eid, generations)
+    version = _key_version(answer_key)
+    compiled = compile_answer_key(answer_key)
+    if generations is not None:
+        cache.set_sync(key_answer_key_version(eid), version, ttl=settings.CACHE_TTL_ANSWER_KEY,
+                       generations=generations)
+    with _compiled_lock:
+        _compiled[eid] = (version, compiled)
+        _compiled.move_to_end(eid)
+        while len(_compiled) > settings.ANSWER_KEY_LOCAL_MAX:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+# ── Warm-up ──────────────────────────────────────────────────────────────────
+
+async def warm_exam(db: Session, exam_id: UUID) -> Dict[str, float]:
+    """
+    Build and store every student-facing cache for ``exam_id``. Returns the
+    time each step took in milliseconds (and ``total_ms``).
+    """
+    eid, tags = str(exam_id), [tag_exam(str(exam_id))]
+    steps = [
+        ("exam_meta", key_exam_meta(eid), load_exam_meta, settings.CACHE_TTL_EXAM_META),
+        ("questions", key_exam_questions(eid), load_questions_payload, settings.CACHE_TTL_EXAM_QUESTIONS),
+        ("proctoring_settings", key_proctoring_settings(eid), load_proctoring_settings,
+         settings.CACHE_TTL_PROCTORING_SETTINGS),
+        ("answer_key", key_answer_key(eid), load_answer_key, settings.CACHE_TTL_ANSWER_KEY),
+    ]
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    for name, key, loader, ttl in steps:
+        t0 = time.perf_counter()
+        # Drop whatever is there first so get_or_compute really recomputes.
+        await cache.delete(key)
+        if name == "answer_key":
+            await cache.delete(key_answer_key_version(eid))
+        await cache.get_or_compute(key, lambda loader=loader: loader(db, exam_id), ttl=ttl, tags=tags)
+        timings[f"{name}_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    t0 = time.perf_counter()
+    await cache.delete(key_exam_questions_rendered(eid))
+    await get_questions_rendered(db, exam_id)
+    timings["questions_rendered_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info("Warmed caches for exam %s: %s", eid, timings)
+    return timings
+
+
+async def warm_exam_in_background(exam_id: UUID) -> None:
+    """BackgroundTasks entry point: own session, never raises."""
+    db = SessionLocal()
+    try:
+        await warm_exam(db, exam_id)
+    except Exception as e:
+        logger.warning("Cache warm-up failed for exam %s: %s", exam_id, e)
+    finally:
+        db.close()
@@ -0,0 +1,73 @@
+"""
+Sectioned delivery of the student paper: a small manifest up front, question
+bodies on demand.
+
+``GET /exams/{id}/questions`` sends the whole paper — every stem and option —
+in one response, at exam start when load is highest. For long papers that is
+a large first paint for a page that shows one question at a time. Instead a
+client can fetch
+
+  GET /exams/{id}/questions/manifest           ids, types, marks, topics and
+                                               section boundaries (+ ETags)
+  GET /exams/{id}/questions/sections/{n}       the bodies of section n
+
+then render section 0 and prefetch section n+1 in the background.
+
+The schema has no section concept, so a section is a fixed-size slice
+(QUESTION_SECTION_SIZE) of the paper in the order the student sees it — with
+``?attempt_id=`` that is their shuffled order (app/services/shuffle.py), so
+sections and the full endpoint always agree.
+
+Everything is cut from the one cached student payload; nothing new is stored
+in Redis. Each part's ETag is derived from the payload's ETag (and the
+shuffle seed), so a client revalidating a section it already holds gets a 304
+without anything being rendered, and the manifest lists each section's ETag
+so an unchanged section need not be requested at all.
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+
+def part_etag(base_etag: str, seed: Optional[bytes], part: str) -> str:
+    """ETag of one part (``manifest`` or a section number) of one student's paper."""
+    return hashlib.blake2b(f"{base_etag}:{part}".encode(), key=seed or b"", digest_size=16).hexdigest()
+
+
+def section_count(total: int) -> int:
+    return max(1, -(-total // settings.QUESTION_SECTION_SIZE))
+
+
+def section(paper: List[Dict], n: int) -> List[Dict]:
+    size = settings.QUESTION_SECTION_SIZE
+    return paper[n * size:(n + 1) * size]
+
+
+def manifest(paper: List[Dict], base_etag: str, seed: Optional[bytes]) -> Dict:
+    size = settings.QUESTION_SECTION_SIZE
+    return {
+        "total_questions": len(paper),
+        "total_marks": sum(q["marks"] for q in paper),
+        "section_size": size,
+        "sections": [
+            {
+                "index": n,
+                "start": n * size,
+                "count": len(section(paper, n)),
+                "etag": part_etag(base_etag, seed, str(n)),
+            }
+            for n in range(section_count(len(paper)))
+        ],
+        "questions": [
+            {
+                "id": q["id"],
+                "position": i + 1,
+                "section": i // size,
+                "question_type": q["question_type"],
+                "marks": q["marks"],
+                "topic": q["topic"],
+            }
+            for i, q in enumerate(paper)
+        ],
+    }
@@ -0,0 +1,246 @@
+"""
+Bulk question import: parse JSON lines or CSV, validate every row up front,
+then insert all questions and options in one transaction.
+
+``POST /exams/{id}/questions`` creates one question per call (flush + commit
+each), so a 300-question bank meant 300 requests and 300 transactions, and
+``seed_jee_physics.py`` looped the same way. Here ids are generated in Python
+so questions and options each go in as one COPY (psycopg2), or one
+executemany multi-row INSERT on other drivers, with no flush round trip in
+between.
+
+Import is all-or-nothing: if any row is invalid nothing is written and every
+row's error is returned, so the file can be fixed in one pass.
+
+Formats
+-------
+JSON lines — one ``QuestionCreate`` object per line (the body of the single
+question endpoint); blank lines are skipped.
+
+CSV — a header row, then one question per row:
+
+  question_text, question_type, marks, topic, display_order,
+  reference_answer, language, option_1 … option_N, correct
+
+``correct`` lists the correct option numbers, e.g. ``2`` or ``1;3``. Only
+question_text is required; empty option columns are ignored.
+
+Rows without a display_order are appended after the exam's current last
+question, in file order.
+"""
+import csv
+import io
+import json
+import re
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models.question import MANUAL_QUESTION_TYPES, Option, Question, QuestionType
+from app.schemas.question import QuestionCreate
+
+MAX_IMPORT_ROWS = 20_000
+MAX_IMPORT_BYTES = 32 * 1024 * 1024      # checked while the body is read, before parsing
+QUESTION_TYPES = [t.value for t in QuestionType]
+
+_OPTION_COLUMN = re.compile(r"^option_(\d+)$")
+
+
+class InvalidImport(Exception):
+    """Per-row problems with an import file: ``errors`` is [{"row", "error"}]."""
+
+    def __init__(self, errors: List[Dict]):
+        super().__init__(f"{len(errors)} invalid row(s)")
+        self.errors = errors
+
+
+# ── Validation (shared with the single-question endpoint) ────────────────────
+
+def validate_question(question: QuestionCreate) -> Optional[str]:
+    """The MCQ / manual-type rules; returns the problem, or None if valid."""
+    if question.question_type not in QUESTION_TYPES:
+        return "Invalid question type"
+    if question.question_type in MANUAL_QUESTION_TYPES:
+        return None
+    # MCQ questions need at least 2 options and a correct answer. Coding /
+    # subjective questions are graded manually and carry no options.
+    if len(question.options) < 2:
+        return "At least 2 options required"
+    if not any(opt.is_correct for opt in question.options):
+        return "At least one correct option required"
+    return None
+
+
+def _first_error(e: ValidationError) -> str:
+    err = e.errors()[0]
+    where = ".".join(str(p) for p in err["loc"])
+    return f"{where}: {err['msg']}" if where else err["msg"]
+
+
+# ── Parsers → [(row number, raw dict | error)] ───────────────────────────────
+
+def _parse_jsonl(text: str) -> List[Tuple[int, object]]:
+    rows = []
+    for n, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            rows.append((n, f"Invalid JSON: {e.msg}"))
+            continue
+        rows.append((n, obj if isinstance(obj, dict) else "Expected a JSON object"))
+    return rows
+
+
+def _csv_row(record: Dict[str, str]) -> object:
+    record = {k.strip(): (v or "").strip() for k, v in record.items() if k}
+    options = sorted(
+        (int(m.group(1)), v) for k, v in record.items() if (m := _OPTION_COLUMN.match(k)) and v
+    )
+    try:
+        correct = {int(c) for c in re.split(r"[;,\s]+", record.get("correct", "")) if c}
+    except ValueError:
+        return "correct: expected option numbers such as 2 or 1;3"
+    row = {
+        "question_text": record.get("question_text", ""),
+        "question_type": record.get("question_type") or "single",
+        "options": [
+            {"option_text": text, "is_correct": number in correct, "display_order": i}
+            for i, (number, text) in enumerate(options)
+        ],
+    }
+    for key in ("marks", "display_order"):
+        if record.get(key):
+            row[key] = record[key]
+    for key in ("topic", "reference_answer", "language"):
+        if record.get(key):
+            row[key] = record[key]
+    return row
+
+
+def _parse_csv(text: str) -> List[Tuple[int, object]]:
+    reader = csv.DictReader(io.StringIO(text))
+    # Row numbers are file lines: the header is line 1.
+    return [(n, _csv_row(record)) for n, record in enumerate(reader, start=2)]
+
+
+PARSERS = {"jsonl": _parse_jsonl, "csv": _parse_csv}
+
+
+def parse(text: str, fmt: str) -> List[Tuple[int, QuestionCreate, bool]]:
+    """
+    Parse and validate the whole file: [(row, question, has_display_order)].
+    Raises ``InvalidImport`` listing every bad row.
+    """
+    raw = PARSERS[fmt](text)
+    if not raw:
+        raise InvalidImport([{"row": 0, "error": "No questions in file"}])
+    if len(raw) > MAX_IMPORT_ROWS:
+        raise InvalidImport([{"row": 0, "error": f"At most {MAX_IMPORT_ROWS} questions per import"}])
+
+    parsed, errors = [], []
+    for n, row in raw:
+        if isinstance(row, str):
+            errors.append({"row": n, "error": row})
+            continue
+        try:
+            question = QuestionCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append({"row": n, "error": _first_error(e)})
+            continue
+        problem = validate_question(question)
+        if problem:
+            errors.append({"row": n, "error": problem})
+            continue
+        parsed.append((n, question, "display_order" in row))
+    if errors:
+        raise InvalidImport(errors)
+    return parsed
+
+
+# ── Insert ───────────────────────────────────────────────────────────────────
+
+def insert_questions(db: Session, exam_id, questions: List[Tuple[int, QuestionCreate, bool]]) -> int:
+    """
+    Insert validated questions and their options in one transaction (the
+    caller commits). Returns the number of questions inserted.
+    """
+    next_order = (db.query(func.max(Question.display_order)).filter(Question.exam_id == exam_id).scalar()
+                  or 0) + 1
+
+    question_rows, option_rows = [], []
+    for _, q, has_order in questions:
+        is_manual = q.question_type in MANUAL_QUESTION_TYPES
+        qid = uuid.uuid4()
+        if has_order:
+            order = q.display_order
+        else:
+            order, next_order = next_order, next_order + 1
+        question_rows.append({
+            "id": qid,
+            "exam_id": exam_id,
+            "question_text": q.question_text,
+            "question_type": QuestionType(q.question_type),
+            "marks": q.marks,
+            "topic": q.topic,
+            "display_order": order,
+            "reference_answer": q.reference_answer if is_manual else None,
+            "language": q.language if q.question_type == "coding" else None,
+        })
+        if not is_manual:
+            option_rows.extend(
+                {"id": uuid.uuid4(), "question_id": qid, "option_text": o.option_text,
+                 "is_correct": o.is_correct, "display_order": o.display_order}
+                for o in q.options
+            )
+
+    _bulk_insert(db, Question.__table__, question_rows)
+    if option_rows:
+        _bulk_insert(db, Option.__table__, option_rows)
+    return len(question_rows)
+
+
+def _bulk_insert(db: Session, table, rows: List[Dict]) -> None:
+    """COPY on psycopg2 (inside the session's transaction), else a multi-row INSERT."""
+    dialect = db.get_bind().dialect
+    if dialect.driver != "psycopg2":
+        db.execute(insert(table), rows)
+        return
+
+    raw = db.connection().connection.dbapi_connection
+    columns = list(rows[0])
+    processors = [table.c[c].type.bind_processor(dialect) for c in columns]
+    buf = io.StringIO()
+    # QUOTE_NONNUMERIC: strings are quoted (so "" stays an empty string) and
+    # None is written bare, which COPY ... CSV reads as NULL.
+    writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        values = []
+        for column, process in zip(columns, processors):
+            value = row[column]
+            if value is not None and process is not None:
+                value = process(value)
+            values.append(str(value) if isinstance(value, uuid.UUID) else value)
+        writer.writerow(values)
+    buf.seek(0)
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+
+
+def import_questions(db: Session, exam_id, text: str, fmt: str) -> int:
+    """Parse, validate and insert ``text``; commits. Raises ``InvalidImport``."""
+    questions = parse(text, fmt)
+    try:
+        count = insert_questions(db, exam_id, questions)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return count
+
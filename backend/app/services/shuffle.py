@@ -0,0 +1,79 @@
+"""
+Per-student question and option order — derived, never stored.
+
+Neighbouring students seeing the same paper in the same order makes copying
+easy, but storing a shuffled copy per attempt would cost a write per student
+and break the one shared ``key_exam_questions`` entry that lets 500 students
+open an exam for one DB query. Instead the order is a pure function of the
+attempt:
+
+  seed      HMAC(SECRET_KEY, exam_id:student_id:attempt_id)
+  rank(id)  BLAKE2b(id, key=seed) — questions sort by the rank of their id,
+            and each question's options by theirs
+
+and is applied at response time over the cached base payload. A reload gives
+the same order; a different attempt (or a student passing someone else's
+attempt id — the seed includes their own id from the token) gives a
+different one.
+
+Ranking stable ids rather than permuting positions means an exam edited while
+live keeps everyone's relative order: a new question slots in somewhere, the
+rest don't move. So the exam version is not part of the seed.
+
+The inverse is free: submissions carry real question and option ids, so
+``EvaluationService`` scores them unchanged. Views that talk about "question
+7" — results and the grading queue — recompute each question's position on
+that student's paper with ``positions`` from the answer key, with no storage
+and no extra reads.
+
+SHUFFLE_QUESTIONS / SHUFFLE_OPTIONS switch the two halves off.
+"""
+import hashlib
+import hmac
+from typing import Dict, Iterable, List, Mapping
+
+from app.core.config import settings
+
+
+def seed_for(exam_id, student_id, attempt_id) -> bytes:
+    message = f"{exam_id}:{student_id}:{attempt_id}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).digest()[:32]
+
+
+def _rank(seed: bytes, item_id) -> bytes:
+    return hashlib.blake2b(str(item_id).encode(), key=seed, digest_size=8).digest()
+
+
+def enabled() -> bool:
+    return settings.SHUFFLE_QUESTIONS or settings.SHUFFLE_OPTIONS
+
+
+def apply(payload: List[Dict], seed: bytes) -> List[Dict]:
+    """The student-view payload in this attempt's order (a new list; the cached one is untouched)."""
+    questions = payload
+    if settings.SHUFFLE_QUESTIONS:
+        questions = sorted(payload, key=lambda q: _rank(seed, q["id"]))
+    if not settings.SHUFFLE_OPTIONS:
+        return list(questions)
+    return [
+        {**q, "options": sorted(q["options"], key=lambda o: _rank(seed, o["id"]))} if q["options"] else q
+        for q in questions
+    ]
+
+
+def variant_etag(base_etag: str, seed: bytes) -> str:
+    """ETag of ``apply(payload, seed)`` — known without rendering it."""
+    return hashlib.blake2b(base_etag.encode(), key=seed, digest_size=16).hexdigest()
+
+
+def positions(seed: bytes, display_orders: Mapping[str, int]) -> Dict[str, int]:
+    """
+    question id → 1-based number on this student's paper. ``display_orders``
+    covers every question in the exam (the answer key's ``order``).
+    """
+    ids: Iterable[str] = display_orders
+    if settings.SHUFFLE_QUESTIONS:
+        ordered = sorted(ids, key=lambda qid: _rank(seed, qid))
+    else:
+        ordered = sorted(ids, key=lambda qid: (display_orders[qid], qid))
+    return {qid: n for n, qid in enumerate(ordered, start=1)}
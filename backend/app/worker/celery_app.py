@@ -28,6 +28,7 @@ The app is coded to fall back to synchronous evaluation when Redis/Celery
 is unavailable, so development works without Redis.
 """
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 import sys
 
@@ -38,6 +39,7 @@ celery_app = Celery(
     include=[
         "app.worker.tasks.proctoring_tasks",
         "app.worker.tasks.evaluation_tasks",
+        "app.worker.tasks.attempt_tasks",
     ],
 )
 
@@ -48,6 +50,18 @@ celery_app.conf.update(
     task_routes={
         "app.worker.tasks.proctoring_tasks.*": {"queue": "proctoring"},
         "app.worker.tasks.evaluation_tasks.*": {"queue": "evaluation"},
+        "app.worker.tasks.attempt_tasks.*": {"queue": "evaluation"},
+    },
+
+    # Periodic tasks — needs one beat process:
+    #   celery -A app.worker.celery_app beat --loglevel=info
+    beat_schedule={
+        "sweep-expired-attempts": {
+            "task": "app.worker.tasks.attempt_tasks.sweep_expired_attempts_task",
+            "schedule": settings.ATTEMPT_SWEEP_INTERVAL,
+            # A tick that waits longer than an interval is superseded by the next.
+            "options": {"expires": settings.ATTEMPT_SWEEP_INTERVAL},
+        },
     },
 
     # Reliability
@@ -83,3 +97,13 @@ celery_app.conf.update(
         "socket_timeout": 5,
     },
 )
+
+
+@worker_process_init.connect
+def _fresh_db_pools(**_):
+    """Prefork children must not reuse connections inherited from the parent."""
+    from app.core.database import engine, read_engine
+
+    engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.dispose(close=False)
@@ -0,0 +1,42 @@
+"""
+Celery tasks for exam attempts.
+
+sweep_expired_attempts_task   run by Celery beat every ATTEMPT_SWEEP_INTERVAL
+                              seconds. Closes attempts past their deadline in
+                              batches (app/services/attempt_sweeper.py) and
+                              queues one evaluate_exam_batch_task per exam
+                              that had attempts closed.
+"""
+import logging
+
+from app.worker.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.services import attempt_sweeper
+from app.worker.tasks.evaluation_tasks import evaluate_exam_batch_task
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="app.worker.tasks.attempt_tasks.sweep_expired_attempts_task",
+    bind=True,
+    max_retries=0,
+)
+def sweep_expired_attempts_task(self) -> dict:
+    """
+    Close expired in-progress attempts and queue their evaluation.
+    Not retried: the next beat tick picks up whatever this run missed.
+    """
+    db = SessionLocal()
+    try:
+        result = attempt_sweeper.sweep(db)
+    except Exception:
+        db.rollback()
+        logger.exception("sweep_expired_attempts_task failed")
+        raise
+    finally:
+        db.close()
+
+    for exam_id in result["exam_ids"]:
+        evaluate_exam_batch_task.apply_async(args=[exam_id])
+    return result
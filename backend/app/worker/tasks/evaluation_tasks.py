@@ -1,11 +1,27 @@
 """
-Celery task for exam evaluation.
+Celery tasks for exam evaluation.
 Runs score calculation off the web process for large exams.
+
+evaluate_attempt_task       one attempt, dispatched by /submit.
+evaluate_exam_batch_task    every SUBMITTED attempt of an exam, drained in
+                            chunks of EVALUATION_BATCH_SIZE. Meant for the
+                            deadline burst, when thousands of attempts are
+                            submitted at once and one task per attempt would
+                            spend more on the broker than on scoring. Each
+                            chunk is one claim, one SELECT and one UPDATE
+                            (EvaluationService.evaluate_pending). A run stops
+                            after EVALUATION_BATCH_SECONDS and re-enqueues
+                            itself if the exam still has attempts waiting.
+                            Queued by submits during the burst and when the
+                            exam is ended (app/services/evaluation_dispatch.py),
+                            and by the deadline sweeper.
 """
 import logging
+import time
 from uuid import UUID
 
 from app.worker.celery_app import celery_app
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.services.evaluation_service import EvaluationService
 
@@ -35,3 +51,42 @@ def evaluate_attempt_task(self, attempt_id: str) -> dict:
         raise self.retry(exc=exc)
     finally:
         db.close()
+
+
+@celery_app.task(
+    name="app.worker.tasks.evaluation_tasks.evaluate_exam_batch_task",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=5,
+)
+def evaluate_exam_batch_task(self, exam_id: str) -> dict:
+    """
+    Evaluate the exam's SUBMITTED attempts, a chunk per transaction.
+    Returns how many were evaluated and whether a follow-up run was queued.
+    """
+    deadline = time.monotonic() + settings.EVALUATION_BATCH_SECONDS
+    size = settings.EVALUATION_BATCH_SIZE
+    evaluated, more = 0, False
+    db = SessionLocal()
+    try:
+        svc = EvaluationService(db)
+        while True:
+            done = svc.evaluate_pending(UUID(exam_id), size)
+            evaluated += done
+            if done < size:
+                break
+            if time.monotonic() >= deadline:
+                more = True
+                break
+    except Exception as exc:
+        db.rollback()
+        logger.exception("evaluate_exam_batch_task failed for exam %s after %d attempts", exam_id, evaluated)
+        raise self.retry(exc=exc)
+    finally:
+        db.close()
+
+    if more:
+        self.apply_async(args=[exam_id])
+    logger.info("Batch-evaluated %d attempt(s) of exam %s%s", evaluated, exam_id,
+                " — more queued" if more else "")
+    return {"exam_id": exam_id, "evaluated": evaluated, "requeued": more}
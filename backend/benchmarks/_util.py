@@ -0,0 +1,41 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks are plain scripts run from the backend folder, e.g.:
+  python -m benchmarks.bench_auth_overhead --iterations 2000
+They use the DATABASE_URL / REDIS_URL from .env like the app does.
+"""
+import statistics
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarise latency samples given in seconds; results are in milliseconds."""
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def print_row(label: str, stats: Dict[str, float]) -> None:
+    print(
+        f"  {label:<28} n={stats['n']:<6} mean={stats['mean_ms']:8.3f} ms  "
+        f"p50={stats['p50_ms']:8.3f}  p95={stats['p95_ms']:8.3f}  "
+        f"p99={stats['p99_ms']:8.3f}  max={stats['max_ms']:8.3f}"
+    )
@@ -0,0 +1,222 @@
+"""
+Benchmark: sync vs async DB sessions in ``async def`` handlers under load.
+
+Two modes, both in-process over ASGI (no server needed, DATABASE_URL must
+point at a real Postgres; Redis is optional):
+
+  pattern    the before/after in isolation. Two otherwise identical async
+             routes run ``SELECT pg_sleep(--query-ms)``: one through a sync
+             Session (what submit_exam, the proctoring handlers and
+             update_exam* used to do), one through the asyncpg session
+             (``get_async_db``). A probe route that does no I/O at all is
+             polled alongside; its latency is how long the event loop was
+             unavailable to everyone else on the worker.
+
+  endpoints  mixed load on the real app: --students students each report
+             violations and poll their health, one examiner polls the live
+             feed, and GET /health is probed. Run it on this commit and on
+             the one before to compare.
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_async_db --mode pattern --concurrency 50 --requests 500
+  python -m benchmarks.bench_async_db --mode endpoints --students 50 --rounds 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from benchmarks._util import print_row, summarize
+
+from app.core.database import SessionLocal, async_engine, get_async_db, get_db
+
+
+PROBE_INTERVAL = 0.01
+
+
+async def _probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, samples: list) -> None:
+    """Latency of ``path`` measured from when the probe was *due* — includes time the loop was blocked."""
+    while not stop.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        await client.get(path)
+        samples.append(time.perf_counter() - due)
+
+
+async def _load(client, path: str, requests: int, concurrency: int, samples: list, method="GET", **kwargs):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(_):
+        async with sem:
+            start = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            r.raise_for_status()
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+# ── pattern ───────────────────────────────────────────────────────────────────
+
+def _pattern_app(query_ms: int) -> FastAPI:
+    app = FastAPI()
+    stmt = text("SELECT pg_sleep(:s)")
+    seconds = query_ms / 1000
+
+    @app.get("/sync-session")
+    async def sync_session(db: Session = Depends(get_db)):
+        db.execute(stmt, {"s": seconds})          # blocks the event loop
+        return {"ok": True}
+
+    @app.get("/async-session")
+    async def async_session(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(stmt, {"s": seconds})
+        return {"ok": True}
+
+    @app.get("/probe")
+    async def probe():
+        return {"ok": True}
+
+    return app
+
+
+async def run_pattern(args) -> None:
+    transport = httpx.ASGITransport(app=_pattern_app(args.query_ms))
+    print(f"\n{args.requests} requests at concurrency {args.concurrency}, "
+          f"each a {args.query_ms} ms query; /probe does no I/O")
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for route in ("/sync-session", "/async-session"):
+            samples, probes = [], []
+            stop = asyncio.Event()
+            probe = asyncio.create_task(_probe(client, "/probe", stop, probes))
+            started = time.perf_counter()
+            await _load(client, route, args.requests, args.concurrency, samples)
+            wall = time.perf_counter() - started
+            stop.set()
+            await probe
+            print(f"\n  {route}  ({args.requests / wall:.0f} req/s)")
+            print_row("query route", summarize(samples))
+            print_row("probe (event loop)", summarize(probes))
+    await async_engine.dispose()
+
+
+# ── endpoints ─────────────────────────────────────────────────────────────────
+
+def _seed(students: int):
+    from app.core.security import create_access_token, get_password_hash, token_claims
+    from app.models.attempt import AttemptStatus, ExamAttempt
+    from app.models.exam import Exam, ExamStatus
+    from app.models.user import User, UserRole
+
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        password_hash = get_password_hash("bench-password")
+        examiner = User(email=f"async-{tag}-examiner@quizzie-bench.com", password_hash=password_hash,
+                        full_name="Bench Examiner", role=UserRole.EXAMINER, is_verified=True)
+        db.add(examiner)
+        db.flush()
+        exam = Exam(title=f"Async bench {tag}", description="", duration_minutes=60, total_marks=0,
+                    pass_percentage=40, status=ExamStatus.LIVE, created_by=examiner.id)
+        users = [User(email=f"async-{tag}-{i}@quizzie-bench.com", password_hash=password_hash,
+                      full_name=f"Bench Student {i}", role=UserRole.STUDENT, is_verified=True)
+                 for i in range(students)]
+        db.add(exam)
+        db.add_all(users)
+        db.flush()
+        attempts = [ExamAttempt(exam_id=exam.id, student_id=u.id, status=AttemptStatus.IN_PROGRESS)
+                    for u in users]
+        db.add_all(attempts)
+        db.commit()
+
+        def header(user):
+            return {"Authorization": "Bearer " + create_access_token(token_claims(user), timedelta(hours=1))}
+
+        return {
+            "tag": tag,
+            "exam_id": str(exam.id),
+            "examiner": header(examiner),
+            "students": [(str(a.id), header(u)) for a, u in zip(attempts, users)],
+        }
+    finally:
+        db.close()
+
+
+def _cleanup(tag: str) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "DELETE FROM cheat_logs WHERE attempt_id IN (SELECT a.id FROM exam_attempts a "
+            "JOIN users u ON u.id = a.student_id WHERE u.email LIKE :p)"), {"p": f"async-{tag}-%"})
+        db.execute(text(
+            "DELETE FROM exam_attempts WHERE student_id IN (SELECT id FROM users WHERE email LIKE :p)"),
+            {"p": f"async-{tag}-%"})
+        db.execute(text("DELETE FROM exams WHERE title = :t"), {"t": f"Async bench {tag}"})
+        db.execute(text("DELETE FROM users WHERE email LIKE :p"), {"p": f"async-{tag}-%"})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_endpoints(args) -> None:
+    from app.main import app
+
+    seed = _seed(args.students)
+    enhanced = "/api/v1/monitor/enhanced"
+    timings = {"violation": [], "health": [], "live-feed": [], "probe /health": []}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            async def student(attempt_id, headers):
+                for _ in range(args.rounds):
+                    t0 = time.perf_counter()
+                    await client.post(f"{enhanced}/violation", headers=headers, json={
+                        "attempt_id": attempt_id, "event_type": "tab_switch",
+                        "flags": [{"type": "tab_switch", "severity": "low"}],
+                    })
+                    timings["violation"].append(time.perf_counter() - t0)
+                    t0 = time.perf_counter()
+                    await client.get(f"{enhanced}/attempt/{attempt_id}/health", headers=headers)
+                    timings["health"].append(time.perf_counter() - t0)
+
+            async def examiner(stop):
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    await client.get(f"{enhanced}/exam/{seed['exam_id']}/live-feed", headers=seed["examiner"])
+                    timings["live-feed"].append(time.perf_counter() - t0)
+                    await asyncio.sleep(0.2)
+
+            stop = asyncio.Event()
+            background = [asyncio.create_task(examiner(stop)),
+                          asyncio.create_task(_probe(client, "/health", stop, timings["probe /health"]))]
+            started = time.perf_counter()
+            await asyncio.gather(*(student(a, h) for a, h in seed["students"]))
+            wall = time.perf_counter() - started
+            stop.set()
+            await asyncio.gather(*background)
+
+        print(f"\nMixed proctoring load: {args.students} students x {args.rounds} rounds, {wall:.1f}s wall")
+        for label, samples in timings.items():
+            print_row(label, summarize(samples))
+    finally:
+        _cleanup(seed["tag"])
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["pattern", "endpoints"], default="pattern")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=int, default=20)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run_pattern(args) if args.mode == "pattern" else run_endpoints(args))
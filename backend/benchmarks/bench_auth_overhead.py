@@ -0,0 +1,91 @@
+"""
+Benchmark: authentication overhead per request.
+
+Times the ``get_current_user`` dependency (JWT decode + principal lookup) in
+three regimes against the configured database:
+
+  db     — principal cache cleared before every call (old behaviour)
+  redis  — L1 cleared, Redis tier warm (skipped if Redis is down)
+  local  — L1 warm (the steady state for hot endpoints)
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_auth_overhead --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+from benchmarks._util import print_row, summarize
+
+from app.api.deps import get_current_user
+from app.core import principal_cache
+from app.core.cache import cache, key_user
+from app.core.database import SessionLocal
+from app.core.security import create_access_token, get_password_hash, token_claims
+from app.models.user import User, UserRole
+
+
+async def _one_call(header: str) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        await get_current_user(authorization=header, db=db)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+async def run(iterations: int) -> None:
+    await cache.connect()
+    db = SessionLocal()
+    email = f"bench-{uuid.uuid4().hex[:8]}@quizzie-bench.com"
+    user = User(
+        email=email,
+        password_hash=get_password_hash("bench-password"),
+        full_name="Bench User",
+        role=UserRole.STUDENT,
+        is_verified=True,
+    )
+    db.add(user)
+    db.commit()
+    header = "Bearer " + create_access_token(token_claims(user), timedelta(minutes=30))
+
+    try:
+        print(f"\nAuth overhead per request ({iterations} iterations)")
+
+        samples = []
+        for _ in range(iterations):
+            await principal_cache.invalidate(str(user.id))
+            samples.append(await _one_call(header))
+        print_row("db (cache cold)", summarize(samples))
+
+        if cache.is_available:
+            await _one_call(header)
+            samples = []
+            for _ in range(iterations):
+                cache.clear_local()
+                samples.append(await _one_call(header))
+            print_row("redis tier", summarize(samples))
+        else:
+            print("  redis tier                   skipped (Redis unavailable)")
+
+        await _one_call(header)
+        samples = [await _one_call(header) for _ in range(iterations)]
+        print_row("in-process tier", summarize(samples))
+        print(f"\n  principal_cache stats: {principal_cache.stats()}")
+        print(f"  cache tiers: {cache.stats()}")
+    finally:
+        await cache.delete(key_user(str(user.id)))
+        db.delete(user)
+        db.commit()
+        db.close()
+        await cache.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
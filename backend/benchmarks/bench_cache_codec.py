@@ -0,0 +1,135 @@
+"""
+Benchmark: RedisCache value codecs.
+
+Compares bytes stored and encode/decode time of the legacy ``json`` encoding
+against the ``app.core.codec`` formats for the payloads we actually cache:
+
+  questions    90-question JEE paper, 4 options each (get_exam_questions)
+  leaderboard  100 rows (get_leaderboard)
+  principal    one authenticated user (principal_cache)
+
+No database or Redis needed. Codecs whose optional library is not installed
+(msgpack, zstandard, lz4) are skipped.
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_cache_codec --iterations 500
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks._util import summarize
+
+from app.core import codec
+
+_STEMS = [
+    "A particle moves in a straight line with a constant acceleration. It changes its velocity "
+    "from {a} m/s to {b} m/s while passing through a distance {c} m in t seconds. The value of t is:",
+    "A block of mass {a} kg is kept on a rough inclined plane. A force of {b} N is applied on the "
+    "block. The coefficient of static friction between the plane and the block is 0.{c}. What "
+    "should be the minimum value of force P, such that the block does not move downward? "
+    "(take g = 10 m/s^2)",
+    "Two charges q1 = {a} μC and q2 = -{b} μC are placed {c} cm apart in vacuum. Find the point on "
+    "the line joining them where the electric field is zero.",
+    "A convex lens of focal length {a} cm forms an image of an object placed {b} cm from it. If the "
+    "object is moved {c} cm closer, find the new image distance and magnification.",
+]
+_TOPICS = ["Kinematics", "Laws of Motion", "Electrostatics", "Optics", "Thermodynamics"]
+
+
+def questions_payload(n: int = 90) -> list:
+    rng = random.Random(7)
+    exam_id = str(uuid.uuid4())
+    out = []
+    for i in range(n):
+        stem = rng.choice(_STEMS).format(a=rng.randint(2, 99), b=rng.randint(2, 99), c=rng.randint(2, 99))
+        correct = rng.randrange(4)
+        out.append({
+            "id": str(uuid.uuid4()),
+            "exam_id": exam_id,
+            "question_text": stem,
+            "question_type": "single",
+            "marks": 4,
+            "topic": rng.choice(_TOPICS),
+            "display_order": i,
+            "options": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "option_text": f"{rng.uniform(0.5, 250):.2f} {rng.choice(['N', 'm/s', 'cm', 'J', 'V/m'])}",
+                    "is_correct": j == correct,
+                    "display_order": j,
+                }
+                for j in range(4)
+            ],
+        })
+    return out
+
+
+def leaderboard_payload(n: int = 100) -> list:
+    rng = random.Random(11)
+    return [
+        {"rank": i + 1, "student_name": f"Student {rng.randint(1000, 9999)}",
+         "score": round(rng.uniform(0, 360), 2), "time_taken_seconds": rng.randint(600, 10800)}
+        for i in range(n)
+    ]
+
+
+def principal_payload() -> dict:
+    return {"id": str(uuid.uuid4()), "email": "student@example.com", "full_name": "Asha Verma",
+            "role": "student", "is_verified": True, "created_at": datetime.utcnow().isoformat()}
+
+
+def _time(fn, arg, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _variants():
+    yield "json (legacy)", lambda v: json.dumps(v, default=str).encode(), json.loads
+    for serializer in ("orjson", "msgpack"):
+        if serializer == "msgpack" and codec.msgpack is None:
+            continue
+        for compression in ("none", "zlib", "zstd", "lz4"):
+            if compression == "zstd" and codec.zstandard is None:
+                continue
+            if compression == "lz4" and codec.lz4_frame is None:
+                continue
+            yield f"{serializer}+{compression}", (serializer, compression), codec.decode
+
+
+def run(iterations: int) -> None:
+    payloads = {
+        "questions": questions_payload(),
+        "leaderboard": leaderboard_payload(),
+        "principal": principal_payload(),
+    }
+    for name, value in payloads.items():
+        print(f"\n{name} ({iterations} iterations; encode/decode p50 in µs)")
+        baseline = None
+        for label, enc, dec in _variants():
+            if isinstance(enc, tuple):
+                codec.configure(*enc)
+                enc = codec.encode
+            raw = enc(value)
+            assert dec(raw) is not None
+            size = len(raw)
+            baseline = baseline or size
+            e = summarize(_time(enc, value, iterations))
+            d = summarize(_time(dec, raw, iterations))
+            print(f"  {label:<18} bytes={size:>8} ({size / baseline:6.1%})  "
+                  f"encode={e['p50_ms'] * 1000:9.1f}  decode={d['p50_ms'] * 1000:9.1f}")
+    print("\nmsgpack/zstd/lz4 rows appear only when the optional package is installed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    run(args.iterations)
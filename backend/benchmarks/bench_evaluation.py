@@ -0,0 +1,151 @@
+"""
+Benchmark: evaluation throughput at exam end — one attempt per task vs the
+batch drain.
+
+Seeds one exam of --questions MCQs and --attempts SUBMITTED attempts with an
+answer to every question, against DATABASE_URL. Then, in this one process
+(so the numbers are per worker):
+
+  per attempt   what evaluate_attempt_task does for each attempt — own
+                session, EvaluationService.evaluate_attempt — over
+                --single-sample attempts
+  batch N       EvaluationService.evaluate_pending in chunks of N until the
+                exam has nothing left to evaluate (evaluate_exam_batch_task)
+
+The attempts are reset to SUBMITTED before each run. Broker round trips are
+not included, so the per-attempt figure is an upper bound on what one
+worker reaches with a task per attempt. With Redis up the compiled answer
+key is reused across calls; without it every call also loads the key.
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_evaluation --attempts 3000 --questions 50
+"""
+import argparse
+import json
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal
+
+
+def _seed(questions: int, attempts: int):
+    from app.core.security import get_password_hash
+    from app.models.exam import Exam, ExamStatus
+    from app.models.user import User, UserRole
+    from app.services.question_import import import_questions
+
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        users = [
+            User(email=f"evaluate-{tag}-{role.value}@quizzie-bench.com", password_hash=get_password_hash("bench"),
+                 full_name="Bench", role=role, is_verified=True)
+            for role in (UserRole.EXAMINER, UserRole.STUDENT)
+        ]
+        db.add_all(users)
+        db.flush()
+        exam = Exam(title="Evaluation bench", description="", duration_minutes=60, total_marks=questions,
+                    pass_percentage=40, status=ExamStatus.LIVE, created_by=users[0].id)
+        db.add(exam)
+        db.flush()
+        import_questions(db, exam.id, "\n".join(json.dumps({
+            "question_text": f"Bench question {i}", "question_type": "single", "marks": 1, "display_order": i,
+            "options": [{"option_text": str(k), "is_correct": k == 0, "display_order": k} for k in range(4)],
+        }) for i in range(questions)), "jsonl")
+        db.execute(text(
+            "INSERT INTO exam_attempts (id, exam_id, student_id, status, started_at, submitted_at, cheating_flags) "
+            "SELECT gen_random_uuid(), :e, :s, 'SUBMITTED', now(), now(), 0 FROM generate_series(1, :n)"
+        ), {"e": exam.id, "s": users[1].id, "n": attempts})
+        # A random option per question, so scores vary.
+        db.execute(text(
+            "INSERT INTO responses (id, attempt_id, question_id, selected_option_ids, marked_for_review, answered_at) "
+            "SELECT gen_random_uuid(), a.id, q.id, "
+            "       ARRAY[(SELECT o.id FROM options o WHERE o.question_id = q.id "
+            "              ORDER BY md5(a.id::text || o.id::text) LIMIT 1)], false, now() "
+            "FROM exam_attempts a CROSS JOIN questions q WHERE a.exam_id = :e AND q.exam_id = :e"
+        ), {"e": exam.id})
+        db.commit()
+        return tag, exam.id
+    finally:
+        db.close()
+
+
+def _reset(exam_id) -> list:
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "UPDATE responses SET is_correct = NULL, marks_awarded = NULL "
+            "WHERE attempt_id IN (SELECT id FROM exam_attempts WHERE exam_id = :e)"
+        ), {"e": exam_id})
+        ids = db.execute(text(
+            "UPDATE exam_attempts SET status = 'SUBMITTED', score = NULL WHERE exam_id = :e RETURNING id"
+        ), {"e": exam_id}).scalars().all()
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def _per_attempt(attempt_ids) -> float:
+    from app.services.evaluation_service import EvaluationService
+
+    t0 = time.perf_counter()
+    for attempt_id in attempt_ids:
+        db = SessionLocal()
+        try:
+            EvaluationService(db).evaluate_attempt(attempt_id)
+        finally:
+            db.close()
+    return time.perf_counter() - t0
+
+
+def _batch(exam_id, size: int) -> tuple:
+    from app.services.evaluation_service import EvaluationService
+
+    db = SessionLocal()
+    try:
+        svc, evaluated = EvaluationService(db), 0
+        t0 = time.perf_counter()
+        while done := svc.evaluate_pending(exam_id, size):
+            evaluated += done
+        return evaluated, time.perf_counter() - t0
+    finally:
+        db.close()
+
+
+def _cleanup(tag: str, exam_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM exam_attempts WHERE exam_id = :e"), {"e": exam_id})
+        db.execute(text("DELETE FROM exams WHERE id = :e"), {"e": exam_id})
+        db.execute(text("DELETE FROM users WHERE email LIKE :p"), {"p": f"evaluate-{tag}-%"})
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(args) -> None:
+    tag, exam_id = _seed(args.questions, args.attempts)
+    print(f"\nEvaluating {args.attempts} attempts × {args.questions} answers (one worker)")
+    try:
+        sample = _reset(exam_id)[:args.single_sample]
+        wall = _per_attempt(sample)
+        print(f"  {'per attempt':<16} {len(sample) / wall:8.0f} attempts/s   "
+              f"({len(sample)} in {wall:.2f} s, {wall / len(sample) * 1000:.2f} ms each)")
+        for size in args.batch_sizes:
+            _reset(exam_id)
+            evaluated, wall = _batch(exam_id, size)
+            print(f"  {f'batch {size}':<16} {evaluated / wall:8.0f} attempts/s   ({evaluated} in {wall:.2f} s)")
+    finally:
+        _cleanup(tag, exam_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, default=3000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--single-sample", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 200, 500])
+    run(parser.parse_args())
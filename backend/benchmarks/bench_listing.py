@@ -0,0 +1,131 @@
+"""
+Benchmark: exam listing latency as history grows — unbounded list vs keyset
+pages (GET /exams/?limit=&cursor=, full and ?view=compact).
+
+Seeds --exams exams for one examiner (generate_series, a few seconds for
+100k), then times, in-process over ASGI:
+
+  unbounded     what GET /exams/ used to do: every row, ORM + response model
+  first page    GET /exams/?limit=--limit
+  deep page     the same page size starting --depth rows in (via the cursor)
+  compact       deep page with ?view=compact (no description column)
+
+Run ``alembic upgrade head`` on the target DB first — without the 006
+composite indexes the keyset pages fall back to a sort.
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_listing --exams 100000 --limit 50 --depth 90000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks._util import print_row, summarize
+
+from app.core import pagination
+from app.core.database import SessionLocal, async_engine
+
+
+def _seed(exams: int):
+    from app.core.security import create_access_token, get_password_hash, token_claims
+    from app.models.user import User, UserRole
+
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        examiner = User(email=f"listing-{tag}@quizzie-bench.com", password_hash=get_password_hash("bench"),
+                        full_name="Bench Examiner", role=UserRole.EXAMINER, is_verified=True)
+        db.add(examiner)
+        db.flush()
+        db.execute(text("""
+            INSERT INTO exams (id, title, description, duration_minutes, total_marks, pass_percentage,
+                               status, created_by, created_at, updated_at)
+            SELECT gen_random_uuid(), 'Bench exam ' || g, repeat('Syllabus and instructions. ', 40),
+                   60, 100, 40, 'DRAFT', :uid,
+                   now() - make_interval(secs => g), now() - make_interval(secs => g)
+            FROM generate_series(1, :n) AS g
+        """), {"uid": examiner.id, "n": exams})
+        db.commit()
+        db.execute(text("ANALYZE exams"))
+        token = create_access_token(token_claims(examiner), timedelta(hours=1))
+        return tag, examiner.id, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def _cleanup(tag: str, examiner_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM exams WHERE created_by = :uid"), {"uid": examiner_id})
+        db.execute(text("DELETE FROM users WHERE email = :e"), {"e": f"listing-{tag}@quizzie-bench.com"})
+        db.commit()
+    finally:
+        db.close()
+
+
+def _unbounded(examiner_id) -> None:
+    from app.models.exam import Exam
+    from app.schemas.exam import Exam as ExamSchema
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Exam).filter(Exam.created_by == examiner_id).order_by(Exam.created_at.desc()).all()
+        [ExamSchema.model_validate(r).model_dump(mode="json") for r in rows]
+    finally:
+        db.close()
+
+
+async def run(args) -> None:
+    from app.main import app
+
+    tag, examiner_id, headers = _seed(args.exams)
+    try:
+        # Cursor for a page --depth rows in.
+        db = SessionLocal()
+        row = db.execute(text(
+            "SELECT created_at, id FROM exams WHERE created_by = :uid "
+            "ORDER BY created_at DESC, id DESC OFFSET :d LIMIT 1"), {"uid": examiner_id, "d": args.depth}).one()
+        db.close()
+        deep = pagination.encode_cursor(row.created_at, row.id)
+
+        print(f"\n{args.exams} exams for one examiner, page size {args.limit}, deep page at row {args.depth}")
+        samples = []
+        for _ in range(args.unbounded_runs):
+            t0 = time.perf_counter()
+            _unbounded(examiner_id)
+            samples.append(time.perf_counter() - t0)
+        print_row("unbounded (before)", summarize(samples))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            cases = {
+                "first page": {"limit": args.limit},
+                "deep page": {"limit": args.limit, "cursor": deep},
+                "deep page, compact": {"limit": args.limit, "cursor": deep, "view": "compact"},
+            }
+            for label, params in cases.items():
+                samples = []
+                for _ in range(args.iterations):
+                    t0 = time.perf_counter()
+                    r = await client.get("/api/v1/exams/", params=params, headers=headers)
+                    r.raise_for_status()
+                    samples.append(time.perf_counter() - t0)
+                print_row(label, summarize(samples))
+    finally:
+        _cleanup(tag, examiner_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exams", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=90_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--unbounded-runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
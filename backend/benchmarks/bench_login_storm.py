@@ -0,0 +1,121 @@
+"""
+Benchmark: pre-exam login storm.
+
+Seeds ``--users`` verified student accounts, then fires ``--logins`` logins at
+``--concurrency`` against a running server while a probe repeatedly calls a
+cheap sync endpoint (GET / by default, which runs on the same anyio threadpool
+bcrypt used to saturate). Reports p50/p99 login latency, how many logins were
+shed with 503, and probe latency before vs during the storm.
+
+Start the server with rate limiting off, otherwise the per-IP login limit
+rejects the storm before it reaches bcrypt:
+  RATE_LIMIT_ENABLED=false uvicorn app.main:app --workers 1
+  python -m benchmarks.bench_login_storm --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from benchmarks._util import print_row, summarize
+
+from app.core.database import SessionLocal
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
+
+PASSWORD = "storm-password"
+
+
+def seed_users(count: int) -> list:
+    db = SessionLocal()
+    try:
+        password_hash = get_password_hash(PASSWORD)   # hash once, reuse for all
+        tag = uuid.uuid4().hex[:6]
+        users = [
+            User(
+                email=f"storm-{tag}-{i}@quizzie-bench.com",
+                password_hash=password_hash,
+                full_name=f"Storm Student {i}",
+                role=UserRole.STUDENT,
+                is_verified=True,
+            )
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [u.email for u in users]
+    finally:
+        db.close()
+
+
+def delete_users(emails: list) -> None:
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email.in_(emails)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path)
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def run(args) -> None:
+    emails = seed_users(args.users)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            baseline: list = []
+            stop = asyncio.Event()
+            task = asyncio.create_task(probe(client, args.probe_path, stop, baseline))
+            await asyncio.sleep(2)
+            stop.set()
+            await task
+
+            sem = asyncio.Semaphore(args.concurrency)
+            latencies, statuses = [], {}
+
+            async def login(i: int) -> None:
+                async with sem:
+                    start = time.perf_counter()
+                    r = await client.post("/api/v1/auth/login", json={
+                        "email": emails[i % len(emails)],
+                        "password": PASSWORD,
+                    })
+                    elapsed = time.perf_counter() - start
+                    statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                    if r.status_code == 200:
+                        latencies.append(elapsed)
+
+            during: list = []
+            stop = asyncio.Event()
+            task = asyncio.create_task(probe(client, args.probe_path, stop, during))
+            started = time.perf_counter()
+            await asyncio.gather(*(login(i) for i in range(args.logins)))
+            wall = time.perf_counter() - started
+            stop.set()
+            await task
+
+        print(f"\nLogin storm: {args.logins} logins, concurrency {args.concurrency}, {wall:.1f}s wall")
+        print(f"  status codes: {statuses}   ({args.logins / wall:.1f} logins/s)")
+        print_row("login (200 only)", summarize(latencies))
+        print_row(f"probe {args.probe_path} baseline", summarize(baseline))
+        print_row(f"probe {args.probe_path} during", summarize(during))
+    finally:
+        delete_users(emails)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--probe-path", default="/")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,145 @@
+"""
+Benchmark: loading a question bank — one POST per question vs the bulk
+import endpoint (JSON lines and CSV).
+
+In-process over ASGI against DATABASE_URL. Each run imports into a fresh
+draft exam:
+
+  per-question   POST /exams/{id}/questions for --legacy-sample questions,
+                 extrapolated to --questions
+  bulk jsonl     POST /exams/{id}/questions/import, --questions rows
+  bulk csv       the same as CSV
+
+Questions are 4-option MCQs with a ~200-character stem. SQL statement counts
+come from the X-DB-Queries header (QUERY_STATS_HEADERS is switched on here).
+
+Usage (from the backend folder):
+  python -m benchmarks.bench_question_import --questions 10000 --legacy-sample 500
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import SessionLocal, async_engine
+
+STEM = "A block of mass m slides down a rough incline of angle theta; find the acceleration given " \
+       "coefficient of kinetic friction mu and g = 10 m/s^2, ignoring air resistance entirely. Q"
+
+
+def _question(i: int) -> dict:
+    return {
+        "question_text": f"{STEM}{i}",
+        "question_type": "single",
+        "marks": 4,
+        "topic": "Laws of Motion",
+        "display_order": i,
+        "options": [{"option_text": f"{k} m/s^2", "is_correct": k == 2, "display_order": k} for k in range(4)],
+    }
+
+
+def _as_jsonl(n: int) -> str:
+    return "\n".join(json.dumps(_question(i)) for i in range(n)) + "\n"
+
+
+def _as_csv(n: int) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["question_text", "question_type", "marks", "topic", "display_order",
+                     "option_1", "option_2", "option_3", "option_4", "correct"])
+    for i in range(n):
+        q = _question(i)
+        writer.writerow([q["question_text"], "single", 4, q["topic"], i,
+                         *[o["option_text"] for o in q["options"]], 3])
+    return out.getvalue()
+
+
+def _seed():
+    from app.core.security import create_access_token, get_password_hash, token_claims
+    from app.models.user import User, UserRole
+
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        examiner = User(email=f"import-{tag}@quizzie-bench.com", password_hash=get_password_hash("bench"),
+                        full_name="Bench Examiner", role=UserRole.EXAMINER, is_verified=True)
+        db.add(examiner)
+        db.commit()
+        token = create_access_token(token_claims(examiner), timedelta(hours=1))
+        return tag, examiner.id, {"Authorization": f"Bearer {token}"}
+    finally:
+        db.close()
+
+
+def _new_exam(examiner_id) -> str:
+    from app.models.exam import Exam, ExamStatus
+
+    db = SessionLocal()
+    try:
+        exam = Exam(title="Import bench", description="", duration_minutes=60, total_marks=0,
+                    pass_percentage=40, status=ExamStatus.DRAFT, created_by=examiner_id)
+        db.add(exam)
+        db.commit()
+        return str(exam.id)
+    finally:
+        db.close()
+
+
+def _cleanup(tag: str, examiner_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM exams WHERE created_by = :uid"), {"uid": examiner_id})
+        db.execute(text("DELETE FROM users WHERE email = :e"), {"e": f"import-{tag}@quizzie-bench.com"})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(args) -> None:
+    settings.QUERY_STATS_HEADERS = True
+    from app.main import app
+
+    tag, examiner_id, headers = _seed()
+    print(f"\nLoading {args.questions} questions (4 options each)")
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            exam_id = _new_exam(examiner_id)
+            statements = 0
+            t0 = time.perf_counter()
+            for i in range(args.legacy_sample):
+                r = await client.post(f"/api/v1/exams/{exam_id}/questions", json=_question(i), headers=headers)
+                r.raise_for_status()
+                statements += int(r.headers.get("x-db-queries", 0))
+            per = (time.perf_counter() - t0) / args.legacy_sample
+            print(f"  {'per-question (extrapolated)':<30} {per * args.questions:8.2f} s   "
+                  f"{per * 1000:.2f} ms/question, {statements // args.legacy_sample} statements/question")
+
+            for label, body, fmt in (("bulk jsonl", _as_jsonl(args.questions), "jsonl"),
+                                     ("bulk csv", _as_csv(args.questions), "csv")):
+                exam_id = _new_exam(examiner_id)
+                t0 = time.perf_counter()
+                r = await client.post(f"/api/v1/exams/{exam_id}/questions/import?format={fmt}",
+                                      content=body, headers=headers)
+                wall = time.perf_counter() - t0
+                r.raise_for_status()
+                print(f"  {label:<30} {wall:8.2f} s   {r.json()['imported']} imported, "
+                      f"{r.headers.get('x-db-queries')} statements, {len(body) / 1e6:.1f} MB body")
+    finally:
+        _cleanup(tag, examiner_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--legacy-sample", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,202 @@
+"""
+Benchmark: exam submission — persisting the answer sheet.
+
+In-process over ASGI against DATABASE_URL (alembic 007 applied). Seeds one
+exam of max(--sizes) MCQs and --submitters students, then for each sheet size:
+
+  legacy rows    one ORM ``Response`` per answer + commit (the old submit
+                 loop), --legacy-rounds sheets, sequential
+  upsert         ``autosave.write_answers`` — one INSERT ... ON CONFLICT DO
+                 UPDATE for the sheet, same sheets, sequential
+  submit storm   --submitters students POST /attempts/{id}/submit at once,
+                 each with a full sheet; p50/p95/p99 per request
+
+Celery dispatch is replaced with an instant stand-in (as with a healthy
+broker), so the storm measures persistence rather than the synchronous
+evaluation fallback. With many submitters the numbers include waiting for a
+pooled connection. Run it with Redis up: without the principal cache every
+request also looks its user up through the sync pool from the threadpool, and
+a storm much larger than the threadpool starves it until pool checkouts time
+out (counted as ``failed``).
+
+Usage (from the backend folder):
+  RATE_LIMIT_ENABLED=false python -m benchmarks.bench_submit --sizes 100 500 1000 --submitters 500
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy import select, text
+
+from benchmarks._util import print_row, summarize
+
+from app.core.database import SessionLocal, async_engine
+
+
+class _QueuedTask:
+    """Celery stand-in: accepts the evaluation task instantly."""
+
+    @staticmethod
+    def apply_async(args=None, kwargs=None, **options):
+        return SimpleNamespace(id=f"bench-{args[0]}")
+
+
+def _question(i: int) -> dict:
+    return {
+        "question_text": f"Bench question {i}", "question_type": "single", "marks": 1, "display_order": i,
+        "options": [{"option_text": str(k), "is_correct": k == 0, "display_order": k} for k in range(4)],
+    }
+
+
+def _seed(questions: int, submitters: int):
+    from app.core.security import create_access_token, get_password_hash, token_claims
+    from app.models.exam import Exam, ExamStatus
+    from app.models.question import Option, Question
+    from app.models.user import User, UserRole
+    from app.services.question_import import import_questions
+
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:6]
+        password_hash = get_password_hash("bench")
+        examiner = User(email=f"submit-{tag}-examiner@quizzie-bench.com", password_hash=password_hash,
+                        full_name="Bench Examiner", role=UserRole.EXAMINER, is_verified=True)
+        students = [
+            User(email=f"submit-{tag}-{i}@quizzie-bench.com", password_hash=password_hash,
+                 full_name=f"Bench Student {i}", role=UserRole.STUDENT, is_verified=True)
+            for i in range(submitters)
+        ]
+        db.add(examiner)
+        db.add_all(students)
+        db.flush()
+        exam = Exam(title="Submit bench", description="", duration_minutes=180, total_marks=questions,
+                    pass_percentage=40, status=ExamStatus.LIVE, created_by=examiner.id)
+        db.add(exam)
+        db.flush()
+        import_questions(db, exam.id, "\n".join(json.dumps(_question(i)) for i in range(questions)), "jsonl")
+        db.commit()
+
+        first_option = dict(db.execute(
+            select(Question.id, Option.id)
+            .join(Option, Option.question_id == Question.id)
+            .where(Question.exam_id == exam.id, Option.display_order == 0)
+            .order_by(Question.display_order)
+        ).all())
+        headers = [
+            {"Authorization": f"Bearer {create_access_token(token_claims(s), timedelta(hours=2))}"}
+            for s in students
+        ]
+        return tag, exam.id, [s.id for s in students], list(first_option.items()), headers
+    finally:
+        db.close()
+
+
+def _new_attempts(exam_id, student_ids) -> list:
+    from app.models.attempt import AttemptStatus, ExamAttempt
+
+    db = SessionLocal()
+    try:
+        attempts = [ExamAttempt(exam_id=exam_id, student_id=s, status=AttemptStatus.IN_PROGRESS)
+                    for s in student_ids]
+        db.add_all(attempts)
+        db.commit()
+        return [a.id for a in attempts]
+    finally:
+        db.close()
+
+
+def _legacy_rows(attempt_id, answers) -> None:
+    from app.models.attempt import Response
+
+    db = SessionLocal()
+    try:
+        for question_id, option_id in answers:
+            db.add(Response(attempt_id=attempt_id, question_id=question_id, selected_option_ids=[option_id]))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _upsert(attempt_id, answers) -> None:
+    from app.services import autosave
+
+    sheet = {str(q): autosave.answer([o]) for q, o in answers}
+    db = SessionLocal()
+    try:
+        autosave.write_answers(db, {str(attempt_id): sheet})
+        db.commit()
+    finally:
+        db.close()
+
+
+def _timed(fn, attempt_ids, answers) -> list:
+    samples = []
+    for attempt_id in attempt_ids:
+        t0 = time.perf_counter()
+        fn(attempt_id, answers)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def _storm(client, attempt_ids, headers, body) -> tuple:
+    async def one(attempt_id, h):
+        t0 = time.perf_counter()
+        r = await client.post(f"/api/v1/attempts/{attempt_id}/submit", json=body, headers=h)
+        return time.perf_counter() - t0, r.status_code
+
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(one(a, h) for a, h in zip(attempt_ids, headers)))
+    wall = time.perf_counter() - t0
+    return [s for s, code in results if code == 200], sum(code != 200 for _, code in results), wall
+
+
+def _cleanup(tag: str, exam_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM exam_attempts WHERE exam_id = :e"), {"e": exam_id})
+        db.execute(text("DELETE FROM exams WHERE id = :e"), {"e": exam_id})
+        db.execute(text("DELETE FROM users WHERE email LIKE :p"), {"p": f"submit-{tag}-%"})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(args) -> None:
+    import app.api.v1.attempts as attempts_api
+    from app.main import app
+
+    attempts_api.evaluate_attempt_task = _QueuedTask()
+    tag, exam_id, student_ids, answer_key, headers = _seed(max(args.sizes), args.submitters)
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            for size in args.sizes:
+                answers = answer_key[:size]
+                print(f"\nSheet of {size} answers")
+
+                legacy = _timed(_legacy_rows, _new_attempts(exam_id, student_ids[:args.legacy_rounds]), answers)
+                print_row("legacy rows", summarize(legacy))
+                upsert = _timed(_upsert, _new_attempts(exam_id, student_ids[:args.legacy_rounds]), answers)
+                print_row("upsert", summarize(upsert))
+
+                body = {"responses": [{"question_id": str(q), "selected_option_ids": [str(o)]} for q, o in answers]}
+                samples, failed, wall = await _storm(client, _new_attempts(exam_id, student_ids), headers, body)
+                print_row(f"submit storm x{args.submitters}", summarize(samples))
+                print(f"  {'':<28} wall={wall:.2f} s  failed={failed}  "
+                      f"{len(samples) * size / wall:,.0f} answers/s persisted")
+    finally:
+        _cleanup(tag, exam_id)
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--submitters", type=int, default=500)
+    parser.add_argument("--legacy-rounds", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
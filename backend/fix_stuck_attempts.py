@@ -1,45 +1,41 @@
 """
 fix_stuck_attempts.py
 
-Run this once to clean up stuck 'in_progress' exam attempts
-that prevent students from starting new exams.
+Closes in-progress exam attempts whose deadline has passed, right now,
+instead of waiting for the Celery beat sweeper (app/services/attempt_sweeper.py),
+and evaluates them. Attempts still within their time are left alone.
 """
 
 import os
 import sys
-from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from uuid import UUID
+
 from app.core.database import SessionLocal
-from app.models.attempt import ExamAttempt, AttemptStatus
+from app.services import attempt_sweeper
+from app.services.evaluation_service import EvaluationService
+from app.core.config import settings
 
 
 def fix_stuck_attempts():
     db = SessionLocal()
     try:
-        # Find all IN_PROGRESS attempts
-        stuck_attempts = db.query(ExamAttempt).filter(
-            ExamAttempt.status == AttemptStatus.IN_PROGRESS
-        ).all()
-
-        print(f"Found {len(stuck_attempts)} stuck in_progress attempts")
-
-        for attempt in stuck_attempts:
-            print(
-                f"  Fixing attempt {str(attempt.id)[:8]} "
-                f"for exam {str(attempt.exam_id)[:8]}"
-            )
+        result = attempt_sweeper.sweep(db)
+        print(f"Closed {result['closed']} expired attempts across {len(result['exam_ids'])} exams")
 
-            # ✅ Move to a VALID enum state
-            attempt.status = AttemptStatus.SUBMITTED
-            attempt.submitted_at = datetime.utcnow()
+        svc = EvaluationService(db)
+        for exam_id in result["exam_ids"]:
+            evaluated = 0
+            while done := svc.evaluate_pending(UUID(exam_id), settings.EVALUATION_BATCH_SIZE):
+                evaluated += done
+            print(f"  Evaluated {evaluated} attempts of exam {exam_id[:8]}")
 
-        db.commit()
-        print(f"\n✅ Successfully fixed {len(stuck_attempts)} stuck attempts")
+        print("\n✅ Done")
 
     except Exception as e:
         db.rollback()
@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.models.user import User
 from app.models.exam import Exam
-from app.models.question import Question, Option
+from app.schemas.question import OptionCreate, QuestionCreate
+from app.services.question_import import insert_questions
 
 def seed_physics_exam():
     db = SessionLocal()
@@ -204,27 +205,23 @@ def seed_physics_exam():
             }
         ]
         
-        for i, q_data in enumerate(questions_data):
-            question = Question(
-                exam_id=exam.id,
+        # One set-based insert for all questions and options (see
+        # app/services/question_import.py) instead of a flush per question.
+        questions = [
+            (i, QuestionCreate(
                 question_text=q_data["text"],
                 question_type=q_data["type"],
                 marks=4, # JEE Mains gives +4 for correct
                 topic=q_data["topic"],
-                display_order=i
-            )
-            db.add(question)
-            db.flush()
-            
-            for j, opt_data in enumerate(q_data["options"]):
-                option = Option(
-                    question_id=question.id,
-                    option_text=opt_data["text"],
-                    is_correct=opt_data["correct"],
-                    display_order=j
-                )
-                db.add(option)
-                
+                display_order=i,
+                options=[
+                    OptionCreate(option_text=o["text"], is_correct=o["correct"], display_order=j)
+                    for j, o in enumerate(q_data["options"])
+                ],
+            ), True)
+            for i, q_data in enumerate(questions_data)
+        ]
+        insert_questions(db, exam.id, questions)
         db.commit()
         
         print("15 Questions created successfully!")
@@ -1,9 +1,9 @@
 """
 Shared pytest fixtures for Quizzie test suite.
-Uses a real PostgreSQL test DB (same engine as prod) and rolls back after each test.
+Uses a real PostgreSQL test DB (same engine as prod) and empties it after each test.
 """
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 import os
@@ -19,39 +19,78 @@ os.environ["DATABASE_URL"] = TEST_DB_URL
 os.environ["REDIS_URL"] = "redis://localhost:6379/1"   # DB 1 for tests
 os.environ["SECRET_KEY"] = "test-secret-key-not-for-production-only"
 os.environ["ENVIRONMENT"] = "test"
+os.environ["QUERY_STATS_HEADERS"] = "true"             # off by default; tests read them
 
 
+from app.core import query_stats
+from app.core.cache import cache
 from app.core.database import Base, get_db
 from app.main import app
 from app.models.user import User, UserRole
 from app.models.exam import Exam, ExamStatus
 from app.models.question import Question, Option, QuestionType
 from app.models.attempt import ExamAttempt, AttemptStatus
-from app.core.security import get_password_hash, create_access_token
+from app.core.security import get_password_hash, create_access_token, token_claims
 from datetime import timedelta
 
 
+def _truncate_all(eng):
+    tables = ", ".join(f'"{t.name}"' for t in Base.metadata.sorted_tables)
+    with eng.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
 @pytest.fixture(scope="session")
 def engine():
     eng = create_engine(TEST_DB_URL, pool_pre_ping=True)
     Base.metadata.create_all(bind=eng)
+    _truncate_all(eng)
     yield eng
     Base.metadata.drop_all(bind=eng)
 
 
+@pytest.fixture(autouse=True)
+def _reset_local_cache():
+    """The in-process cache tier outlives the per-test TRUNCATE of every table."""
+    cache.clear_local()
+    yield
+    cache.clear_local()
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budgets():
+    """Fail any test in which a route ran more SQL than its ``@query_budget``."""
+    query_stats.record_violations = True
+    query_stats.violations.clear()
+    yield
+    over, query_stats.violations[:] = list(query_stats.violations), []
+    assert not over, "Query budget exceeded: " + "; ".join(over)
+
+
+@pytest.fixture
+def count_queries():
+    """``with count_queries() as stats: ...`` — statements run inside the block."""
+    return query_stats.counting
+
+
 @pytest.fixture(scope="function")
 def db(engine):
-    """Each test gets a fresh transaction that is rolled back after."""
-    connection = engine.connect()
-    transaction = connection.begin()
-    TestingSession = sessionmaker(bind=connection)
+    """
+    Each test gets a fresh session; every table is truncated after the test.
+
+    Data is committed for real rather than rolled back: async handlers read
+    through their own asyncpg connection (get_async_db) and background tasks
+    through SessionLocal, and neither could see an uncommitted test
+    transaction. After calling an async endpoint, ``db.expire_all()`` before
+    re-reading rows it changed.
+    """
+    TestingSession = sessionmaker(bind=engine)
     session = TestingSession()
 
     yield session
 
     session.close()
-    transaction.rollback()
-    connection.close()
+    _truncate_all(engine)
 
 
 @pytest.fixture(scope="function")
@@ -103,7 +142,7 @@ def examiner_user(db):
 
 def make_token(user: User) -> str:
     return create_access_token(
-        data={"sub": user.email},
+        data=token_claims(user),
         expires_delta=timedelta(minutes=120),
     )
 
@@ -154,3 +193,18 @@ def live_exam(db, examiner_user):
     db.refresh(correct)
 
     return exam, q, correct, wrong
+
+
+@pytest.fixture
+def ten_question_exam(db, live_exam):
+    """live_exam plus nine 4-option questions (display_order 2..10)."""
+    exam, *_ = live_exam
+    for i in range(2, 11):
+        q = Question(exam_id=exam.id, question_text=f"Q{i}", question_type=QuestionType.SINGLE,
+                     marks=1, display_order=i)
+        db.add(q)
+        db.flush()
+        db.add_all([Option(question_id=q.id, option_text=f"opt{k}", is_correct=k == 0, display_order=k)
+                    for k in range(4)])
+    db.commit()
+    return exam
@@ -67,6 +67,20 @@ class TestAnalytics:
         assert board[0]["rank"] == 1
         assert "student_name" in board[0]
 
+    def test_leaderboard_cached_per_limit(self, client, examiner_headers, student_headers, live_exam):
+        import asyncio
+        from app.core.cache import cache, key_leaderboard
+        exam, question, correct_opt, _ = live_exam
+        _submit_attempt(client, student_headers, exam, question, correct_opt)
+
+        url = f"/api/v1/analytics/exam/{exam.id}/leaderboard"
+        assert client.get(url, params={"limit": 1}, headers=examiner_headers).status_code == 200
+        assert client.get(url, params={"limit": 50}, headers=examiner_headers).status_code == 200
+        # One entry per limit, so a limit=50 caller is never served the limit=1 board.
+        for limit in (1, 50):
+            assert asyncio.run(cache.get(key_leaderboard(str(exam.id), limit))) is not None
+        assert client.get(url, params={"limit": 0}, headers=examiner_headers).status_code == 422
+
     def test_student_cannot_see_summary(self, client, student_headers, live_exam):
         exam, *_ = live_exam
         r = client.get(f"/api/v1/analytics/exam/{exam.id}/summary",
@@ -100,3 +114,70 @@ class TestAnalytics:
         lines = r.text.strip().split("\n")
         assert len(lines) >= 2
         assert "Student Name" in lines[0]
+
+
+class TestReadReplica:
+    """Routing of ``get_read_db``; the "replica" is the test database itself."""
+
+    @pytest.fixture
+    def replica(self, monkeypatch, engine):
+        from sqlalchemy.orm import sessionmaker
+        from app.core import database
+        from app.core.cache import RedisCache, cache
+
+        opened = []
+
+        def read_session():
+            opened.append(1)
+            return sessionmaker(bind=engine)()
+
+        markers = {}
+        monkeypatch.setattr(database, "read_engine", engine)
+        monkeypatch.setattr(database, "ReadSessionLocal", read_session)
+        monkeypatch.setattr(database, "replica_lag", lambda: 0.0)
+        monkeypatch.setattr(RedisCache, "is_sync_available", property(lambda self: True))
+        monkeypatch.setattr(cache, "get_sync", lambda key: markers.get(key))
+        monkeypatch.setattr(cache, "set_sync", lambda key, value, ttl=60, tags=(): markers.__setitem__(key, value))
+
+        async def fake_set(key, value, ttl=60, tags=()):
+            markers[key] = value
+        monkeypatch.setattr(cache, "set", fake_set)
+        return database, opened, markers
+
+    def test_reads_use_replica(self, client, examiner_headers, live_exam, replica):
+        _, opened, _ = replica
+        r = client.get("/api/v1/analytics/examiner/stats", headers=examiner_headers)
+        assert r.status_code == 200
+        assert r.json()["totalExams"] == 1
+        assert opened == [1]
+
+    def test_lagging_replica_falls_back_to_primary(self, client, examiner_headers, live_exam,
+                                                   replica, monkeypatch):
+        database, opened, _ = replica
+        monkeypatch.setattr(database, "replica_lag", lambda: 60.0)
+        assert client.get("/api/v1/analytics/examiner/stats", headers=examiner_headers).status_code == 200
+        assert opened == []
+
+    def test_non_standby_is_not_a_replica(self, engine, monkeypatch, caplog):
+        from app.core import database
+
+        monkeypatch.setattr(database, "read_engine", engine)       # the test DB is a primary
+        assert database._measure_replica_lag() is None
+        assert "not a streaming replica" in caplog.text
+
+    def test_submit_pins_student_to_primary(self, client, student_headers, live_exam, replica):
+        exam, question, correct_opt, _ = live_exam
+        _, opened, markers = replica
+        attempt_id = _submit_attempt(client, student_headers, exam, question, correct_opt)
+        assert any(k.endswith(":read_primary") for k in markers)
+
+        r = client.get("/api/v1/attempts/my-attempts", headers=student_headers)
+        assert r.status_code == 200
+        assert [a["id"] for a in r.json()] == [attempt_id]
+        assert opened == []
+
+    def test_no_replica_configured(self, client, student_headers, monkeypatch):
+        from app.core import database
+        monkeypatch.setattr(database, "read_engine", None)
+        assert database.read_target("someone") == "no_replica"
+        assert client.get("/api/v1/analytics/student/me/stats", headers=student_headers).status_code == 200
@@ -0,0 +1,105 @@
+"""
+Deadline sweeper: closing expired attempts, writing their buffered answers
+first, and the start-exam / Celery beat paths that use it.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core.cache import cache, key_autosave
+from app.models.attempt import ExamAttempt, Response, AttemptStatus
+from app.services import attempt_sweeper
+from tests.test_evaluation import shared_redis  # noqa: F401  (fixture)
+
+
+def _open(db, exam, student, minutes_ago):
+    attempt = ExamAttempt(exam_id=exam.id, student_id=student.id, status=AttemptStatus.IN_PROGRESS,
+                          started_at=datetime.utcnow() - timedelta(minutes=minutes_ago))
+    db.add(attempt)
+    db.commit()
+    return attempt.id
+
+
+class TestSweep:
+    def test_closes_expired_at_their_deadline(self, db, live_exam, student_user):
+        exam, *_ = live_exam   # 60 minutes
+        expired = _open(db, exam, student_user, 90)
+        running = _open(db, exam, student_user, 30)
+
+        result = attempt_sweeper.sweep(db)
+        assert result == {"closed": 1, "exam_ids": [str(exam.id)]}
+
+        db.expire_all()
+        closed = db.get(ExamAttempt, expired)
+        assert closed.status == AttemptStatus.SUBMITTED
+        assert closed.submitted_at == closed.started_at + timedelta(minutes=60)
+        assert closed.time_taken_seconds == 3600
+        assert db.get(ExamAttempt, running).status == AttemptStatus.IN_PROGRESS
+
+    def test_exam_end_time_caps_deadline(self, db, live_exam, student_user):
+        exam, *_ = live_exam
+        exam.end_time = datetime.utcnow() - timedelta(minutes=5)
+        db.commit()
+        attempt_id = _open(db, exam, student_user, 30)
+
+        assert attempt_sweeper.sweep(db)["closed"] == 1
+        db.expire_all()
+        assert db.get(ExamAttempt, attempt_id).submitted_at == exam.end_time
+
+    def test_batches_until_done(self, db, live_exam, student_user, monkeypatch):
+        from app.core.config import settings
+
+        exam, *_ = live_exam
+        for _ in range(5):
+            _open(db, exam, student_user, 90)
+        monkeypatch.setattr(settings, "ATTEMPT_SWEEP_BATCH", 2)
+        assert attempt_sweeper.sweep(db)["closed"] == 5
+        assert not db.query(ExamAttempt).filter(ExamAttempt.status == AttemptStatus.IN_PROGRESS).count()
+
+    def test_writes_buffered_answers_first(self, client, db, student_headers, live_exam, student_user,
+                                           shared_redis):
+        exam, q, correct, wrong = live_exam
+        attempt_id = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)},
+                                 headers=student_headers).json()["id"]
+        client.post(f"/api/v1/attempts/{attempt_id}/auto-save", headers=student_headers, json={"responses": [
+            {"question_id": str(q.id), "selected_option_ids": [str(correct.id)], "marked_for_review": False},
+        ]})
+        attempt = db.get(ExamAttempt, attempt_id)
+        attempt.started_at -= timedelta(hours=2)
+        db.commit()
+
+        assert attempt_sweeper.sweep(db)["closed"] == 1
+        db.expire_all()
+        rows = db.query(Response).filter(Response.attempt_id == attempt.id).all()
+        assert [r.selected_option_ids for r in rows] == [[correct.id]]
+        assert not cache.sync_client.exists(key_autosave(attempt_id))
+
+
+class TestStartExam:
+    def test_closes_expired_attempt_and_starts_new(self, client, db, student_headers, live_exam, student_user):
+        exam, *_ = live_exam
+        expired = _open(db, exam, student_user, 90)
+
+        r = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)}, headers=student_headers)
+        assert r.status_code == 201 and r.json()["id"] != str(expired)
+
+        db.expire_all()
+        assert db.get(ExamAttempt, expired).status == AttemptStatus.EVALUATED
+
+    def test_resumes_attempt_within_deadline(self, client, db, student_headers, live_exam, student_user):
+        exam, *_ = live_exam
+        running = _open(db, exam, student_user, 50)
+        r = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)}, headers=student_headers)
+        assert r.json()["id"] == str(running)
+
+
+class TestSweepTask:
+    def test_queues_one_evaluation_per_exam(self, db, live_exam, student_user):
+        from app.worker.tasks.attempt_tasks import sweep_expired_attempts_task
+
+        exam, *_ = live_exam
+        for _ in range(3):
+            _open(db, exam, student_user, 90)
+        with patch("app.worker.tasks.attempt_tasks.evaluate_exam_batch_task") as task:
+            result = sweep_expired_attempts_task.run()
+        assert result["closed"] == 3
+        task.apply_async.assert_called_once_with(args=[str(exam.id)])
@@ -152,6 +152,22 @@ class TestMyAttempts:
         assert r.status_code == 200
         assert len(r.json()) >= 1
 
+    def test_my_attempts_pages(self, client, db, student_user, student_headers, live_exam):
+        from app.models.attempt import ExamAttempt, AttemptStatus
+        exam, *_ = live_exam
+        db.add_all([ExamAttempt(exam_id=exam.id, student_id=student_user.id, status=AttemptStatus.SUBMITTED)
+                    for _ in range(3)])
+        db.commit()
+
+        first = client.get("/api/v1/attempts/my-attempts", params={"limit": 2}, headers=student_headers)
+        assert len(first.json()) == 2
+        rest = client.get("/api/v1/attempts/my-attempts",
+                          params={"limit": 2, "cursor": first.headers["x-next-cursor"]},
+                          headers=student_headers)
+        assert len(rest.json()) == 1
+        assert "x-next-cursor" not in rest.headers
+        assert {a["id"] for a in first.json()}.isdisjoint(a["id"] for a in rest.json())
+
     def test_auto_save(self, client, student_headers, live_exam):
         exam, question, opt, _ = live_exam
         attempt_id = client.post(
@@ -79,6 +79,17 @@ class TestLogin:
         })
         assert r.status_code == 403
 
+    def test_login_shed_when_hashing_queue_full(self, client, student_user, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "HASH_QUEUE_MAX", 0)
+
+        r = client.post("/api/v1/auth/login", json={
+            "email": "student@test.com",
+            "password": "password123",
+        })
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == str(settings.HASH_RETRY_AFTER_SECONDS)
+
     def test_get_me(self, client, student_headers):
         r = client.get("/api/v1/auth/me", headers=student_headers)
         assert r.status_code == 200
@@ -87,3 +98,150 @@ class TestLogin:
     def test_me_without_token(self, client):
         r = client.get("/api/v1/auth/me")
         assert r.status_code == 401
+
+
+class TestHashingPool:
+    def test_pool_split_between_web_workers(self, monkeypatch):
+        from app.core import hashing
+        from app.core.config import settings
+
+        monkeypatch.setattr(hashing.os, "cpu_count", lambda: 8)
+        monkeypatch.setattr(settings, "WORKERS", 4)
+        monkeypatch.setattr(settings, "HASH_POOL_WORKERS", 0)
+        assert hashing.pool_size() == 2
+        monkeypatch.setattr(settings, "WORKERS", 16)
+        assert hashing.pool_size() == 1
+
+    def test_broken_pool_shut_down_once_and_replacement_kept(self, monkeypatch):
+        from unittest.mock import MagicMock
+
+        from app.core import hashing
+
+        broken, replacement = MagicMock(), MagicMock()
+        monkeypatch.setattr(hashing, "_executor", broken)
+        hashing._discard(broken)
+        assert hashing._executor is None
+        hashing._executor = replacement
+        hashing._discard(broken)             # a second job failing on the same old pool
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        assert hashing._executor is replacement
+
+
+class TestPrincipalCache:
+    def test_me_served_from_cache_after_first_call(self, client, student_user, student_headers):
+        from app.core import principal_cache
+
+        before = principal_cache.stats()["db_loads"]
+        r1 = client.get("/api/v1/auth/me", headers=student_headers)
+        r2 = client.get("/api/v1/auth/me", headers=student_headers)
+        assert r1.status_code == r2.status_code == 200
+        assert r1.json() == r2.json()
+        assert r2.json()["email"] == "student@test.com"
+        assert principal_cache.stats()["db_loads"] == before + 1
+
+    def test_password_reset_invalidates_principal(self, client, db, student_user, student_headers):
+        from datetime import datetime, timedelta
+        from app.core import principal_cache
+
+        client.get("/api/v1/auth/me", headers=student_headers)
+        student_user.reset_token = "reset-me"
+        student_user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+        db.commit()
+
+        r = client.post("/api/v1/auth/reset-password", json={
+            "token": "reset-me",
+            "new_password": "newpassword123",
+        })
+        assert r.status_code == 200
+
+        before = principal_cache.stats()["db_loads"]
+        client.get("/api/v1/auth/me", headers=student_headers)
+        assert principal_cache.stats()["db_loads"] == before + 1
+
+
+class TestTokenClaims:
+    def test_login_token_carries_principal(self, client, student_user):
+        from app.core.security import decode_access_token
+
+        r = client.post("/api/v1/auth/login", json={
+            "email": "student@test.com",
+            "password": "password123",
+        })
+        claims = decode_access_token(r.json()["access_token"])
+        assert claims["uid"] == str(student_user.id)
+        assert claims["role"] == "student"
+        assert claims["ver"] is True
+        assert claims["jti"]
+
+    def _start(self, client, headers, exam):
+        return client.post("/api/v1/attempts/start",
+                           json={"exam_id": str(exam.id)},
+                           headers=headers).json()["id"]
+
+    def test_fast_path_accepts_v2_token(self, client, student_headers, live_exam):
+        exam, *_ = live_exam
+        attempt_id = self._start(client, student_headers, exam)
+        r = client.post("/api/v1/monitor/enhanced/recover",
+                        json={"attempt_id": attempt_id, "amount": 3},
+                        headers=student_headers)
+        assert r.status_code == 200
+
+    def test_fast_path_accepts_legacy_token(self, client, student_user, student_headers, live_exam):
+        from datetime import timedelta
+        from app.core.security import create_access_token
+
+        exam, *_ = live_exam
+        attempt_id = self._start(client, student_headers, exam)
+        legacy = create_access_token({"sub": student_user.email}, timedelta(minutes=5))
+        r = client.post("/api/v1/monitor/enhanced/recover",
+                        json={"attempt_id": attempt_id, "amount": 3},
+                        headers={"Authorization": f"Bearer {legacy}"})
+        assert r.status_code == 200
+
+    def test_fast_path_rejects_other_students_attempt(self, client, db, student_headers, live_exam):
+        from app.models.user import User, UserRole
+        from app.core.security import create_access_token, token_claims
+
+        exam, *_ = live_exam
+        attempt_id = self._start(client, student_headers, exam)
+        other = User(email="intruder@test.com", password_hash="x", full_name="Intruder",
+                     role=UserRole.STUDENT, is_verified=True)
+        db.add(other)
+        db.commit()
+        r = client.post("/api/v1/monitor/enhanced/recover",
+                        json={"attempt_id": attempt_id, "amount": 3},
+                        headers={"Authorization": f"Bearer {create_access_token(token_claims(other))}"})
+        assert r.status_code == 404
+
+    def test_logout(self, client, student_headers):
+        r = client.post("/api/v1/auth/logout", headers=student_headers)
+        assert r.status_code == 200
+
+
+class TestRevocation:
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        import fakeredis
+        from app.core.cache import cache
+
+        monkeypatch.setattr(cache, "_client", fakeredis.aioredis.FakeRedis())
+
+    def test_login_right_after_reset_survives(self, student_user, redis):
+        import asyncio
+        from jose import jwt
+        from app.core import revocation
+        from app.core.config import settings
+        from tests.conftest import make_token
+
+        def payload():
+            return jwt.decode(make_token(student_user), settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+        async def scenario():
+            before = payload()
+            await asyncio.sleep(0.002)
+            await revocation.revoke_user_tokens(str(student_user.id))
+            await asyncio.sleep(0.002)
+            after = payload()        # very likely the same second as the cutoff
+            return await revocation.is_revoked(before), await revocation.is_revoked(after)
+
+        assert asyncio.run(scenario()) == (True, False)
@@ -0,0 +1,178 @@
+"""
+Auto-save: write-through without Redis, Redis buffer + write-behind flusher
+with it (fakeredis), and submit writing only the tail.
+"""
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import fakeredis
+import httpx
+import pytest
+
+from app.core.cache import cache
+from app.models.attempt import Response
+from app.services import autosave
+from tests.test_attempts import _PATCH_TARGET, _make_mock_task
+
+
+@pytest.fixture
+def attempt_id(client, student_headers, live_exam):
+    exam, *_ = live_exam
+    return client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)},
+                       headers=student_headers).json()["id"]
+
+
+@pytest.fixture
+def redis_buffer(monkeypatch):
+    monkeypatch.setattr(cache, "_client", fakeredis.aioredis.FakeRedis())
+
+
+def _save(client, headers, attempt_id, question_id, option_ids):
+    return client.post(f"/api/v1/attempts/{attempt_id}/auto-save", headers=headers, json={
+        "responses": [{"question_id": str(question_id), "selected_option_ids": [str(o) for o in option_ids]}],
+    })
+
+
+def _rows(db, attempt_id):
+    db.expire_all()
+    return db.query(Response).filter(Response.attempt_id == attempt_id).all()
+
+
+class TestWriteThrough:
+    def test_saves_upsert_without_redis(self, client, db, student_headers, live_exam, attempt_id):
+        exam, q, correct, wrong = live_exam
+        r = _save(client, student_headers, attempt_id, q.id, [wrong.id])
+        assert r.json()["buffered"] is False
+        _save(client, student_headers, attempt_id, q.id, [correct.id])
+
+        rows = _rows(db, attempt_id)
+        assert len(rows) == 1 and rows[0].selected_option_ids == [correct.id]
+
+    def test_rejected_after_submit(self, client, student_headers, live_exam, attempt_id):
+        exam, q, correct, wrong = live_exam
+        with patch(_PATCH_TARGET, _make_mock_task()):
+            client.post(f"/api/v1/attempts/{attempt_id}/submit", json={"responses": []}, headers=student_headers)
+        assert _save(client, student_headers, attempt_id, q.id, [correct.id]).status_code == 400
+
+
+class TestWriteBehind:
+    def test_buffered_then_flushed_once(self, client, db, student_headers, live_exam, attempt_id, redis_buffer):
+        exam, q, correct, wrong = live_exam
+        for option in (wrong, correct, wrong, correct):
+            assert _save(client, student_headers, attempt_id, q.id, [option.id]).json()["buffered"] is True
+        assert _rows(db, attempt_id) == []
+
+        saved = client.get(f"/api/v1/attempts/{attempt_id}/auto-save", headers=student_headers).json()
+        assert saved["responses"][0]["selected_option_ids"] == [str(correct.id)]
+
+        assert client.portal.call(autosave.flush_once) == 1       # four saves, one row
+        rows = _rows(db, attempt_id)
+        assert len(rows) == 1 and rows[0].selected_option_ids == [correct.id]
+        assert client.portal.call(autosave.flush_once) == 0
+
+    def test_concurrent_flushers_write_each_sheet_once(self, client, db, student_headers, live_exam,
+                                                      attempt_id, redis_buffer):
+        import asyncio
+
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [correct.id])
+        before = autosave._ROWS.value(by="flusher")
+
+        async def two_workers():
+            return await asyncio.gather(autosave.flush_once(), autosave.flush_once())
+
+        assert sorted(client.portal.call(two_workers)) == [0, 1]
+        assert autosave._ROWS.value(by="flusher") == before + 1
+        assert len(_rows(db, attempt_id)) == 1
+        assert client.portal.call(autosave.flush_once) == 0       # lease released, nothing left
+
+    def test_submit_merges_buffer_and_writes_tail(self, client, db, student_headers, live_exam,
+                                                 attempt_id, redis_buffer):
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [correct.id])
+        with patch(_PATCH_TARGET, _make_mock_task()):
+            r = client.post(f"/api/v1/attempts/{attempt_id}/submit", json={"responses": []},
+                            headers=student_headers)
+        assert r.json()["correct_count"] == 1                      # answer came from the buffer
+        assert len(_rows(db, attempt_id)) == 1
+        assert client.portal.call(autosave.flush_once) == 0        # buffer drained by submit
+
+    def test_failed_submit_keeps_buffer(self, client, db, student_headers, live_exam, attempt_id, redis_buffer):
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [correct.id])
+        with patch("app.services.autosave.write_tail", side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                client.post(f"/api/v1/attempts/{attempt_id}/submit", json={"responses": []},
+                            headers=student_headers)
+        assert client.portal.call(autosave.pending, attempt_id) == {
+            str(q.id): autosave.answer([correct.id], None, False),
+        }
+
+    def test_submit_between_flush_read_and_write(self, client, db, student_headers, live_exam,
+                                                 attempt_id, redis_buffer, monkeypatch):
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [correct.id])
+        opened, submitted = autosave.AsyncSessionLocal, []
+
+        @asynccontextmanager
+        async def submit_first():
+            # The flusher has read the buffer but not written it yet.
+            transport = httpx.ASGITransport(app=client.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                submitted.append(await ac.post(f"/api/v1/attempts/{attempt_id}/submit",
+                                               json={"responses": []}, headers=student_headers))
+            async with opened() as session:
+                yield session
+
+        monkeypatch.setattr(autosave, "AsyncSessionLocal", submit_first)
+        with patch(_PATCH_TARGET, _make_mock_task()):
+            assert client.portal.call(autosave.flush_once) == 0    # attempt already submitted
+        assert submitted[0].json()["correct_count"] == 1          # submit still saw the answer
+        rows = _rows(db, attempt_id)
+        assert len(rows) == 1 and rows[0].selected_option_ids == [correct.id]
+        assert client.portal.call(autosave.pending, attempt_id) == {}
+
+    def test_flush_keeps_answers_saved_meanwhile(self, client, db, student_headers, live_exam,
+                                                 attempt_id, redis_buffer, monkeypatch):
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [wrong.id])
+        opened = autosave.AsyncSessionLocal
+
+        @asynccontextmanager
+        async def save_during_flush():
+            async with opened() as session:
+                yield session
+            await autosave.save(attempt_id, {str(q.id): autosave.answer([correct.id])})
+
+        monkeypatch.setattr(autosave, "AsyncSessionLocal", save_during_flush)
+        assert client.portal.call(autosave.flush_once) == 1
+        assert _rows(db, attempt_id)[0].selected_option_ids == [wrong.id]
+        assert client.portal.call(autosave.pending, attempt_id) == {
+            str(q.id): autosave.answer([correct.id], None, False),
+        }
+
+    def test_flush_skips_submitted_attempts(self, client, db, student_headers, live_exam,
+                                            attempt_id, redis_buffer):
+        from app.models.attempt import AttemptStatus, ExamAttempt
+
+        exam, q, correct, wrong = live_exam
+        _save(client, student_headers, attempt_id, q.id, [wrong.id])
+        db.query(ExamAttempt).filter(ExamAttempt.id == attempt_id).update({"status": AttemptStatus.SUBMITTED})
+        db.commit()
+        assert client.portal.call(autosave.flush_once) == 0
+        assert _rows(db, attempt_id) == []
+
+
+class TestUpsert:
+    def test_one_row_per_question(self, client, db, student_headers, live_exam, attempt_id):
+        exam, q, correct, wrong = live_exam
+        body = {"responses": [
+            {"question_id": str(q.id), "selected_option_ids": [str(wrong.id)]},
+            {"question_id": str(q.id), "selected_option_ids": [str(correct.id)]},
+        ]}
+        client.post(f"/api/v1/attempts/{attempt_id}/auto-save", json=body, headers=student_headers)
+        with patch(_PATCH_TARGET, _make_mock_task()):
+            r = client.post(f"/api/v1/attempts/{attempt_id}/submit", json=body, headers=student_headers)
+        assert r.json()["correct_count"] == 1
+        rows = _rows(db, attempt_id)
+        assert len(rows) == 1 and rows[0].selected_option_ids == [correct.id]
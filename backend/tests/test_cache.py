@@ -0,0 +1,369 @@
+"""
+Cache layer tests — in-process L1 tier, cross-worker invalidation messages.
+Runs without Redis: the L1 tier works per-process on its own.
+"""
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.core.cache import RedisCache, key_exam_questions, key_family, key_leaderboard
+
+
+EXAM_ID = "3f2a9c1e-8b7d-4e6f-a5c4-1d2e3f4a5b6c"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestKeyFamily:
+    def test_ids_collapse_to_wildcard(self):
+        assert key_family(key_exam_questions(EXAM_ID)) == "exam:*:questions"
+        assert key_family("user:42") == "user:*"
+        assert key_family("ratelimit:login:unknown") == "ratelimit:login:unknown"
+        # IPs must not become their own family (metric cardinality)
+        assert key_family("ratelimit:login:10.0.0.12") == "ratelimit:login:*"
+
+
+class TestLocalTier:
+    def test_set_then_get_served_in_process(self):
+        c = RedisCache()
+        run(c.set(key_exam_questions(EXAM_ID), [{"id": 1}], ttl=60))
+        assert run(c.get(key_exam_questions(EXAM_ID))) == [{"id": 1}]
+        assert c.stats()["l1"]["exam:*:questions"]["hits"] == 1
+
+    def test_unlisted_family_skips_l1(self):
+        c = RedisCache()
+        run(c.set("attempt:abc:health", {"ok": True}, ttl=60))
+        assert run(c.get("attempt:abc:health")) is None
+
+    def test_stored_value_is_a_copy(self):
+        c = RedisCache()
+        value = {"rows": [1, 2]}
+        run(c.set(key_leaderboard(EXAM_ID, 10), value, ttl=60))
+        value["rows"].append(3)
+        assert run(c.get(key_leaderboard(EXAM_ID, 10))) == {"rows": [1, 2]}
+
+    def test_delete_and_pattern_drop_entries(self):
+        c = RedisCache()
+        run(c.set(key_exam_questions(EXAM_ID), [1], ttl=60))
+        run(c.set(key_leaderboard(EXAM_ID, 10), [2], ttl=60))
+        run(c.delete(key_exam_questions(EXAM_ID)))
+        assert run(c.get(key_exam_questions(EXAM_ID))) is None
+        run(c.delete_pattern(f"exam:{EXAM_ID}:*"))
+        assert run(c.get(key_leaderboard(EXAM_ID, 10))) is None
+
+    def test_family_byte_budget_evicts_lru(self, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setitem(settings.CACHE_L1_FAMILIES, "exam:*:questions", 100)
+        c = RedisCache()
+        keys = [key_exam_questions(f"{i:032x}") for i in range(3)]
+        for k in keys:
+            run(c.set(k, "x" * 40, ttl=60))
+        stats = c.stats()["l1"]["exam:*:questions"]
+        assert stats["bytes"] <= 100 and stats["evictions"] == 1
+        assert run(c.get(keys[0])) is None
+        assert run(c.get(keys[2])) == "x" * 40
+
+
+class TestInvalidationMessages:
+    def test_peer_invalidation_drops_key(self):
+        c = RedisCache()
+        key = key_exam_questions(EXAM_ID)
+        run(c.set(key, [1], ttl=60))
+        received = c.stats()["invalidations"]["received"]
+        c._apply_invalidation(json.dumps({"o": "other-worker", "k": [key], "p": None}))
+        assert run(c.get(key)) is None
+        assert c.stats()["invalidations"]["received"] == received + 1
+
+    def test_own_messages_are_ignored(self):
+        c = RedisCache()
+        key = key_exam_questions(EXAM_ID)
+        run(c.set(key, [1], ttl=60))
+        c._apply_invalidation(json.dumps({"o": c._origin, "k": [key], "p": None}))
+        assert run(c.get(key)) == [1]
+
+    def test_writer_without_l1_still_broadcasts(self):
+        """A process that never read the family (Celery, a fresh worker) must still evict peers."""
+        from app.core.cache import tag_exam
+
+        sent = []
+
+        class FakePipeline:
+            def __init__(self):
+                self.results = []
+
+            def incr(self, key):
+                self.results.append(1)
+
+            def expire(self, key, ttl):
+                self.results.append(True)
+
+            def unlink(self, *keys):
+                self.results.append(len(keys))
+
+            def publish(self, channel, message):
+                sent.append(message)
+                self.results.append(1)
+
+            async def execute(self):
+                return self.results
+
+        class FakeRedis:
+            def pipeline(self, transaction=False):
+                return FakePipeline()
+
+            async def sscan(self, tag_key, cursor, count=None):
+                return 0, [key_exam_questions(EXAM_ID).encode()]
+
+            async def unlink(self, *keys):
+                return len(keys)
+
+        peer = RedisCache()
+        run(peer.set(key_exam_questions(EXAM_ID), [1], ttl=60))
+        writer = RedisCache()
+        writer._client = FakeRedis()
+        assert writer._l1 == {}
+        assert run(writer.invalidate_tag(tag_exam(EXAM_ID))) == 1
+        assert len(sent) == 1
+        peer._apply_invalidation(sent[0])
+        assert run(peer.get(key_exam_questions(EXAM_ID))) is None
+
+    def test_peer_pattern_invalidation(self):
+        c = RedisCache()
+        run(c.set(key_leaderboard(EXAM_ID, 10), [1], ttl=60))
+        c._apply_invalidation(json.dumps({"o": "other-worker", "k": [], "p": f"exam:{EXAM_ID}:*"}))
+        assert run(c.get(key_leaderboard(EXAM_ID, 10))) is None
+
+
+class TestTags:
+    def test_invalidate_tag_drops_tagged_keys_only(self):
+        from app.core.cache import key_exam_meta, tag_exam
+
+        c = RedisCache()
+        other = "0" * 32
+        run(c.set(key_exam_questions(EXAM_ID), [1], ttl=60, tags=[tag_exam(EXAM_ID)]))
+        run(c.set(key_exam_meta(EXAM_ID), {"m": 1}, ttl=60, tags=[tag_exam(EXAM_ID)]))
+        run(c.set(key_exam_questions(other), [2], ttl=60, tags=[tag_exam(other)]))
+        assert run(c.invalidate_tag(tag_exam(EXAM_ID))) == 2
+        assert run(c.get(key_exam_questions(EXAM_ID))) is None
+        assert run(c.get(key_exam_meta(EXAM_ID))) is None
+        assert run(c.get(key_exam_questions(other))) == [2]
+
+
+class TestGetOrCompute:
+    def test_concurrent_misses_run_loader_once(self):
+        c = RedisCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"n": len(calls)}
+
+        async def storm():
+            return await asyncio.gather(*[
+                c.get_or_compute(key_exam_questions(EXAM_ID), loader, ttl=60) for _ in range(20)
+            ])
+
+        coalesced = c.stats()["compute"]["coalesced"]
+        results = run(storm())
+        assert len(calls) == 1
+        assert all(r == {"n": 1} for r in results)
+        assert c.stats()["compute"]["coalesced"] == coalesced + 19
+        # plain readers see the value, not the envelope
+        assert run(c.get(key_exam_questions(EXAM_ID))) == {"n": 1}
+
+    def test_sync_loader_and_errors_propagate_uncached(self):
+        c = RedisCache()
+
+        def boom():
+            raise ValueError("db down")
+
+        with pytest.raises(ValueError):
+            run(c.get_or_compute(key_leaderboard(EXAM_ID, 10), boom, ttl=60))
+        assert run(c.get_or_compute(key_leaderboard(EXAM_ID, 10), lambda: [1, 2], ttl=60)) == [1, 2]
+
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        c = RedisCache()
+        key = key_leaderboard(EXAM_ID, 10)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def scenario():
+            leader = asyncio.create_task(c.get_or_compute(key, loader, ttl=60))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(c.get_or_compute(key, loader, ttl=60))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        # The waiter computes for itself instead of inheriting the cancellation.
+        assert run(scenario()) == 2
+
+    def test_early_refresh_near_expiry(self):
+        from app.core.cache import _ENVELOPE
+        import time
+
+        c = RedisCache()
+        key = key_exam_questions(EXAM_ID)
+        # Expires in 1 s but took 10 s to compute. The draw is pinned: with
+        # random() = 0.5, 10 * -ln(0.5) ≈ 6.9 s is past the 1 s left, so it refreshes.
+        envelope = {_ENVELOPE: 1, "v": "old", "delta": 10.0, "exp": time.time() + 1}
+        run(c.set(key, envelope, ttl=60))
+        refreshes = c.stats()["compute"]["early_refreshes"]
+        with patch("app.core.cache.random.random", return_value=0.5):
+            assert run(c.get_or_compute(key, lambda: "new", ttl=60)) == "new"
+            assert c.stats()["compute"]["early_refreshes"] == refreshes + 1
+            # ...and a fresh, cheap entry is served as-is.
+            assert run(c.get_or_compute(key, lambda: "newer", ttl=60)) == "new"
+
+
+class TestCodec:
+    def test_roundtrip_and_compression_threshold(self):
+        from app.core import codec
+
+        small = {"id": 1, "text": "short"}
+        raw = codec.encode(small)
+        assert raw[0] == codec.FORMAT_VERSION and raw[2] == 0
+        assert codec.decode(raw) == small
+
+        big = [{"question_text": "A block slides down an incline " * 20, "marks": 4}] * 50
+        raw = codec.encode(big)
+        assert raw[2] != 0 and len(raw) < len(json.dumps(big))
+        assert codec.decode(raw) == big
+
+    def test_decodes_legacy_json_entries(self):
+        from app.core import codec
+
+        assert codec.decode(json.dumps({"a": [1, 2]}).encode()) == {"a": [1, 2]}
+        assert codec.decode(b"1") == 1
+
+    def test_uuid_and_datetime_fall_back_to_strings(self):
+        import uuid
+        from app.core import codec
+
+        u = uuid.uuid4()
+        assert codec.decode(codec.encode({"id": u})) == {"id": str(u)}
+
+
+class TestMetrics:
+    def test_operations_recorded_per_family_and_tier(self):
+        from app.core import metrics
+        from app.core.cache import _REQUESTS
+
+        c = RedisCache()
+        key = key_exam_questions(EXAM_ID)
+        labels = dict(family="exam:*:questions", op="get")
+        l1_hits = _REQUESTS.value(tier="l1", result="hit", **labels)
+        misses = _REQUESTS.value(tier="none", result="miss", **labels)
+        run(c.get(key))
+        run(c.set(key, [1], ttl=60))
+        run(c.get(key))
+        assert _REQUESTS.value(tier="none", result="miss", **labels) == misses + 1
+        assert _REQUESTS.value(tier="l1", result="hit", **labels) == l1_hits + 1
+
+        text = metrics.render()
+        assert "# TYPE quizzie_cache_requests_total counter" in text
+        assert 'quizzie_cache_op_seconds_bucket{family="exam:*:questions",op="get",tier="l1",le="+Inf"}' in text
+        assert "# TYPE quizzie_cache_l1_bytes gauge" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        from app.core import metrics
+
+        h = metrics.Histogram("t_seconds", "test", ["op"], buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 5.0):
+            h.observe(v, op="x")
+        lines = h.render().splitlines()
+        assert 't_seconds_bucket{op="x",le="0.1"} 1' in lines
+        assert 't_seconds_bucket{op="x",le="1"} 2' in lines
+        assert 't_seconds_bucket{op="x",le="+Inf"} 3' in lines
+        assert 't_seconds_count{op="x"} 3' in lines
+
+
+class TestMetricsEndpoint:
+    def test_admin_can_scrape(self, client, db):
+        from app.core.security import get_password_hash
+        from app.models.user import User, UserRole
+        from tests.conftest import make_token
+
+        admin = User(email="admin@test.com", password_hash=get_password_hash("password123"),
+                     full_name="Admin", role=UserRole.ADMIN, is_verified=True)
+        db.add(admin)
+        db.commit()
+        r = client.get("/api/v1/admin/metrics", headers={"Authorization": f"Bearer {make_token(admin)}"})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "quizzie_cache_requests_total" in r.text
+
+    def test_students_are_forbidden(self, client, student_headers):
+        assert client.get("/api/v1/admin/metrics", headers=student_headers).status_code == 403
+        assert client.get("/api/v1/admin/metrics").status_code == 401
+
+    def test_static_scrape_token(self, client, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+        r = client.get("/api/v1/admin/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        assert r.status_code == 200
+        r = client.get("/api/v1/admin/metrics", headers={"Authorization": "Bearer wrong"})
+        assert r.status_code == 401
+
+
+    def test_stats_are_private(self, client, student_headers, monkeypatch):
+        from app.core.config import settings
+
+        health = client.get("/health").json()
+        assert set(health) == {"status", "cache"}
+        assert client.get("/api/v1/admin/stats", headers=student_headers).status_code == 403
+
+        monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+        r = client.get("/api/v1/admin/stats", headers={"Authorization": "Bearer scrape-secret"})
+        assert r.status_code == 200 and {"db_pools", "autosave", "hashing"} <= set(r.json())
+
+class TestBatch:
+    def test_get_many_partial_hits_load_only_missing(self):
+        c = RedisCache()
+        ids = [f"{i:032x}" for i in range(4)]
+        keys = [key_exam_questions(i) for i in ids]
+        run(c.set_many({keys[0]: [0], keys[1]: [1]}, ttl=60))
+        assert run(c.get_many(keys)) == {keys[0]: [0], keys[1]: [1]}
+
+        requested = []
+
+        def loader(missing):
+            requested.append(list(missing))
+            return {keys[2]: [2], keys[3]: None}
+
+        found = run(c.get_many(keys + [keys[0]], loader=loader, ttl=60))
+        assert requested == [[keys[2], keys[3]]]
+        assert found == {keys[0]: [0], keys[1]: [1], keys[2]: [2]}
+        # the loaded value is cached; the None one is not
+        assert run(c.get(keys[2])) == [2]
+        assert run(c.get(keys[3])) is None
+
+    def test_get_many_unwraps_get_or_compute_envelopes(self):
+        c = RedisCache()
+        key = key_leaderboard(EXAM_ID, 10)
+        run(c.get_or_compute(key, lambda: [{"rank": 1}], ttl=60))
+        assert run(c.get_many([key])) == {key: [{"rank": 1}]}
+
+    def test_delete_many_and_tags(self):
+        from app.core.cache import tag_exam
+
+        c = RedisCache()
+        keys = [key_exam_questions(f"{i:032x}") for i in range(3)]
+        run(c.set_many({k: i for i, k in enumerate(keys)}, ttl=60, tags=[tag_exam(EXAM_ID)]))
+        run(c.delete_many(keys[:1]))
+        assert run(c.get_many(keys)) == {keys[1]: 1, keys[2]: 2}
+        run(c.invalidate_tag(tag_exam(EXAM_ID)))
+        assert run(c.get_many(keys)) == {}
@@ -0,0 +1,80 @@
+"""
+Connection-pool sizing per process role and pool instrumentation.
+"""
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core import db_pool, metrics
+from app.core.config import settings
+from tests.conftest import TEST_DB_URL
+
+
+@pytest.fixture
+def small_pool():
+    eng = create_engine(TEST_DB_URL, poolclass=db_pool.TimedQueuePool,
+                        pool_size=1, max_overflow=0, pool_timeout=0.2)
+    db_pool.instrument(eng, "test_small")
+    yield eng
+    eng.dispose()
+    db_pool._pools.pop("test_small", None)
+
+
+class TestPoolOptions:
+    def test_role_defaults(self):
+        assert db_pool.pool_options("evaluation") == {
+            "pool_size": settings.DB_POOLS["evaluation"]["size"],
+            "max_overflow": settings.DB_POOLS["evaluation"]["overflow"],
+            "pool_timeout": settings.DB_POOLS["evaluation"]["timeout"],
+        }
+
+    def test_unknown_role_uses_web(self):
+        assert db_pool.pool_options("nonsense") == db_pool.pool_options("web")
+
+    def test_overrides_win(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+        monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0)
+        opts = db_pool.pool_options("web")
+        assert opts["pool_size"] == 3
+        assert opts["pool_timeout"] == 0
+        assert opts["max_overflow"] == settings.DB_POOLS["web"]["overflow"]
+
+    def test_async_engine_has_its_own_share(self, monkeypatch):
+        shape = settings.DB_POOLS["web"]
+        opts = db_pool.pool_options("web", is_async=True)
+        assert (opts["pool_size"], opts["max_overflow"]) == (shape["async_size"], shape["async_overflow"])
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)       # sync override leaves async alone
+        assert db_pool.pool_options("web", is_async=True)["pool_size"] == shape["async_size"]
+
+
+class TestPoolMetrics:
+    def test_checkout_and_lifetime_recorded(self, small_pool):
+        before = db_pool._CHECKOUT.snapshot(pool="test_small")["count"]
+        with small_pool.connect():
+            assert db_pool.stats()["test_small"]["checked_out"] == 1
+        small_pool.dispose()
+        assert db_pool._CHECKOUT.snapshot(pool="test_small")["count"] == before + 1
+        assert db_pool._LIFETIME.snapshot(pool="test_small")["count"] >= 1
+
+    def test_exhaustion_counted_and_logged(self, small_pool, caplog):
+        before = db_pool._TIMEOUTS.value(pool="test_small")
+        with small_pool.connect():
+            with pytest.raises(exc.TimeoutError):
+                small_pool.connect()
+        assert db_pool._TIMEOUTS.value(pool="test_small") == before + 1
+        assert "no connection after" in caplog.text
+
+    def test_slow_checkout_logged(self, small_pool, caplog, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_SLOW_CHECKOUT_MS", 0)
+        with small_pool.connect():
+            pass
+        assert "checkout waited" in caplog.text
+
+    def test_dispose_keeps_label(self, small_pool):
+        small_pool.dispose()
+        assert small_pool.pool.metrics_name == "test_small"
+        assert db_pool._pools["test_small"] is small_pool.pool
+
+    def test_gauges_exported(self, small_pool):
+        text = metrics.render()
+        assert 'quizzie_db_pool_size{pool="test_small"} 1' in text
+        assert 'quizzie_db_pool_checked_out{pool="primary"}' in text
@@ -2,7 +2,9 @@
 Unit tests for EvaluationService — core scoring logic.
 Uses only the DB session, no HTTP layer.
 """
+import fakeredis
 import pytest
+from app.core.cache import cache
 from app.services.evaluation_service import EvaluationService
 from app.models.attempt import ExamAttempt, Response, AttemptStatus
 from app.models.question import Question, Option, QuestionType
@@ -104,3 +106,156 @@ class TestEvaluationService:
         EvaluationService(db).evaluate_attempt(attempt.id)
         db.refresh(attempt)
         assert attempt.status == AttemptStatus.EVALUATED
+
+
+@pytest.fixture
+def shared_redis(monkeypatch):
+    """One fake Redis behind both the sync (evaluator) and async (API) clients."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache, "_sync_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(cache, "_client", fakeredis.aioredis.FakeRedis(server=server))
+
+
+def _submitted(db, exam, student, answers):
+    attempt = ExamAttempt(exam_id=exam.id, student_id=student.id, status=AttemptStatus.SUBMITTED)
+    db.add(attempt)
+    db.commit()
+    db.add_all([Response(attempt_id=attempt.id, question_id=q, selected_option_ids=[o]) for q, o in answers])
+    db.commit()
+    return attempt.id
+
+
+class TestCompiledAnswerKey:
+    def test_warm_key_costs_one_select_and_one_update(self, db, live_exam, student_user,
+                                                      shared_redis, count_queries):
+        exam, q, correct, wrong = live_exam
+        EvaluationService(db).evaluate_attempt(_submitted(db, exam, student_user, [(q.id, correct.id)]))
+
+        attempt_id = _submitted(db, exam, student_user, [(q.id, wrong.id)])
+        with count_queries() as stats:
+            result = EvaluationService(db).evaluate_attempt(attempt_id)
+        assert result["correct_count"] == 0
+        assert stats.count == 2
+
+        db.expire_all()
+        response = db.query(Response).filter(Response.attempt_id == attempt_id).one()
+        assert response.is_correct is False and response.marks_awarded == 0
+        assert db.get(ExamAttempt, attempt_id).status == AttemptStatus.EVALUATED
+
+    def test_question_edit_recompiles(self, client, db, live_exam, student_user, examiner_headers,
+                                      shared_redis):
+        exam, q, correct, wrong = live_exam
+        EvaluationService(db).evaluate_attempt(_submitted(db, exam, student_user, [(q.id, correct.id)]))
+
+        r = client.post(f"/api/v1/exams/{exam.id}/questions", headers=examiner_headers, json={
+            "question_text": "3 + 3?", "question_type": "single", "marks": 5, "display_order": 2,
+            "options": [{"option_text": "6", "is_correct": True, "display_order": 1},
+                        {"option_text": "7", "is_correct": False, "display_order": 2}],
+        })
+        added = next(o for o in r.json()["options"] if o["is_correct"])
+
+        attempt_id = _submitted(db, exam, student_user, [(q.id, correct.id), (added["question_id"], added["id"])])
+        result = EvaluationService(db).evaluate_attempt(attempt_id)
+        assert result["total_marks"] == 15 and result["correct_count"] == 2
+
+    def test_key_built_across_an_edit_is_not_stored(self, db, live_exam, shared_redis, monkeypatch):
+        import asyncio
+
+        from app.core.cache import key_answer_key, key_answer_key_version, tag_exam
+        from app.services import exam_cache
+
+        exam, *_ = live_exam
+        eid, real = str(exam.id), exam_cache.load_answer_key
+
+        def edited_meanwhile(session, exam_id):
+            answer_key = real(session, exam_id)        # read before the edit commits...
+            asyncio.run(cache.invalidate_tag(tag_exam(eid)))   # ...invalidated after
+            return answer_key
+
+        monkeypatch.setattr(exam_cache, "load_answer_key", edited_meanwhile)
+        exam_cache.compiled_answer_key(db, exam.id)
+        assert cache.get_sync(key_answer_key(eid)) is None
+        assert cache.get_sync(key_answer_key_version(eid)) is None
+
+        monkeypatch.setattr(exam_cache, "load_answer_key", real)
+        exam_cache.compiled_answer_key(db, exam.id)
+        assert cache.get_sync(key_answer_key(eid)) is not None
+
+
+class TestBatchEvaluation:
+    def test_drains_submitted_attempts_in_chunks(self, db, live_exam, student_user, count_queries):
+        exam, q, correct, wrong = live_exam
+        right = [_submitted(db, exam, student_user, [(q.id, correct.id)]) for _ in range(3)]
+        wrong_ids = [_submitted(db, exam, student_user, [(q.id, wrong.id)]) for _ in range(2)]
+        open_attempt = ExamAttempt(exam_id=exam.id, student_id=student_user.id, status=AttemptStatus.IN_PROGRESS)
+        db.add(open_attempt)
+        db.commit()
+
+        svc, exam_id = EvaluationService(db), exam.id
+        with count_queries() as stats:
+            assert svc.evaluate_pending(exam_id, 3) == 3
+        assert stats.count == 4          # claim, responses, answer key (no Redis here), one UPDATE
+        assert svc.evaluate_pending(exam_id, 3) == 2
+        assert svc.evaluate_pending(exam_id, 3) == 0
+
+        db.expire_all()
+        scores = {a.id: (a.status, float(a.score or 0)) for a in db.query(ExamAttempt).all()}
+        assert all(scores[a] == (AttemptStatus.EVALUATED, 100.0) for a in right)
+        assert all(scores[a] == (AttemptStatus.EVALUATED, 0.0) for a in wrong_ids)
+        assert scores[open_attempt.id][0] == AttemptStatus.IN_PROGRESS
+
+    def test_task_drains_exam(self, db, live_exam, student_user):
+        from app.worker.tasks.evaluation_tasks import evaluate_exam_batch_task
+
+        exam, q, correct, wrong = live_exam
+        for _ in range(3):
+            _submitted(db, exam, student_user, [(q.id, correct.id)])
+        assert evaluate_exam_batch_task.run(str(exam.id)) == {
+            "exam_id": str(exam.id), "evaluated": 3, "requeued": False,
+        }
+
+
+class TestDeadlineBurst:
+    def _expired(self, db, exam, student, n):
+        from datetime import datetime, timedelta
+
+        attempts = [ExamAttempt(exam_id=exam.id, student_id=student.id, status=AttemptStatus.IN_PROGRESS,
+                                started_at=datetime.utcnow() - timedelta(minutes=exam.duration_minutes))
+                    for _ in range(n)]
+        db.add_all(attempts)
+        db.commit()
+        return [a.id for a in attempts]
+
+    def test_burst_queues_one_batch(self, client, db, live_exam, student_user, student_headers, shared_redis):
+        from unittest.mock import patch
+
+        exam, q, correct, wrong = live_exam
+        ids = self._expired(db, exam, student_user, 5)
+        with patch("app.services.evaluation_dispatch.evaluate_exam_batch_task") as batch, \
+             patch("app.api.v1.attempts.evaluate_attempt_task") as per_attempt:
+            for attempt_id in ids:
+                r = client.post(f"/api/v1/attempts/{attempt_id}/submit", headers=student_headers, json={
+                    "responses": [{"question_id": str(q.id), "selected_option_ids": [str(correct.id)]}],
+                })
+                assert r.json()["status"] == "evaluating"
+        batch.apply_async.assert_called_once()
+        assert batch.apply_async.call_args.kwargs["args"] == [str(exam.id)]
+        per_attempt.apply_async.assert_not_called()
+
+        db.expire_all()
+        assert {a.status for a in db.query(ExamAttempt).all()} == {AttemptStatus.SUBMITTED}
+        assert EvaluationService(db).evaluate_pending(exam.id, 10) == 5     # what the batch task does
+
+    def test_mid_exam_submit_stays_per_attempt(self, client, live_exam, student_headers, shared_redis):
+        from unittest.mock import patch
+
+        exam, *_ = live_exam
+        attempt_id = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)},
+                                 headers=student_headers).json()["id"]
+        with patch("app.services.evaluation_dispatch.evaluate_exam_batch_task") as batch, \
+             patch("app.api.v1.attempts.evaluate_attempt_task") as per_attempt:
+            per_attempt.apply_async.return_value.id = "task-1"
+            r = client.post(f"/api/v1/attempts/{attempt_id}/submit", headers=student_headers,
+                            json={"responses": []})
+        assert r.json()["task_id"] == "task-1"
+        batch.apply_async.assert_not_called()
@@ -1,6 +1,9 @@
 """
 Exam endpoint tests — CRUD, status transitions, questions with cache.
 """
+import json
+from unittest.mock import patch
+
 import pytest
 
 
@@ -96,3 +99,323 @@ class TestExamCRUD:
         assert len(questions) == 1
         assert questions[0]["question_text"] == "What is 2 + 2?"
         assert len(questions[0]["options"]) == 2
+
+    def test_questions_etag_and_304(self, client, student_headers, live_exam):
+        exam, *_ = live_exam
+        url = f"/api/v1/exams/{exam.id}/questions"
+        r1 = client.get(url, headers={**student_headers, "Accept-Encoding": "gzip"})
+        assert r1.status_code == 200
+        assert r1.headers["content-encoding"] == "gzip"
+        etag = r1.headers["etag"]
+
+        r2 = client.get(url, headers={**student_headers, "If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.content == b""
+        assert r2.headers["etag"] == etag
+
+        r3 = client.get(url, headers={**student_headers, "If-None-Match": '"stale"',
+                                      "Accept-Encoding": "identity"})
+        assert r3.status_code == 200
+        assert "content-encoding" not in r3.headers
+        assert r3.json() == r1.json()
+
+    def test_update_exam_invalidates_cached_questions(self, client, db, student_headers,
+                                                      examiner_headers, live_exam):
+        exam, q, correct, wrong = live_exam
+        client.get(f"/api/v1/exams/{exam.id}/questions", headers=student_headers)
+        q.question_text = "What is 3 + 3?"
+        db.commit()
+        r = client.put(f"/api/v1/exams/{exam.id}", json={"title": "Renamed"},
+                       headers=examiner_headers)
+        assert r.status_code == 200
+        r = client.get(f"/api/v1/exams/{exam.id}/questions", headers=student_headers)
+        assert r.json()[0]["question_text"] == "What is 3 + 3?"
+
+    def test_student_view_hides_answers(self, client, student_headers, live_exam):
+        exam, *_ = live_exam
+        question = client.get(f"/api/v1/exams/{exam.id}/questions", headers=student_headers).json()[0]
+        assert "reference_answer" not in question
+        assert all("is_correct" not in o for o in question["options"])
+
+    def test_examiner_view_has_answers(self, client, examiner_headers, live_exam, count_queries):
+        exam, q, correct, wrong = live_exam
+        client.get(f"/api/v1/exams/{exam.id}/questions", headers=examiner_headers)     # warm meta
+        with count_queries() as stats:
+            r = client.get(f"/api/v1/exams/{exam.id}/questions", headers=examiner_headers)
+        assert r.status_code == 200
+        options = {o["id"]: o["is_correct"] for o in r.json()[0]["options"]}
+        assert options == {str(correct.id): True, str(wrong.id): False}
+        assert stats.repeated() == []
+
+    def test_other_examiner_forbidden(self, client, db, live_exam):
+        from app.models.user import User, UserRole
+        from tests.conftest import make_token
+        exam, *_ = live_exam
+        other = User(email="other-examiner@test.com", password_hash="x", full_name="Other",
+                     role=UserRole.EXAMINER, is_verified=True)
+        db.add(other)
+        db.commit()
+        r = client.get(f"/api/v1/exams/{exam.id}/questions",
+                       headers={"Authorization": f"Bearer {make_token(other)}"})
+        assert r.status_code == 403
+
+    def test_adding_and_deleting_questions_invalidates_student_view(self, client, student_headers,
+                                                                   examiner_headers, live_exam):
+        exam, *_ = live_exam
+        url = f"/api/v1/exams/{exam.id}/questions"
+        assert len(client.get(url, headers=student_headers).json()) == 1
+
+        r = client.post(url, json={"question_text": "Capital of France?", "display_order": 2, "options": [
+            {"option_text": "Paris", "is_correct": True}, {"option_text": "Rome", "is_correct": False}]},
+            headers=examiner_headers)
+        assert r.status_code == 201
+        assert len(client.get(url, headers=student_headers).json()) == 2
+
+        assert client.delete(f"{url}/{r.json()['id']}", headers=examiner_headers).status_code == 204
+        assert len(client.get(url, headers=student_headers).json()) == 1
+
+
+class TestSectionedDelivery:
+    @pytest.fixture(autouse=True)
+    def small_sections(self, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "QUESTION_SECTION_SIZE", 4)
+
+    def test_manifest_and_sections_rebuild_the_paper(self, client, student_headers, ten_question_exam):
+        exam = ten_question_exam
+        base = f"/api/v1/exams/{exam.id}/questions"
+        manifest = client.get(f"{base}/manifest", headers=student_headers).json()
+        assert manifest["total_questions"] == 10
+        assert [s["count"] for s in manifest["sections"]] == [4, 4, 2]
+        assert "question_text" not in manifest["questions"][0]
+
+        bodies = []
+        for section in manifest["sections"]:
+            r = client.get(f"{base}/sections/{section['index']}", headers=student_headers)
+            assert r.headers["etag"] == f'"{section["etag"]}"'
+            bodies += r.json()
+        assert bodies == client.get(base, headers=student_headers).json()
+        assert [q["id"] for q in bodies] == [q["id"] for q in manifest["questions"]]
+
+    def test_section_304_and_out_of_range(self, client, student_headers, ten_question_exam):
+        base = f"/api/v1/exams/{ten_question_exam.id}/questions"
+        first = client.get(f"{base}/sections/0", headers=student_headers)
+        r = client.get(f"{base}/sections/0", headers={**student_headers, "If-None-Match": first.headers["etag"]})
+        assert r.status_code == 304
+        assert client.get(f"{base}/sections/3", headers=student_headers).status_code == 404
+
+    def test_shuffled_sections_follow_attempt_order(self, client, student_headers, ten_question_exam):
+        exam = ten_question_exam
+        attempt_id = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)},
+                                 headers=student_headers).json()["id"]
+        base, params = f"/api/v1/exams/{exam.id}/questions", {"attempt_id": attempt_id}
+        paper = client.get(base, params=params, headers=student_headers).json()
+        manifest = client.get(f"{base}/manifest", params=params, headers=student_headers).json()
+        assert [q["id"] for q in manifest["questions"]] == [q["id"] for q in paper]
+        assert client.get(f"{base}/sections/1", params=params, headers=student_headers).json() == paper[4:8]
+
+    def test_per_student_variants_skip_the_shared_memo(self, client, student_headers, ten_question_exam):
+        from app.core import http_cache
+
+        exam = ten_question_exam
+        attempt_id = client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)},
+                                 headers=student_headers).json()["id"]
+        base, params = f"/api/v1/exams/{exam.id}/questions", {"attempt_id": attempt_id}
+        client.get(base, headers=student_headers)
+        memoised = len(http_cache._encoded)
+        for path in ("", "/manifest", "/sections/0"):
+            assert client.get(base + path, params=params, headers=student_headers).status_code == 200
+        assert len(http_cache._encoded) == memoised
+
+
+class TestExamListing:
+    @pytest.fixture
+    def many_exams(self, db, examiner_user):
+        from datetime import datetime, timedelta
+        from app.models.exam import Exam, ExamStatus
+        base = datetime.utcnow()
+        exams = [Exam(title=f"Exam {i}", description="long " * 50, duration_minutes=60, total_marks=10,
+                      pass_percentage=40, status=ExamStatus.DRAFT, created_by=examiner_user.id,
+                      created_at=base - timedelta(minutes=i // 2))      # pairs share a timestamp
+                 for i in range(7)]
+        db.add_all(exams)
+        db.commit()
+        return exams
+
+    def test_keyset_pages_cover_everything_once(self, client, examiner_headers, many_exams):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            r = client.get("/api/v1/exams/", params=params, headers=examiner_headers)
+            assert r.status_code == 200
+            seen += [e["id"] for e in r.json()]
+            pages += 1
+            cursor = r.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        assert pages == 3
+        assert sorted(seen) == sorted(str(e.id) for e in many_exams)
+        assert len(set(seen)) == len(seen)
+
+    def test_compact_view_skips_description(self, client, examiner_headers, many_exams):
+        r = client.get("/api/v1/exams/", params={"view": "compact", "limit": 2}, headers=examiner_headers)
+        assert r.status_code == 200
+        assert len(r.json()) == 2
+        assert "description" not in r.json()[0]
+        assert r.json()[0]["status"] == "draft"
+        assert r.headers["x-next-cursor"]
+        # The full view still goes through ExamSchema, and the spec names both shapes.
+        assert "description" in client.get("/api/v1/exams/", headers=examiner_headers).json()[0]
+        schema = client.get("/openapi.json").json()["paths"]["/api/v1/exams/"]["get"]["responses"]["200"]
+        refs = json.dumps(schema["content"]["application/json"]["schema"])
+        assert "ExamSummary" in refs and "Exam\"" in refs
+
+    def test_unpaginated_without_limit_or_cursor(self, client, examiner_headers, many_exams):
+        r = client.get("/api/v1/exams/", headers=examiner_headers)
+        assert len(r.json()) == len(many_exams)
+        assert "x-next-cursor" not in r.headers
+
+    def test_invalid_cursor(self, client, examiner_headers):
+        r = client.get("/api/v1/exams/", params={"cursor": "not-a-cursor"}, headers=examiner_headers)
+        assert r.status_code == 400
+
+
+class TestQuestionImport:
+    @pytest.fixture
+    def draft_exam(self, db, examiner_user):
+        from app.models.exam import Exam, ExamStatus
+        exam = Exam(title="Import target", description="", duration_minutes=60, total_marks=10,
+                    pass_percentage=40, status=ExamStatus.DRAFT, created_by=examiner_user.id)
+        db.add(exam)
+        db.commit()
+        return exam
+
+    def _questions(self, db, exam):
+        from app.models.question import Question
+        db.expire_all()
+        return db.query(Question).filter(Question.exam_id == exam.id).order_by(Question.display_order).all()
+
+    def test_jsonl_import(self, client, db, examiner_headers, draft_exam):
+        import json
+        rows = [
+            {"question_text": "2 + 2?", "options": [{"option_text": "4", "is_correct": True},
+                                                    {"option_text": "5", "is_correct": False}]},
+            {"question_text": "Primes?", "question_type": "multiple", "marks": 2,
+             "options": [{"option_text": "2", "is_correct": True}, {"option_text": "4", "is_correct": False},
+                         {"option_text": "5", "is_correct": True}]},
+            {"question_text": "Explain entropy.", "question_type": "subjective", "reference_answer": "Disorder"},
+        ]
+        body = "\n".join(json.dumps(r) for r in rows) + "\n"
+        r = client.post(f"/api/v1/exams/{draft_exam.id}/questions/import", content=body,
+                        headers={**examiner_headers, "Content-Type": "application/x-ndjson"})
+        assert r.status_code == 201, r.text
+        assert r.json() == {"imported": 3}
+
+        questions = self._questions(db, draft_exam)
+        assert [q.question_text for q in questions] == ["2 + 2?", "Primes?", "Explain entropy."]
+        assert sorted(o.is_correct for o in questions[1].options) == [False, True, True]
+        assert questions[2].options == [] and questions[2].reference_answer == "Disorder"
+
+    def test_csv_import(self, client, db, examiner_headers, draft_exam):
+        body = (
+            "question_text,question_type,marks,topic,option_1,option_2,option_3,correct\n"
+            "Unit of force?,single,4,Mechanics,Newton,Joule,Watt,1\n"
+            "Vectors?,multiple,4,Mechanics,Velocity,Mass,Force,1;3\n"
+        )
+        r = client.post(f"/api/v1/exams/{draft_exam.id}/questions/import?format=csv", content=body,
+                        headers=examiner_headers)
+        assert r.status_code == 201, r.text
+        questions = self._questions(db, draft_exam)
+        assert len(questions) == 2
+        correct = sorted(o.option_text for o in questions[1].options if o.is_correct)
+        assert correct == ["Force", "Velocity"]
+        assert questions[0].marks == 4 and questions[0].topic == "Mechanics"
+
+    def test_invalid_rows_reported_and_nothing_imported(self, client, db, examiner_headers, draft_exam):
+        body = (
+            "question_text,question_type,option_1,option_2,correct\n"
+            "Fine,single,A,B,1\n"
+            "No answer,single,A,B,\n"
+            "Bad type,essay,,,\n"
+            "One option,single,A,,1\n"
+        )
+        r = client.post(f"/api/v1/exams/{draft_exam.id}/questions/import?format=csv", content=body,
+                        headers=examiner_headers)
+        assert r.status_code == 422
+        assert r.json()["detail"]["errors"] == [
+            {"row": 3, "error": "At least one correct option required"},
+            {"row": 4, "error": "Invalid question type"},
+            {"row": 5, "error": "At least 2 options required"},
+        ]
+        assert self._questions(db, draft_exam) == []
+
+    def test_oversized_body_refused(self, client, db, examiner_headers, draft_exam, monkeypatch):
+        from app.services import question_import
+
+        monkeypatch.setattr(question_import, "MAX_IMPORT_BYTES", 64)
+        url = f"/api/v1/exams/{draft_exam.id}/questions/import?format=csv"
+        body = "question_text,option_1,option_2,correct\n" + "Fine,A,B,1\n" * 10
+        assert client.post(url, content=body, headers=examiner_headers).status_code == 413
+        # Chunked, so no Content-Length to go on: caught while reading.
+        chunks = iter([body[:40].encode(), body[40:].encode()])
+        assert client.post(url, content=chunks, headers=examiner_headers).status_code == 413
+        assert self._questions(db, draft_exam) == []
+
+    def test_unknown_format(self, client, examiner_headers, draft_exam):
+        r = client.post(f"/api/v1/exams/{draft_exam.id}/questions/import", content="x",
+                        headers={**examiner_headers, "Content-Type": "text/plain"})
+        assert r.status_code == 415
+
+    def test_other_examiners_exam_forbidden(self, client, db, draft_exam):
+        from app.models.user import User, UserRole
+        from tests.conftest import make_token
+        other = User(email="other-examiner@test.com", password_hash="x", full_name="Other",
+                     role=UserRole.EXAMINER, is_verified=True)
+        db.add(other)
+        db.commit()
+        r = client.post(f"/api/v1/exams/{draft_exam.id}/questions/import?format=jsonl", content="{}",
+                        headers={"Authorization": f"Bearer {make_token(other)}"})
+        assert r.status_code == 403
+
+
+class TestLiveWarmup:
+    def test_going_live_schedules_warmup(self, client, examiner_headers, db, examiner_user, monkeypatch):
+        from app.models.exam import Exam, ExamStatus
+        from app.services import exam_cache
+
+        warmed = []
+
+        async def fake_warm(exam_id):
+            warmed.append(exam_id)
+
+        monkeypatch.setattr(exam_cache, "warm_exam_in_background", fake_warm)
+        exam = Exam(title="Warm", description="", duration_minutes=30, total_marks=10,
+                    pass_percentage=40, status=ExamStatus.DRAFT, created_by=examiner_user.id)
+        db.add(exam)
+        db.commit()
+
+        with patch("app.services.evaluation_dispatch.evaluate_exam_batch_task") as batch:
+            client.patch(f"/api/v1/exams/{exam.id}/status?status=ended", headers=examiner_headers)
+        batch.apply_async.assert_called_once_with(args=[str(exam.id)])
+        assert warmed == []
+        client.patch(f"/api/v1/exams/{exam.id}/status?status=live", headers=examiner_headers)
+        assert warmed == [exam.id]
+
+    def test_students_at_t0_only_hit_cache(self, client, db, student_headers, live_exam):
+        import asyncio
+        from app.core.cache import cache
+        from app.services import exam_cache
+
+        exam, *_ = live_exam
+        timings = asyncio.run(exam_cache.warm_exam(db, exam.id))
+        assert set(timings) == {"exam_meta_ms", "questions_ms", "questions_rendered_ms",
+                                "proctoring_settings_ms", "answer_key_ms", "total_ms"}
+
+        loads = cache.stats()["compute"]["loads"]
+        assert client.get(f"/api/v1/exams/{exam.id}", headers=student_headers).status_code == 200
+        r = client.get(f"/api/v1/exams/{exam.id}/questions", headers=student_headers)
+        assert r.json()[0]["question_text"] == "What is 2 + 2?"
+        r = client.get(f"/api/v1/monitor/enhanced/exam/{exam.id}/proctoring-settings",
+                       headers=student_headers)
+        assert r.status_code == 200
+        assert cache.stats()["compute"]["loads"] == loads
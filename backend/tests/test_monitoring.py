@@ -0,0 +1,100 @@
+"""
+Proctoring endpoint tests — violations, health, recovery, live feed, settings.
+These handlers run on the async (asyncpg) session, so rows they change are
+re-read after ``db.expire_all()``.
+"""
+import pytest
+
+from app.models.attempt import ExamAttempt, AttemptStatus
+
+ENHANCED = "/api/v1/monitor/enhanced"
+
+
+@pytest.fixture
+def attempt(db, live_exam, student_user):
+    exam, *_ = live_exam
+    a = ExamAttempt(exam_id=exam.id, student_id=student_user.id, status=AttemptStatus.IN_PROGRESS)
+    db.add(a)
+    db.commit()
+    db.refresh(a)
+    return a
+
+
+class TestViolations:
+    def test_violation_lowers_health_and_is_listed(self, client, db, student_headers, attempt):
+        r = client.post(f"{ENHANCED}/violation", headers=student_headers, json={
+            "attempt_id": str(attempt.id),
+            "event_type": "tab_switch",
+            "flags": [{"type": "tab_switch", "severity": "high", "message": "left the tab"}],
+        })
+        assert r.status_code == 200
+        body = r.json()
+        assert body["violations_logged"] == 1
+        assert body["health"]["current"] < body["health"]["max"]
+
+        db.expire_all()
+        assert db.get(ExamAttempt, attempt.id).current_health == body["health"]["current"]
+
+        r = client.get(f"{ENHANCED}/attempt/{attempt.id}/violations", headers=student_headers)
+        assert r.status_code == 200
+        assert r.json()["total_violations"] == 1
+
+        r = client.get(f"{ENHANCED}/attempt/{attempt.id}/health", headers=student_headers)
+        assert r.json()["current"] == body["health"]["current"]
+
+    def test_other_students_attempt_not_found(self, client, db, examiner_headers, attempt):
+        r = client.post(f"{ENHANCED}/violation", headers=examiner_headers, json={
+            "attempt_id": str(attempt.id), "event_type": "tab_switch", "flags": [{"type": "tab_switch"}],
+        })
+        assert r.status_code == 404
+
+    def test_recover_persists(self, client, db, student_headers, attempt):
+        attempt.current_health = 50
+        db.commit()
+        r = client.post(f"{ENHANCED}/recover", headers=student_headers,
+                        json={"attempt_id": str(attempt.id), "amount": 5})
+        assert r.status_code == 200
+        assert r.json()["recovered"] == 5
+        db.expire_all()
+        assert db.get(ExamAttempt, attempt.id).current_health == 55
+
+
+class TestExaminerViews:
+    def test_live_feed_and_suspicion_score(self, client, student_headers, examiner_headers, live_exam, attempt):
+        exam, *_ = live_exam
+        client.post(f"{ENHANCED}/violation", headers=student_headers, json={
+            "attempt_id": str(attempt.id), "event_type": "tab_switch", "flags": [{"type": "tab_switch"}],
+        })
+        r = client.get(f"{ENHANCED}/exam/{exam.id}/live-feed", headers=examiner_headers)
+        assert r.status_code == 200
+        feed = r.json()
+        assert feed["active_count"] == 1 and feed["flagged_count"] == 1
+        assert feed["students"][0]["student_email"] == "student@test.com"
+
+        r = client.get(f"{ENHANCED}/attempt/{attempt.id}/suspicion-score", headers=examiner_headers)
+        assert r.status_code == 200
+        assert r.json()["score"] > 0
+
+    def test_update_proctoring_settings(self, client, examiner_headers, student_headers, live_exam):
+        exam, *_ = live_exam
+        r = client.post(f"{ENHANCED}/exam/{exam.id}/proctoring-settings", headers=examiner_headers,
+                        json={"initial_health": 150, "detection_interval": 5})
+        assert r.status_code == 200
+        r = client.get(f"{ENHANCED}/exam/{exam.id}/proctoring-settings", headers=student_headers)
+        assert r.json()["initial_health"] == 150
+
+
+class TestWebSocket:
+    def test_owner_gets_health_on_connect(self, client, student_headers, attempt):
+        token = student_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"{ENHANCED}/ws/proctoring/{attempt.id}?token={token}") as ws:
+            assert ws.receive_json()["type"] == "connected"
+            update = ws.receive_json()
+            assert update["type"] == "health_update" and update["data"]["current"] == 100
+
+    def test_unauthenticated_connection_refused(self, client, attempt):
+        from starlette.websockets import WebSocketDisconnect
+
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"{ENHANCED}/ws/proctoring/{attempt.id}") as ws:
+                ws.receive_json()
@@ -0,0 +1,103 @@
+"""
+Per-request SQL accounting: headers, N+1 detection and @query_budget.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.api.v1 import enhanced_monitoring
+from app.core import query_stats
+from app.models.attempt import AttemptStatus, ExamAttempt
+from app.models.cheat_log import CheatLog, CheatSeverity
+from app.models.user import User, UserRole
+
+ENHANCED = "/api/v1/monitor/enhanced"
+
+
+def _add_students(db, exam, n, violations=2):
+    for i in range(n):
+        user = User(email=f"feed{i}-{datetime.utcnow().timestamp()}@test.com", password_hash="x",
+                    full_name=f"Feed Student {i}", role=UserRole.STUDENT, is_verified=True)
+        db.add(user)
+        db.flush()
+        attempt = ExamAttempt(exam_id=exam.id, student_id=user.id, status=AttemptStatus.IN_PROGRESS)
+        db.add(attempt)
+        db.flush()
+        for j in range(violations):
+            db.add(CheatLog(attempt_id=attempt.id, flag_type=f"flag{j}", severity=CheatSeverity.LOW,
+                            timestamp=datetime.utcnow() + timedelta(seconds=j)))
+    db.commit()
+
+
+class TestHeaders:
+    def test_sync_route_counted(self, client, examiner_headers, live_exam):
+        r = client.get("/api/v1/analytics/examiner/stats", headers=examiner_headers)
+        assert r.status_code == 200
+        assert int(r.headers["x-db-queries"]) >= 2
+        assert float(r.headers["x-db-time-ms"]) > 0
+        assert r.headers["server-timing"].startswith("db;dur=")
+
+    def test_async_route_counted(self, client, examiner_headers, live_exam):
+        exam, *_ = live_exam
+        r = client.get(f"{ENHANCED}/exam/{exam.id}/live-feed", headers=examiner_headers)
+        assert r.status_code == 200
+        assert int(r.headers["x-db-queries"]) >= 1
+
+
+    def test_headers_can_be_off(self, client, examiner_headers, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "QUERY_STATS_HEADERS", False)
+        r = client.get("/api/v1/analytics/examiner/stats", headers=examiner_headers)
+        assert r.status_code == 200
+        assert "x-db-queries" not in r.headers and "server-timing" not in r.headers
+
+class TestLiveFeed:
+    def test_query_count_independent_of_attempts(self, client, db, examiner_headers, live_exam):
+        exam, *_ = live_exam
+        url = f"{ENHANCED}/exam/{exam.id}/live-feed"
+
+        def steady_state():
+            client.get(url, headers=examiner_headers)       # principal cached, health lazily initialised
+            return client.get(url, headers=examiner_headers)
+
+        _add_students(db, exam, 1)
+        one = steady_state()
+        _add_students(db, exam, 9)
+        ten = steady_state()
+
+        assert one.json()["active_count"] == 1 and ten.json()["active_count"] == 10
+        assert ten.headers["x-db-queries"] == one.headers["x-db-queries"]
+
+    def test_latest_flag_and_count(self, client, db, examiner_headers, live_exam):
+        exam, *_ = live_exam
+        _add_students(db, exam, 2, violations=3)
+        feed = client.get(f"{ENHANCED}/exam/{exam.id}/live-feed", headers=examiner_headers).json()
+        for student in feed["students"]:
+            assert student["violation_count"] == 3
+            assert student["last_flag"]["type"] == "flag2"
+        assert feed["flagged_count"] == 2
+
+
+class TestBudget:
+    def test_over_budget_is_recorded(self, client, examiner_headers, live_exam, monkeypatch):
+        exam, *_ = live_exam
+        monkeypatch.setattr(enhanced_monitoring.get_live_feed, "__query_budget__", 1)
+        client.get(f"{ENHANCED}/exam/{exam.id}/live-feed", headers=examiner_headers)
+        assert any("live-feed" in v for v in query_stats.violations)
+        query_stats.violations.clear()      # expected here; don't fail the test
+
+    def test_counting_detects_repeats(self, db, count_queries):
+        with count_queries() as stats:
+            for _ in range(query_stats.N_PLUS_ONE_THRESHOLD):
+                db.execute(text("SELECT 1"))
+        assert stats.count == query_stats.N_PLUS_ONE_THRESHOLD
+        assert stats.repeated() == ["SELECT 1"]
+
+    def test_executemany_batch_is_not_a_repeat(self, db, count_queries):
+        rows = [{"n": i} for i in range(query_stats.N_PLUS_ONE_THRESHOLD * 3)]
+        db.execute(text("CREATE TEMP TABLE batch_probe (n int)"))
+        with count_queries() as stats:
+            db.execute(text("INSERT INTO batch_probe (n) VALUES (:n)"), rows)
+        assert stats.repeated() == []
@@ -0,0 +1,61 @@
+"""
+Per-student question/option order: derived from the attempt, applied over the
+shared cached payload, reproduced in results and grading.
+"""
+from unittest.mock import patch
+
+from app.services import shuffle
+from tests.test_attempts import _PATCH_TARGET, _make_mock_task
+
+
+def _start(client, headers, exam):
+    return client.post("/api/v1/attempts/start", json={"exam_id": str(exam.id)}, headers=headers).json()["id"]
+
+
+class TestOrder:
+    def test_deterministic_and_per_attempt(self):
+        payload = [{"id": f"q{i}", "options": [{"id": f"q{i}o{k}"} for k in range(4)]} for i in range(20)]
+        a = shuffle.apply(payload, shuffle.seed_for("e", "s1", "a1"))
+        assert a == shuffle.apply(payload, shuffle.seed_for("e", "s1", "a1"))
+        assert [q["id"] for q in a] != [q["id"] for q in shuffle.apply(payload, shuffle.seed_for("e", "s2", "a2"))]
+        assert sorted(q["id"] for q in a) == sorted(q["id"] for q in payload)
+        assert payload[0]["options"][0]["id"] == "q0o0"        # cached payload untouched
+
+    def test_positions_match_served_order(self):
+        seed = shuffle.seed_for("e", "s", "a")
+        payload = [{"id": f"q{i}", "options": []} for i in range(10)]
+        served = [q["id"] for q in shuffle.apply(payload, seed)]
+        positions = shuffle.positions(seed, {q["id"]: n for n, q in enumerate(payload)})
+        assert sorted(served, key=positions.get) == served
+
+
+class TestServedPaper:
+    def test_student_gets_own_order_with_etag(self, client, student_headers, ten_question_exam):
+        exam = ten_question_exam
+        attempt_id = _start(client, student_headers, exam)
+        url = f"/api/v1/exams/{exam.id}/questions"
+
+        base = client.get(url, headers=student_headers)
+        mine = client.get(url, params={"attempt_id": attempt_id}, headers=student_headers)
+        assert [q["id"] for q in mine.json()] != [q["id"] for q in base.json()]
+        assert mine.headers["etag"] != base.headers["etag"]
+        assert client.get(url, params={"attempt_id": attempt_id}, headers=student_headers).json() == mine.json()
+
+        r = client.get(url, params={"attempt_id": attempt_id},
+                       headers={**student_headers, "If-None-Match": mine.headers["etag"]})
+        assert r.status_code == 304
+
+    def test_results_numbered_as_served(self, client, student_headers, ten_question_exam):
+        exam = ten_question_exam
+        attempt_id = _start(client, student_headers, exam)
+        served = client.get(f"/api/v1/exams/{exam.id}/questions", params={"attempt_id": attempt_id},
+                            headers=student_headers).json()
+        # Answer the first question shown with the first option shown.
+        responses = [{"question_id": q["id"], "selected_option_ids": [q["options"][0]["id"]]} for q in served]
+        with patch(_PATCH_TARGET, _make_mock_task()):
+            assert client.post(f"/api/v1/attempts/{attempt_id}/submit", json={"responses": responses},
+                               headers=student_headers).status_code == 200
+
+        results = client.get(f"/api/v1/attempts/{attempt_id}/results", headers=student_headers).json()
+        assert [q["question_id"] for q in results["questions"]] == [q["id"] for q in served]
+        assert [q["position"] for q in results["questions"]] == list(range(1, 11))
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Cloud, Check, AlertCircle } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useExamStore } from '../store/examStore';
@@ -8,23 +8,35 @@ type SaveStatus = 'idle' | 'saving' | 'saved' | 'error';
 
 const AutoSaveIndicator = () => {
   const [status, setStatus] = useState<SaveStatus>('idle');
-  const { attemptId, answers } = useExamStore();
+  const { attemptId, answers, questions } = useExamStore();
+  // Last saved form of each answer, so only changes are sent.
+  const lastSaved = useRef(new Map<string, string>());
 
   useEffect(() => {
     const autoSave = async () => {
       if (!attemptId || answers.size === 0) return;
 
+      const changed = Array.from(answers.values())
+        .map(answer => {
+          const question = questions.find(q => q.id === answer.questionId);
+          return {
+            question_id: answer.questionId,
+            selected_option_ids: answer.selectedOptions
+              .map(idx => question?.options[idx]?.id)
+              .filter(Boolean) as string[],
+            answer_text: answer.textAnswer || null,
+            marked_for_review: answer.markedForReview,
+          };
+        })
+        .filter(r => lastSaved.current.get(r.question_id) !== JSON.stringify(r));
+      if (changed.length === 0) return;
+
       setStatus('saving');
 
       try {
-        const responses = Array.from(answers.values()).map(answer => ({
-          question_id: answer.questionId,
-          selected_option_ids: answer.selectedOptions,
-          marked_for_review: answer.markedForReview,
-        }));
+        await api.post(`/attempts/${attemptId}/auto-save`, { responses: changed });
+        changed.forEach(r => lastSaved.current.set(r.question_id, JSON.stringify(r)));
 
-        await api.post(`/attempts/${attemptId}/auto-save`, { responses });
-        
         setStatus('saved');
         setTimeout(() => setStatus('idle'), 2000);
       } catch (error) {
@@ -37,7 +49,7 @@ const AutoSaveIndicator = () => {
     const interval = setInterval(autoSave, 10000); // Auto-save every 10 seconds
 
     return () => clearInterval(interval);
-  }, [attemptId, answers]);
+  }, [attemptId, answers, questions]);
 
   return (
     <AnimatePresence mode="wait">
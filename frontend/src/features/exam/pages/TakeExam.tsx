@@ -25,6 +25,7 @@ const TakeExam = () => {
     isSubmitted,
     attemptId,
     initExam,
+    restoreAnswers,
     nextQuestion,
     prevQuestion,
     submitExam,
@@ -230,8 +231,16 @@ const TakeExam = () => {
 
   const fetchExamAndQuestions = async () => {
     try {
+      const attemptIdFromState = window.history.state?.usr?.attemptId;
+      if (!attemptIdFromState) {
+        alert('No attempt found. Please restart the exam.');
+        navigate('/student');
+        return;
+      }
+
       const examRes      = await api.get(`/exams/${examId}`);
-      const questionsRes = await api.get(`/exams/${examId}/questions`);
+      // attempt_id: questions and options come back in this attempt's own order
+      const questionsRes = await api.get(`/exams/${examId}/questions`, { params: { attempt_id: attemptIdFromState } });
       setExam(examRes.data);
 
       if (!questionsRes.data?.length) {
@@ -240,14 +249,15 @@ const TakeExam = () => {
         return;
       }
 
-      const attemptIdFromState = window.history.state?.usr?.attemptId;
-      if (!attemptIdFromState) {
-        alert('No attempt found. Please restart the exam.');
-        navigate('/student');
-        return;
-      }
-
       initExam(examId!, questionsRes.data, examRes.data.duration_minutes * 60, attemptIdFromState);
+      // Resuming after a reload or browser crash: put back what was auto-saved
+      // so the page (and the final submit) starts from the saved sheet.
+      try {
+        const savedRes = await api.get(`/attempts/${attemptIdFromState}/auto-save`);
+        restoreAnswers(savedRes.data?.responses ?? []);
+      } catch {
+        // Nothing to restore — start from an empty sheet.
+      }
       setLoading(false);
     } catch {
       alert('Failed to load exam.');
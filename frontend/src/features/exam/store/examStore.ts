@@ -1,6 +1,14 @@
 import { create } from 'zustand';
 import { Question, Answer } from '@/types';
 
+// One entry of GET /attempts/{id}/auto-save
+export interface SavedResponse {
+  question_id: string;
+  selected_option_ids: string[];
+  answer_text: string | null;
+  marked_for_review: boolean;
+}
+
 interface ExamState {
   examId: string | null;
   questions: Question[];
@@ -12,6 +20,7 @@ interface ExamState {
 
   // Actions
   initExam: (examId: string, questions: Question[], durationSeconds: number, attemptId: string) => void;
+  restoreAnswers: (saved: SavedResponse[]) => void;
   selectAnswer: (questionId: string, optionIndex: number, isMultiple: boolean) => void;
   setTextAnswer: (questionId: string, text: string) => void;
   toggleMarkForReview: (questionId: string) => void;
@@ -63,6 +72,30 @@ export const useExamStore = create<ExamState>((set, get) => ({
     });
   },
 
+  restoreAnswers: (saved) => {
+    set((state) => {
+      const newAnswers = new Map(state.answers);
+      saved.forEach(r => {
+        const current = newAnswers.get(r.question_id);
+        const question = state.questions.find(q => q.id === r.question_id);
+        if (!current || !question) return;
+        // Saved answers carry option ids; the store keys options by position
+        // (which is this attempt's shuffled order).
+        const selectedOptions = r.selected_option_ids
+          .map(id => question.options.findIndex(o => o.id === id))
+          .filter(idx => idx >= 0);
+        newAnswers.set(r.question_id, {
+          ...current,
+          selectedOptions,
+          textAnswer: r.answer_text ?? undefined,
+          markedForReview: r.marked_for_review,
+          visited: true,
+        });
+      });
+      return { answers: newAnswers };
+    });
+  },
+
   selectAnswer: (questionId, optionIndex, isMultiple) => {
     set((state) => {
       const newAnswers = new Map(state.answers);